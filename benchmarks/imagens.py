@@ -0,0 +1,78 @@
+"""Vazão da normalização de imagens (imagens/s) em função do número de processos
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/imagens.py --quantidade 40 --processos 1 2 4
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from core.imagens import ProcessadorImagens  # noqa: E402
+
+
+def gerar_print(caminho: str, largura: int = 1170, altura: int = 2532):
+    """Imagem parecida com um print de comprovante: fundo claro, blocos de "texto" e um pouco de ruído"""
+    imagem = Image.new('RGB', (largura, altura), (245, 245, 245))
+    desenho = ImageDraw.Draw(imagem)
+    for y in range(150, altura - 150, 90):
+        desenho.rectangle((80, y, random.randint(300, largura - 80), y + 40), fill=(40, 40, 40))
+    for _ in range(4000):
+        x, y = random.randrange(largura), random.randrange(altura)
+        desenho.point((x, y), fill=(random.randrange(256),) * 3)
+    imagem.save(caminho, 'PNG')
+
+
+async def medir(origens: list[str], saida: str, processos: int) -> float:
+    processador = ProcessadorImagens(processos)
+    try:
+        # Aquece o pool para não medir a criação dos processos
+        await processador.normalizar(origens[0], os.path.join(saida, 'aquecimento'))
+        inicio = time.perf_counter()
+        await asyncio.gather(*(
+            processador.normalizar(origem, os.path.join(saida, f'{processos}_{i}'))
+            for i, origem in enumerate(origens)
+        ))
+        return len(origens) / (time.perf_counter() - inicio)
+    finally:
+        processador.parar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quantidade', type=int, default=40)
+    parser.add_argument('--processos', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    pasta = tempfile.mkdtemp(prefix='bench_imagens_')
+    try:
+        print(f"🖼️ Gerando {args.quantidade} imagens de teste em {pasta}...")
+        origens = []
+        for i in range(args.quantidade):
+            caminho = os.path.join(pasta, f'origem_{i}.png')
+            gerar_print(caminho)
+            origens.append(caminho)
+        tamanho_origem = sum(os.path.getsize(c) for c in origens)
+
+        for processos in args.processos:
+            vazao = asyncio.run(medir(origens, pasta, processos))
+            print(f"⚙️ {processos} processo(s): {vazao:.1f} imagens/s")
+
+        normalizados = [os.path.join(pasta, f) for f in os.listdir(pasta)
+                        if f.startswith(f'{args.processos[-1]}_') and not f.endswith('.mini.jpg')]
+        tamanho_final = sum(os.path.getsize(c) for c in normalizados)
+        print(f"💾 {tamanho_origem / 1024 / 1024:.1f} MB → {tamanho_final / 1024 / 1024:.1f} MB após normalizar")
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
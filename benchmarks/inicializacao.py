@@ -0,0 +1,93 @@
+"""Tempo de inicialização do bot sem o Discord: imports mais lentos e fases do setup_hook
+
+Sobe o `main.py` num processo novo (como num cold start), roda o
+`setup_hook` sem fazer login e sai com código 1 se o total passar do alvo,
+para poder ser usado no CI. Login e gateway dependem da rede e ficam de
+fora; o tempo até o `on_ready` de verdade aparece no log e em `/status`.
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/inicializacao.py --alvo 2.5 --imports 15
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Roda no processo filho: mesmo caminho do bot.run(), menos login e gateway
+CODIGO = '''
+import asyncio, json
+import main
+
+async def iniciar():
+    async with main.bot:
+        await main.bot.setup_hook()
+        main.perfil.concluir("fim do setup_hook")
+        resumo = main.perfil.resumo()
+        await main.bot.close()
+    print("RESUMO " + json.dumps(resumo))
+
+asyncio.run(iniciar())
+'''
+
+
+def imports_mais_lentos(saida_importtime: str, quantidade: int) -> list[tuple[str, float]]:
+    """Imports feitos direto pelo `main` (e pelo código do filho), do maior tempo acumulado ao menor"""
+    diretos = []
+    for linha in saida_importtime.splitlines():
+        if not linha.startswith('import time:') or 'cumulative' in linha:
+            continue
+        _, acumulado, nome = linha.split('|')
+        # " main" tem 1 espaço de recuo; o que ele importa direto, 3
+        if len(nome) - len(nome.lstrip()) == 3:
+            diretos.append((nome.strip(), int(acumulado) / 1000))
+    return sorted(diretos, key=lambda item: item[1], reverse=True)[:quantidade]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mede o cold start do bot (sem Discord)')
+    parser.add_argument('--alvo', type=float, default=2.5, help='tempo máximo aceito, em segundos')
+    parser.add_argument('--imports', type=int, default=15, help='quantos imports listar')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='inicio_') as pasta:
+        # Sem Supabase nem token: só o que roda localmente, num banco e pasta descartáveis
+        env = dict(os.environ)
+        for variavel in ('SUPABASE_URL', 'SUPABASE_KEY', 'DISCORD_TOKEN', 'AUTOPING'):
+            env.pop(variavel, None)
+        env.update({
+            'PORT': '0',
+            'LOCAL_DB_PATH': os.path.join(pasta, 'local.db'),
+            'ARMAZENAMENTO_DIR': os.path.join(pasta, 'comprovantes'),
+        })
+        processo = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', CODIGO],
+            cwd=RAIZ, env=env, capture_output=True, text=True
+        )
+
+    resumo = next((json.loads(linha[7:]) for linha in processo.stdout.splitlines() if linha.startswith('RESUMO ')), None)
+    if processo.returncode != 0 or resumo is None:
+        print(processo.stdout)
+        print(processo.stderr[-3000:])
+        sys.exit('❌ A inicialização falhou')
+
+    print('📦 Imports mais lentos (acumulado):')
+    for nome, ms in imports_mais_lentos(processo.stderr, args.imports):
+        print(f'   {nome:<40} {ms:8.1f} ms')
+
+    print('\n⏱️ Fases:')
+    for nome, ms in resumo['fases_ms'].items():
+        print(f'   {nome:<24} {ms:8.1f} ms')
+
+    total = resumo['pronto_ms'] / 1000
+    print(f'\nTotal: {total:.2f}s (alvo: {args.alvo:.2f}s)')
+    if total > args.alvo:
+        sys.exit(f'❌ Inicialização acima do alvo ({total:.2f}s > {args.alvo:.2f}s)')
+    print('✅ Dentro do alvo')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""Memória e tempo para processar o mesmo tráfego do gateway em cada perfil de intents (`INTENTS_PERFIL`)
+
+Cada perfil roda num processo novo e recebe exatamente os mesmos eventos:
+um GUILD_CREATE com N membros e presenças por servidor, seguido de uma
+mistura de GUILD_MEMBER_ADD e PRESENCE_UPDATE (`--eventos`). Assim a
+diferença entre os perfis é só o que o discord.py descarta em cada um, e a
+tabela mostra quantos membros e presenças cada perfil jogou fora. Na
+prática, sem os intents, o Discord nem manda parte disso; o custo dos
+perfis menores aqui é um teto. O `membros` guarda todo membro que chega:
+a economia dele vem de não pedir a lista inteira (sem chunking), não de
+filtrar no cliente. O pico de RSS e a memória retida mostram o
+custo de cada um (o tempo inclui o overhead do tracemalloc).
+
+Uso (a partir da raiz do projeto):
+    python benchmarks/intents.py --membros 20000 --servidores 2
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PERFIS = ('completo', 'membros', 'minimo')
+ID_BOT = 10 ** 17
+
+
+def _membro(user_id: int) -> dict:
+    return {
+        'user': {'id': str(user_id), 'username': f'usuario{user_id}', 'discriminator': '0',
+                 'global_name': None, 'avatar': None},
+        'roles': [],
+        'joined_at': '2024-01-01T00:00:00+00:00',
+        'deaf': False,
+        'mute': False,
+        'flags': 0,
+    }
+
+
+def _presenca(user_id: int) -> dict:
+    return {
+        'user': {'id': str(user_id)},
+        'status': 'online',
+        'client_status': {'desktop': 'online'},
+        'activities': [{'name': 'Jogo', 'type': 0, 'created_at': 0}],
+    }
+
+
+def servidor_sintetico(guild_id: int, membros: int) -> dict:
+    ids = range(guild_id * 1_000_000, guild_id * 1_000_000 + membros)
+    return {
+        'id': str(guild_id),
+        'name': f'Servidor {guild_id}',
+        'roles': [{'id': str(guild_id), 'name': '@everyone', 'permissions': '0', 'position': 0,
+                   'color': 0, 'hoist': False, 'managed': False, 'mentionable': False}],
+        'channels': [],
+        'emojis': [],
+        'stickers': [],
+        'features': [],
+        'member_count': membros,
+        'members': [_membro(ID_BOT)] + [_membro(i) for i in ids],
+        'presences': [_presenca(i) for i in ids],
+    }
+
+
+def eventos_sinteticos(guild_id: int, membros: int, quantidade: int) -> list[tuple[str, dict]]:
+    """Uma entrada a cada quatro eventos; o resto são presenças de membros já no servidor"""
+    base = guild_id * 1_000_000
+    eventos = []
+    for i in range(quantidade):
+        if i % 4 == 0 or not membros:
+            eventos.append(('GUILD_MEMBER_ADD', {**_membro(base + membros + i), 'guild_id': str(guild_id)}))
+        else:
+            user_id = base + (i * 7919) % membros
+            eventos.append(('PRESENCE_UPDATE', {**_presenca(user_id), 'guild_id': str(guild_id)}))
+    return eventos
+
+
+def medir(perfil: str, membros: int, servidores: int, eventos: int) -> dict:
+    """Roda no processo filho"""
+    import discord
+
+    from core.membros import configuracao_gateway
+
+    configuracao = configuracao_gateway(perfil)
+    cliente = discord.Client(**configuracao)
+    estado = cliente._connection
+    estado.user = discord.ClientUser(state=estado, data=_membro(ID_BOT)['user'])
+    cargas = [servidor_sintetico(g, membros) for g in range(1, servidores + 1)]
+    fluxo = [evento for g in range(1, servidores + 1) for evento in eventos_sinteticos(g, membros, eventos)]
+
+    # Totais entregues (iguais em todos os perfis), contados antes de medir
+    entregues = sum(len(c['members']) for c in cargas) + sum(1 for t, _ in fluxo if t == 'GUILD_MEMBER_ADD')
+    presencas = [
+        (int(c['id']), int(p['user']['id'])) for c in cargas for p in c['presences']
+    ] + [(int(d['guild_id']), int(d['user']['id'])) for t, d in fluxo if t == 'PRESENCE_UPDATE']
+
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    for carga in cargas:
+        estado._add_guild_from_data(carga)
+    duracao = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    for tipo, dados in fluxo:
+        estado.parsers[tipo](dados)
+    duracao_eventos = time.perf_counter() - inicio
+    del cargas, fluxo
+    retido, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Ninguém sai do servidor no fluxo: presença de quem não está no cache foi descartada
+    em_cache = sum(len(g.members) for g in cliente.guilds)
+    presencas_descartadas = sum(1 for g, u in presencas if cliente.get_guild(g).get_member(u) is None)
+
+    return {
+        'perfil': perfil,
+        'membros_em_cache': em_cache,
+        'membros_descartados': entregues - em_cache,
+        'presencas_descartadas': presencas_descartadas,
+        'presencas_entregues': len(presencas),
+        'processamento_ms': round(duracao * 1000, 1),
+        'eventos_ms': round(duracao_eventos * 1000, 1),
+        'retido_mb': round(retido / 1024 / 1024, 2),
+        'rss_pico_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Custo de memória/tempo de cada perfil de intents')
+    parser.add_argument('--membros', type=int, default=20000, help='membros por servidor')
+    parser.add_argument('--servidores', type=int, default=1)
+    parser.add_argument('--eventos', type=int, default=10000, help='eventos após o GUILD_CREATE, por servidor')
+    parser.add_argument('--filho', choices=PERFIS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        print(json.dumps(medir(args.filho, args.membros, args.servidores, args.eventos)))
+        return
+
+    print(f'🧪 {args.servidores} servidor(es) × {args.membros} membros + {args.eventos} eventos\n')
+    print(f"{'perfil':<10} {'em cache':>9} {'descartados':>12} {'presenças descartadas':>22} "
+          f"{'GUILD_CREATE':>13} {'eventos':>11} {'retido':>9} {'RSS pico':>10}")
+    for perfil in PERFIS:
+        saida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--filho', perfil,
+             '--membros', str(args.membros), '--servidores', str(args.servidores), '--eventos', str(args.eventos)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        r = json.loads(saida.strip().splitlines()[-1])
+        descartadas = f"{r['presencas_descartadas']}/{r['presencas_entregues']}"
+        print(f"{r['perfil']:<10} {r['membros_em_cache']:>9} {r['membros_descartados']:>12} {descartadas:>22} "
+              f"{r['processamento_ms']:>10.1f} ms {r['eventos_ms']:>8.1f} ms "
+              f"{r['retido_mb']:>6.2f} MB {r['rss_pico_mb']:>7.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,18 @@ import discord
 from discord.ext import commands
 import os
 import asyncio
-from datetime import datetime
+import hashlib
+import json
+import re
+from datetime import datetime, timedelta, timezone
+from functools import partial
+
+from core.admissao import admissao
+from core.agendador import Prioridade
+from core.armazenamento import ARMAZENAMENTO_DIR
+from core.blobs import caminho_miniatura
+from core.pipeline import EtapaPulada, Pipeline
+from core.pool_canais import POOL_CANAIS_TAMANHO, PoolCanais
 
 # Carregar IDs das variáveis de ambiente
 COMPROVANTES_CHANNEL_ID = int(os.getenv('COMPROVANTES_CHANNEL_ID', 0))
@@ -11,15 +22,62 @@ MOD_ROLE_ID = int(os.getenv('MOD_ROLE_ID', 0))
 LOG_CHANNEL_ID = int(os.getenv('LOG_CHANNEL_ID', 0))
 CATEGORY_PEDIDOS_ID = int(os.getenv('CATEGORY_PEDIDOS_ID', 0))
 
+def carregar_revisao(bot, mensagem: discord.Message) -> dict | None:
+    """Estado da revisão a partir do ID da mensagem; sem registro local, lido do próprio embed
+
+    O fallback cobre o disco apagado num deploy (o embed sempre tem pedido,
+    usuário e plano; só o caminho do comprovante se perde).
+    """
+    revisao = bot.revisoes.obter(mensagem.id)
+    if revisao or not mensagem.embeds:
+        return revisao
+
+    campos = {campo.name: campo.value for campo in mensagem.embeds[0].fields}
+    usuario = re.search(r'\((\d+)\)', campos.get('Usuário', ''))
+    if not usuario or 'Pedido ID' not in campos or 'Serviço' not in campos:
+        return None
+    return {
+        'pedido_id': campos['Pedido ID'],
+        'user_id': int(usuario.group(1)),
+        'plano': campos['Serviço'],
+        'comprovante_path': None,
+    }
+
+
+async def adotar_decisao_remota(bot, interaction: discord.Interaction, mensagem_id: int, pedido_id: str, user_id: int):
+    """Conflito no Supabase: registra localmente quem decidiu e avisa o moderador que chegou depois"""
+    registro = None
+    try:
+        registro = await bot.db.buscar_decisao(mensagem_id, pedido_id, user_id)
+    except Exception as e:
+        print(f"⚠️ [Decisões] Não foi possível consultar a decisão do pedido {pedido_id}: {e}")
+    atual = bot.decisoes.adotar(mensagem_id, pedido_id, user_id, registro)
+    bot.revisoes.remover(mensagem_id)
+    await interaction.followup.send(bot.decisoes.descrever(atual), ephemeral=True)
+
+
 class VerificationButtons(discord.ui.View):
-    """Botões de Aceitar/Recusar para moderadores"""
-    def __init__(self, bot, pedido_id: str, user_id: int, plano: str, comprovante_path: str):
+    """Botões de Aceitar/Recusar para moderadores
+
+    Uma única instância é registrada com `bot.add_view` e atende todas as
+    mensagens pendentes; o pedido de cada clique vem de `carregar_revisao`.
+    """
+    def __init__(self, bot):
         super().__init__(timeout=None)
         self.bot = bot
-        self.pedido_id = pedido_id
-        self.user_id = user_id
-        self.plano = plano
-        self.comprovante_path = comprovante_path
+
+    @classmethod
+    def componentes(cls, bot) -> 'VerificationButtons':
+        """Cópia já parada, só para desenhar os botões: o discord.py não guarda Views paradas por mensagem"""
+        view = cls(bot)
+        view.stop()
+        return view
+
+    async def _revisao(self, interaction: discord.Interaction) -> dict | None:
+        revisao = carregar_revisao(self.bot, interaction.message)
+        if revisao is None:
+            await interaction.response.send_message('❌ Não encontrei os dados deste comprovante.', ephemeral=True)
+        return revisao
 
     @discord.ui.button(label='✅ Aceitar', style=discord.ButtonStyle.green, custom_id='aceito')
     async def aceito_button(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -30,124 +88,204 @@ class VerificationButtons(discord.ui.View):
             await interaction.response.send_message('❌ Apenas moderadores podem aprovar pedidos.', ephemeral=True)
             return
 
-        await interaction.response.defer()
+        revisao = await self._revisao(interaction)
+        if revisao is None:
+            return
+        pedido_id, user_id, plano = revisao['pedido_id'], revisao['user_id'], revisao['plano']
+
+        # Só um moderador decide cada pedido; cliques atrasados voltam na hora, sem tocar em APIs
+        mensagem_id = interaction.message.id
+        atual = self.bot.decisoes.reivindicar(mensagem_id, pedido_id, user_id, 'aceito', interaction.user.id)
+        if atual:
+            await interaction.response.send_message(self.bot.decisoes.descrever(atual), ephemeral=True)
+            return
 
+        decidido = False
         try:
-            supabase = self.bot.supabase
-            
-            # 1. Obter próximo número sequencial do contador
-            result = supabase.table('contador').select('ultimo_numero').execute()
-            
-            if result.data:
-                proximo_numero = result.data[0]['ultimo_numero'] + 1
-                supabase.table('contador').update({'ultimo_numero': proximo_numero}).eq('id', 1).execute()
-            else:
-                # Primeira vez - criar contador
-                proximo_numero = 1
-                supabase.table('contador').insert({'id': 1, 'ultimo_numero': 1}).execute()
+            await interaction.response.defer()
 
-            # 2. Criar canal privado
+            db = self.bot.db
+            agendador = self.bot.agendador
             guild = interaction.guild
-            category = discord.utils.get(guild.categories, id=CATEGORY_PEDIDOS_ID)
+            moderador = interaction.user
+            user = await self.bot.membros.obter(guild, user_id)
+            cliente = user.mention if user else f'<@{user_id}>'
+
+            # Só a numeração e o canal são sequenciais; o resto roda em paralelo depois deles
+            async def numerar(_):
+                # 1. Numerar e salvar no banco (atômico: sem números repetidos)
+                return await self.bot.alocador.aprovar({
+                    'pedido_id': pedido_id,
+                    'user_id': user_id,
+                    'plano': plano,
+                    'status': 'aceito',
+                    'moderador_id': moderador.id,
+                    'moderador_nome': str(moderador),
+                    'comprovante_path': revisao['comprovante_path'],
+                    'timestamp': datetime.now(timezone.utc).isoformat(),
+                    'mensagem_id': mensagem_id
+                })
+
+            async def criar_canal(r):
+                # 2. Criar canal privado
+                category = discord.utils.get(guild.categories, id=CATEGORY_PEDIDOS_ID)
             
-            canal_nome = f'pedido-cliente-{proximo_numero}'
+                # Permissões do canal
+                overwrites = {
+                    guild.default_role: discord.PermissionOverwrite(read_messages=False),
+                    guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True),
+                }
             
-            # Permissões do canal
-            overwrites = {
-                guild.default_role: discord.PermissionOverwrite(read_messages=False),
-                guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True),
-            }
+                # Adicionar moderadores
+                mod_role = guild.get_role(MOD_ROLE_ID)
+                if mod_role:
+                    overwrites[mod_role] = discord.PermissionOverwrite(read_messages=True, send_messages=True)
             
-            # Adicionar moderadores
-            mod_role = guild.get_role(MOD_ROLE_ID)
-            if mod_role:
-                overwrites[mod_role] = discord.PermissionOverwrite(read_messages=True, send_messages=True)
-            
-            # Adicionar cliente
-            user = guild.get_member(self.user_id)
-            if user:
-                overwrites[user] = discord.PermissionOverwrite(read_messages=True, send_messages=True)
-            
-            # Criar canal
-            canal_pedido = await guild.create_text_channel(
-                name=canal_nome,
-                category=category,
-                overwrites=overwrites
-            )
-
-            # 3. Salvar no banco Supabase
-            supabase.table('pedidos').insert({
-                'pedido_id': self.pedido_id,
-                'user_id': self.user_id,
-                'pedido_number': proximo_numero,
-                'plano': self.plano,
-                'status': 'aceito',
-                'moderador_id': interaction.user.id,
-                'moderador_nome': str(interaction.user),
-                'canal_id': canal_pedido.id,
-                'comprovante_path': self.comprovante_path,
-                'timestamp': datetime.utcnow().isoformat()
-            }).execute()
-
-            # 4. Mensagem inicial no canal do pedido
-            embed_canal = discord.Embed(
-                title=f'🎯 Pedido #{proximo_numero} - {self.plano}',
-                description=f'Bem-vindo(a) ao seu pedido, {user.mention}!\n\n'
-                           f'**Plano:** {self.plano}\n'
-                           f'**ID do Pedido:** {self.pedido_id}\n'
-                           f'**Status:** ✅ Aprovado\n\n'
-                           f'Os moderadores irão orientá-lo sobre os próximos passos.',
-                color=discord.Color.green(),
-                timestamp=datetime.utcnow()
-            )
-            embed_canal.set_footer(text=f'Aprovado por {interaction.user}')
-            await canal_pedido.send(embed=embed_canal)
+                # Adicionar cliente
+                if user:
+                    overwrites[user] = discord.PermissionOverwrite(read_messages=True, send_messages=True)
+
+                canal_nome = f"pedido-cliente-{r['numerar']['pedido_number']}"
+
+                async def obter_canal():
+                    # Canal pré-criado do pool (uma edição só); sem reserva, cria do zero
+                    pool = getattr(self.bot, 'pool_canais', None)
+                    if pool:
+                        canal = await pool.reivindicar(canal_nome, overwrites)
+                        if canal:
+                            return canal
+                    return await guild.create_text_channel(
+                        name=canal_nome,
+                        category=category,
+                        overwrites=overwrites
+                    )
 
-            # 5. DM ao cliente
-            try:
-                embed_dm = discord.Embed(
-                    title='✅ Pedido Aprovado!',
-                    description=f'Seu pedido ({self.plano}) foi aprovado!\n\n'
-                               f'**Canal privado criado:** {canal_pedido.mention}\n'
-                               f'**Número do Pedido:** #{proximo_numero}\n\n'
-                               f'Entre no canal privado para combinar os próximos passos.',
-                    color=discord.Color.green()
+                return await agendador.enviar(f'guild:{guild.id}:canais', obter_canal, prioridade=Prioridade.RESPOSTA)
+
+            async def vincular_canal(r):
+                # 3. Vincular o canal ao pedido no banco
+                await db.atualizar_registro(r['numerar'], {'canal_id': r['criar_canal'].id})
+
+            async def boas_vindas(r):
+                # 4. Mensagem inicial no canal do pedido
+                numero = r['numerar']['pedido_number']
+                embed_canal = discord.Embed(
+                    title=f'🎯 Pedido #{numero} - {plano}',
+                    description=f'Bem-vindo(a) ao seu pedido, {cliente}!\n\n'
+                               f'**Plano:** {plano}\n'
+                               f'**ID do Pedido:** {pedido_id}\n'
+                               f'**Status:** ✅ Aprovado\n\n'
+                               f'Os moderadores irão orientá-lo sobre os próximos passos.',
+                    color=discord.Color.green(),
+                    timestamp=datetime.utcnow()
                 )
-                await user.send(embed=embed_dm)
-            except:
-                # Usuário com DM fechada
-                pass
-
-            # 6. Log no canal de logs
-            if LOG_CHANNEL_ID:
-                log_channel = guild.get_channel(LOG_CHANNEL_ID)
-                if log_channel:
-                    embed_log = discord.Embed(
-                        title='✅ Pedido Aprovado',
-                        color=discord.Color.green(),
-                        timestamp=datetime.utcnow()
+                embed_canal.set_footer(text=f'Aprovado por {moderador}')
+                canal = r['criar_canal']
+                await agendador.enviar(f'canal:{canal.id}:mensagens', partial(canal.send, embed=embed_canal))
+
+            async def avisar_cliente(r):
+                # 5. DM ao cliente
+                if not user:
+                    return
+                try:
+                    embed_dm = discord.Embed(
+                        title='✅ Pedido Aprovado!',
+                        description=f'Seu pedido ({plano}) foi aprovado!\n\n'
+                                   f"**Canal privado criado:** {r['criar_canal'].mention}\n"
+                                   f"**Número do Pedido:** #{r['numerar']['pedido_number']}\n\n"
+                                   f'Entre no canal privado para combinar os próximos passos.',
+                        color=discord.Color.green()
                     )
-                    embed_log.add_field(name='Pedido ID', value=self.pedido_id, inline=True)
-                    embed_log.add_field(name='Número', value=f'#{proximo_numero}', inline=True)
-                    embed_log.add_field(name='Cliente', value=f'{user.mention}', inline=True)
-                    embed_log.add_field(name='Plano', value=self.plano, inline=True)
-                    embed_log.add_field(name='Moderador', value=interaction.user.mention, inline=True)
-                    embed_log.add_field(name='Canal', value=canal_pedido.mention, inline=True)
-                    await log_channel.send(embed=embed_log)
-
-            # 7. Atualizar mensagem original dos moderadores
-            embed_atualizado = interaction.message.embeds[0]
-            embed_atualizado.color = discord.Color.green()
-            embed_atualizado.title = f'✅ APROVADO - Pedido #{proximo_numero}'
-            embed_atualizado.add_field(name='Status', value=f'Aprovado por {interaction.user.mention}', inline=False)
-            embed_atualizado.add_field(name='Canal', value=canal_pedido.mention, inline=False)
-            
-            await interaction.message.edit(embed=embed_atualizado, view=None)
-            await interaction.followup.send(f'✅ Pedido aprovado! Canal {canal_pedido.mention} criado.', ephemeral=True)
+                    await agendador.enviar(f'dm:{user.id}', partial(user.send, embed=embed_dm))
+                except discord.HTTPException:
+                    # Usuário com DM fechada
+                    pass
+
+            async def registrar_log(r):
+                # 6. Log no canal de logs
+                if LOG_CHANNEL_ID:
+                    log_channel = guild.get_channel(LOG_CHANNEL_ID)
+                    if log_channel:
+                        embed_log = discord.Embed(
+                            title='✅ Pedido Aprovado',
+                            color=discord.Color.green(),
+                            timestamp=datetime.utcnow()
+                        )
+                        embed_log.add_field(name='Pedido ID', value=pedido_id, inline=True)
+                        embed_log.add_field(name='Número', value=f"#{r['numerar']['pedido_number']}", inline=True)
+                        embed_log.add_field(name='Cliente', value=cliente, inline=True)
+                        embed_log.add_field(name='Plano', value=plano, inline=True)
+                        embed_log.add_field(name='Moderador', value=moderador.mention, inline=True)
+                        embed_log.add_field(name='Canal', value=r['criar_canal'].mention, inline=True)
+                        agendador.disparar(f'canal:{log_channel.id}:mensagens', partial(log_channel.send, embed=embed_log))
+
+            async def atualizar_mensagem(r):
+                # 7. Atualizar mensagem original dos moderadores
+                embed_atualizado = interaction.message.embeds[0]
+                embed_atualizado.color = discord.Color.green()
+                embed_atualizado.title = f"✅ APROVADO - Pedido #{r['numerar']['pedido_number']}"
+                embed_atualizado.add_field(name='Status', value=f'Aprovado por {moderador.mention}', inline=False)
+                embed_atualizado.add_field(name='Canal', value=r['criar_canal'].mention, inline=False)
+                mensagem = interaction.message
+                await agendador.enviar(
+                    f'canal:{mensagem.channel.id}:edicoes',
+                    partial(mensagem.edit, embed=embed_atualizado, view=None),
+                    prioridade=Prioridade.RESPOSTA,
+                    chave=f'mensagem:{mensagem.id}'
+                )
 
-        except Exception as e:
-            await interaction.followup.send(f'❌ Erro ao processar aprovação: {str(e)}', ephemeral=True)
-            print(f"❌ Erro na aprovação: {e}")
+            async def confirmar(r):
+                await interaction.followup.send(f"✅ Pedido aprovado! Canal {r['criar_canal'].mention} criado.", ephemeral=True)
+
+            pipeline = (
+                Pipeline('aprovacao')
+                .etapa('numerar', numerar)
+                .etapa('criar_canal', criar_canal, depende_de=('numerar',))
+                .etapa('vincular_canal', vincular_canal, depende_de=('numerar', 'criar_canal'))
+                .etapa('boas_vindas', boas_vindas, depende_de=('numerar', 'criar_canal'))
+                .etapa('avisar_cliente', avisar_cliente, depende_de=('numerar', 'criar_canal'))
+                .etapa('registrar_log', registrar_log, depende_de=('numerar', 'criar_canal'))
+                .etapa('atualizar_mensagem', atualizar_mensagem, depende_de=('numerar', 'criar_canal'))
+                .etapa('confirmar', confirmar, depende_de=('criar_canal',))
+            )
+            resultados = await pipeline.executar()
+
+            # O Supabase já tinha uma decisão (outra instância, ou o banco local se perdeu num redeploy)
+            if self.bot.decisoes.conflito_remoto(resultados['numerar'].erro):
+                await adotar_decisao_remota(self.bot, interaction, mensagem_id, pedido_id, user_id)
+                decidido = True
+                return
+
+            # Gravado mas sem canal: desfaz a gravação, senão o pedido ficaria "aceito" sem canal para sempre
+            aprovado = resultados['numerar'].ok and resultados['criar_canal'].ok
+            if resultados['numerar'].ok and not aprovado:
+                try:
+                    await db.remover_registro(resultados['numerar'].valor)
+                except Exception as e:
+                    print(f"❌ [Aprovação] Não foi possível desfazer o pedido {pedido_id} sem canal: {e}")
+
+            # Só com o pedido gravado e o canal criado a decisão vira definitiva (senão o `finally` a libera)
+            if aprovado:
+                self.bot.decisoes.concluir(mensagem_id, pedido_id, user_id)
+                decidido = True
+                espera = discord.utils.utcnow() - interaction.message.created_at
+                self.bot.estatisticas.registrar_decisao(plano, 'aprovado', moderador.id, espera.total_seconds())
+
+            # Falha antes do canal existir: nada foi feito no Discord, avisar o moderador
+            for etapa in ('numerar', 'criar_canal'):
+                erro = resultados[etapa].erro
+                if erro and not isinstance(erro, EtapaPulada):
+                    await interaction.followup.send(f'❌ Erro ao processar aprovação: {str(erro)}. Tente de novo.', ephemeral=True)
+                    return
+            self.bot.revisoes.remover(mensagem_id)
+
+            falhas = [nome for nome, resultado in resultados.items() if not resultado.ok]
+            if falhas:
+                await interaction.followup.send(f"⚠️ Pedido aprovado, mas estas etapas falharam: {', '.join(falhas)}", ephemeral=True)
+        finally:
+            # Qualquer saída sem decisão gravada (erro, interação expirada, cancelamento) devolve o pedido
+            if not decidido:
+                self.bot.decisoes.liberar(mensagem_id, pedido_id, user_id)
 
     @discord.ui.button(label='❌ Recusar', style=discord.ButtonStyle.red, custom_id='negada')
     async def negada_button(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -159,7 +297,17 @@ class VerificationButtons(discord.ui.View):
             return
 
         # Abrir modal para pedir o motivo
-        modal = MotivoModal(self.bot, self.pedido_id, self.user_id, self.plano, self.comprovante_path, interaction.message)
+        revisao = await self._revisao(interaction)
+        if revisao is None:
+            return
+        atual = self.bot.decisoes.consultar(interaction.message.id, revisao['pedido_id'], revisao['user_id'])
+        if atual:
+            await interaction.response.send_message(self.bot.decisoes.descrever(atual), ephemeral=True)
+            return
+        modal = MotivoModal(
+            self.bot, revisao['pedido_id'], revisao['user_id'], revisao['plano'],
+            revisao['comprovante_path'], interaction.message
+        )
         await interaction.response.send_modal(modal)
 
 class MotivoModal(discord.ui.Modal, title='Motivo da Reprovação'):
@@ -183,159 +331,303 @@ class MotivoModal(discord.ui.Modal, title='Motivo da Reprovação'):
     )
 
     async def on_submit(self, interaction: discord.Interaction):
-        await interaction.response.defer()
+        # Outro moderador pode ter decidido enquanto este modal estava aberto
+        mensagem_id = self.original_message.id
+        atual = self.bot.decisoes.reivindicar(mensagem_id, self.pedido_id, self.user_id, 'reprovado', interaction.user.id)
+        if atual:
+            await interaction.response.send_message(self.bot.decisoes.descrever(atual), ephemeral=True)
+            return
 
+        decidido = False
         try:
+            await interaction.response.defer()
+
             guild = interaction.guild
-            user = guild.get_member(self.user_id)
-            supabase = self.bot.supabase
-
-            # 1. Salvar no banco Supabase
-            supabase.table('pedidos').insert({
-                'pedido_id': self.pedido_id,
-                'user_id': self.user_id,
-                'pedido_number': None,
-                'plano': self.plano,
-                'status': 'reprovado',
-                'moderador_id': interaction.user.id,
-                'moderador_nome': str(interaction.user),
-                'motivo_reprovacao': self.motivo.value,
-                'comprovante_path': self.comprovante_path,
-                'timestamp': datetime.utcnow().isoformat()
-            }).execute()
-
-            # 2. DM ao cliente
-            try:
-                embed_dm = discord.Embed(
-                    title='❌ Pedido Não Aprovado',
-                    description=f'Seu pedido ({self.plano}) não foi aprovado.\n\n'
-                               f'**Motivo:** {self.motivo.value}\n\n'
-                               f'Se achar que houve erro, contate os moderadores.',
-                    color=discord.Color.red()
-                )
-                await user.send(embed=embed_dm)
-            except:
-                pass
-
-            # 3. Log no canal de logs
-            if LOG_CHANNEL_ID:
-                log_channel = guild.get_channel(LOG_CHANNEL_ID)
-                if log_channel:
-                    embed_log = discord.Embed(
-                        title='❌ Pedido Reprovado',
-                        color=discord.Color.red(),
-                        timestamp=datetime.utcnow()
+            moderador = interaction.user
+            user = await self.bot.membros.obter(guild, self.user_id)
+            cliente = user.mention if user else f'<@{self.user_id}>'
+            motivo = self.motivo.value
+            db = self.bot.db
+            agendador = self.bot.agendador
+
+            async def salvar(_):
+                # 1. Salvar no banco
+                await db.reprovar_pedido({
+                    'pedido_id': self.pedido_id,
+                    'user_id': self.user_id,
+                    'plano': self.plano,
+                    'status': 'reprovado',
+                    'moderador_id': moderador.id,
+                    'moderador_nome': str(moderador),
+                    'motivo_reprovacao': motivo,
+                    'comprovante_path': self.comprovante_path,
+                    'timestamp': datetime.now(timezone.utc).isoformat(),
+                    'mensagem_id': mensagem_id
+                })
+
+            async def avisar_cliente(_):
+                # 2. DM ao cliente
+                if not user:
+                    return
+                try:
+                    embed_dm = discord.Embed(
+                        title='❌ Pedido Não Aprovado',
+                        description=f'Seu pedido ({self.plano}) não foi aprovado.\n\n'
+                                   f'**Motivo:** {motivo}\n\n'
+                                   f'Se achar que houve erro, contate os moderadores.',
+                        color=discord.Color.red()
                     )
-                    embed_log.add_field(name='Pedido ID', value=self.pedido_id, inline=True)
-                    embed_log.add_field(name='Cliente', value=f'{user.mention}', inline=True)
-                    embed_log.add_field(name='Plano', value=self.plano, inline=True)
-                    embed_log.add_field(name='Moderador', value=interaction.user.mention, inline=True)
-                    embed_log.add_field(name='Motivo', value=self.motivo.value, inline=False)
-                    await log_channel.send(embed=embed_log)
-
-            # 4. Atualizar mensagem original
-            embed_atualizado = self.original_message.embeds[0]
-            embed_atualizado.color = discord.Color.red()
-            embed_atualizado.title = '❌ REPROVADO'
-            embed_atualizado.add_field(name='Status', value=f'Reprovado por {interaction.user.mention}', inline=False)
-            embed_atualizado.add_field(name='Motivo', value=self.motivo.value, inline=False)
-            
-            await self.original_message.edit(embed=embed_atualizado, view=None)
-            await interaction.followup.send('❌ Pedido reprovado e cliente notificado.', ephemeral=True)
+                    await agendador.enviar(f'dm:{user.id}', partial(user.send, embed=embed_dm))
+                except discord.HTTPException:
+                    pass
+
+            async def registrar_log(_):
+                # 3. Log no canal de logs
+                if LOG_CHANNEL_ID:
+                    log_channel = guild.get_channel(LOG_CHANNEL_ID)
+                    if log_channel:
+                        embed_log = discord.Embed(
+                            title='❌ Pedido Reprovado',
+                            color=discord.Color.red(),
+                            timestamp=datetime.utcnow()
+                        )
+                        embed_log.add_field(name='Pedido ID', value=self.pedido_id, inline=True)
+                        embed_log.add_field(name='Cliente', value=cliente, inline=True)
+                        embed_log.add_field(name='Plano', value=self.plano, inline=True)
+                        embed_log.add_field(name='Moderador', value=moderador.mention, inline=True)
+                        embed_log.add_field(name='Motivo', value=motivo, inline=False)
+                        agendador.disparar(f'canal:{log_channel.id}:mensagens', partial(log_channel.send, embed=embed_log))
+
+            async def atualizar_mensagem(_):
+                # 4. Atualizar mensagem original
+                embed_atualizado = self.original_message.embeds[0]
+                embed_atualizado.color = discord.Color.red()
+                embed_atualizado.title = '❌ REPROVADO'
+                embed_atualizado.add_field(name='Status', value=f'Reprovado por {moderador.mention}', inline=False)
+                embed_atualizado.add_field(name='Motivo', value=motivo, inline=False)
+                mensagem = self.original_message
+                await agendador.enviar(
+                    f'canal:{mensagem.channel.id}:edicoes',
+                    partial(mensagem.edit, embed=embed_atualizado, view=None),
+                    prioridade=Prioridade.RESPOSTA,
+                    chave=f'mensagem:{mensagem.id}'
+                )
 
-        except Exception as e:
-            await interaction.followup.send(f'❌ Erro ao processar reprovação: {str(e)}', ephemeral=True)
-            print(f"❌ Erro na reprovação: {e}")
+            # Nada sai para o Discord antes da gravação: se ela falhar, a mensagem continua com os botões
+            resultados = await (
+                Pipeline('reprovacao')
+                .etapa('salvar', salvar)
+                .etapa('avisar_cliente', avisar_cliente, depende_de=('salvar',))
+                .etapa('registrar_log', registrar_log, depende_de=('salvar',))
+                .etapa('atualizar_mensagem', atualizar_mensagem, depende_de=('salvar',))
+                .executar()
+            )
+
+            if self.bot.decisoes.conflito_remoto(resultados['salvar'].erro):
+                await adotar_decisao_remota(self.bot, interaction, mensagem_id, self.pedido_id, self.user_id)
+                decidido = True
+                return
+            if not resultados['salvar'].ok:
+                await interaction.followup.send(f"❌ Erro ao processar reprovação: {resultados['salvar'].erro}", ephemeral=True)
+                return
+            self.bot.decisoes.concluir(mensagem_id, self.pedido_id, self.user_id)
+            decidido = True
+            self.bot.revisoes.remover(mensagem_id)
+            espera = discord.utils.utcnow() - self.original_message.created_at
+            self.bot.estatisticas.registrar_decisao(self.plano, 'reprovado', moderador.id, espera.total_seconds())
+
+            falhas = [nome for nome, resultado in resultados.items() if not resultado.ok]
+            if falhas:
+                await interaction.followup.send(f"⚠️ Pedido reprovado, mas estas etapas falharam: {', '.join(falhas)}", ephemeral=True)
+            else:
+                await interaction.followup.send('❌ Pedido reprovado e cliente notificado.', ephemeral=True)
+        finally:
+            # Qualquer saída sem decisão gravada (erro, interação expirada, cancelamento) devolve o pedido
+            if not decidido:
+                self.bot.decisoes.liberar(mensagem_id, self.pedido_id, self.user_id)
 
 class ComprovanteCog(commands.Cog):
     """Cog responsável pelo sistema de comprovantes"""
     
     def __init__(self, bot):
         self.bot = bot
-        self.comprovantes_dir = "comprovantes"
+        # Só a área de download; o destino final é o backend de armazenamento (`bot.armazenamento`)
+        self.comprovantes_dir = os.path.join(ARMAZENAMENTO_DIR, 'recebendo')
+        self._instrucoes_ok = False
+
+        # Pool opcional de canais pré-criados (POOL_CANAIS_TAMANHO > 0)
+        self.bot.pool_canais = None
+        if POOL_CANAIS_TAMANHO > 0 and CATEGORY_PEDIDOS_ID:
+            self.bot.pool_canais = PoolCanais(bot, CATEGORY_PEDIDOS_ID)
+
+    async def cog_load(self):
+        # Uma View para todas as mensagens pendentes, inclusive as de antes do restart
+        self.bot.add_view(VerificationButtons(self.bot))
+
+    def cog_unload(self):
+        if self.bot.pool_canais:
+            self.bot.pool_canais.parar()
 
     @commands.Cog.listener()
     async def on_ready(self):
-        """Envia mensagem fixa no canal de comprovantes quando bot inicia"""
+        """Envia (ou reaproveita) a mensagem fixa do canal de comprovantes
+
+        `on_ready` dispara de novo a cada reconexão do gateway; o trabalho
+        pesado só roda uma vez por processo.
+        """
+        if self.bot.pool_canais:
+            self.bot.pool_canais.iniciar()
+
+        if self._instrucoes_ok or not COMPROVANTES_CHANNEL_ID:
+            return
+        self._instrucoes_ok = True
+
         try:
-            if COMPROVANTES_CHANNEL_ID:
-                canal_comprovantes = self.bot.get_channel(COMPROVANTES_CHANNEL_ID)
-                if canal_comprovantes:
-                    # Limpar mensagens antigas do bot (últimas 100)
-                    async for msg in canal_comprovantes.history(limit=100):
-                        if msg.author == self.bot.user:
-                            try:
-                                await msg.delete()
-                            except:
-                                pass
-                    
-                    # Enviar mensagem fixa com instruções
-                    embed = discord.Embed(
-                        title='📋 Como Enviar Comprovante (OBRIGATÓRIO)',
-                        description='**1) Use o comando:**\n'
-                                   '```!pago <ID-do-pedido> <Plano>```\n'
-                                   '   - Plano: **Starter** ou **Profissional**\n\n'
-                                   '**2) Valor:** R$X,XX\n\n'
-                                   '**3) PIX TXID** (se houver)\n\n'
-                                   '**4) Anexe o print do comprovante**\n\n'
-                                   '**Exemplo:**\n'
-                                   '```!pago 1234 Starter | Valor: R$150,00 | TXID: ABCD1234```\n'
-                                   '(anexe imagem)\n\n'
-                                   '⏱️ Após enviar, aguarde confirmação. Sua mensagem será removida para segurança.',
-                        color=discord.Color.blue()
-                    )
-                    embed.set_footer(text='Em até 10 min–2h iremos verificar. Não finalize o pedido até receber confirmação.')
-                    await canal_comprovantes.send(embed=embed)
-                    print("✅ Mensagem fixa enviada no canal de comprovantes!")
+            canal_comprovantes = self.bot.get_channel(COMPROVANTES_CHANNEL_ID)
+            if canal_comprovantes:
+                await self._publicar_instrucoes(canal_comprovantes)
         except Exception as e:
+            self._instrucoes_ok = False
             print(f'❌ Erro ao enviar mensagem fixa: {e}')
 
+    @staticmethod
+    def _embed_instrucoes() -> discord.Embed:
+        embed = discord.Embed(
+            title='📋 Como Enviar Comprovante (OBRIGATÓRIO)',
+            description='**1) Use o comando:**\n'
+                       '```!pago <ID-do-pedido> <Plano>```\n'
+                       '   - Plano: **Starter** ou **Profissional**\n\n'
+                       '**2) Valor:** R$X,XX\n\n'
+                       '**3) PIX TXID** (se houver)\n\n'
+                       '**4) Anexe o print do comprovante**\n\n'
+                       '**Exemplo:**\n'
+                       '```!pago 1234 Starter | Valor: R$150,00 | TXID: ABCD1234```\n'
+                       '(anexe imagem)\n\n'
+                       '⏱️ Após enviar, aguarde confirmação. Sua mensagem será removida para segurança.',
+            color=discord.Color.blue()
+        )
+        embed.set_footer(text='Em até 10 min–2h iremos verificar. Não finalize o pedido até receber confirmação.')
+        return embed
+
+    async def _publicar_instrucoes(self, canal: discord.TextChannel):
+        """Edita a mensagem já publicada só se o conteúdo mudou; senão não faz nada"""
+        embed = self._embed_instrucoes()
+        conteudo = hashlib.sha256(json.dumps(embed.to_dict(), sort_keys=True).encode()).hexdigest()
+        chave = f'instrucoes:{canal.id}'
+        salvo = self.bot.estado.obter(chave) or {}
+
+        # 1. Mensagem conhecida: editar só se o texto mudou
+        mensagem = None
+        if salvo.get('mensagem_id'):
+            try:
+                mensagem = await canal.fetch_message(salvo['mensagem_id'])
+            except discord.NotFound:
+                mensagem = None
+
+        if mensagem is not None:
+            if salvo.get('hash') != conteudo:
+                await mensagem.edit(embed=embed)
+                self.bot.estado.definir(chave, {'mensagem_id': mensagem.id, 'hash': conteudo})
+                print("✏️ Mensagem fixa do canal de comprovantes atualizada")
+            return
+
+        # 2. Sem mensagem conhecida: limpar as antigas do bot numa única exclusão em lote
+        limite = discord.utils.utcnow() - timedelta(days=14)
+        antigas = [
+            msg async for msg in canal.history(limit=100)
+            if msg.author == self.bot.user and msg.created_at > limite
+        ]
+        if antigas:
+            await canal.delete_messages(antigas)
+            print(f"🧹 {len(antigas)} mensagens antigas do bot removidas do canal de comprovantes")
+
+        # 3. Publicar, fixar e lembrar o ID
+        mensagem = await canal.send(embed=embed)
+        try:
+            await mensagem.pin()
+        except discord.HTTPException:
+            pass
+        self.bot.estado.definir(chave, {'mensagem_id': mensagem.id, 'hash': conteudo})
+        print("✅ Mensagem fixa enviada no canal de comprovantes!")
+
     @commands.command(name='pago')
+    @admissao('pago')
     async def pago(self, ctx, pedido_id: str = None, plano: str = None, *, mensagem: str = ''):
         """Comando para usuário enviar comprovante de pagamento"""
         
         # 1. Verificar se está no canal correto
         if COMPROVANTES_CHANNEL_ID and ctx.channel.id != COMPROVANTES_CHANNEL_ID:
-            await ctx.send('❌ Use este comando apenas no canal de comprovantes.', delete_after=5)
+            self.bot.exclusoes.agendar(await ctx.send('❌ Use este comando apenas no canal de comprovantes.'), atraso=5)
             return
 
         # 2. Verificar argumentos obrigatórios
         if not pedido_id or not plano:
-            await ctx.send('❌ Uso correto: `!pago <ID-pedido> <Plano>`\nPlano: **Starter** ou **Profissional**', delete_after=10)
+            self.bot.exclusoes.agendar(await ctx.send('❌ Uso correto: `!pago <ID-pedido> <Plano>`\nPlano: **Starter** ou **Profissional**'), atraso=10)
             return
 
         # 3. Validar plano
         plano = plano.capitalize()
         if plano not in ['Starter', 'Profissional']:
-            await ctx.send('❌ Plano inválido. Use: **Starter** ou **Profissional**', delete_after=10)
+            self.bot.exclusoes.agendar(await ctx.send('❌ Plano inválido. Use: **Starter** ou **Profissional**'), atraso=10)
             return
 
         # 4. Verificar se tem anexo (imagem do comprovante)
         if not ctx.message.attachments:
-            await ctx.send('❌ Você precisa anexar o comprovante (imagem).', delete_after=10)
+            self.bot.exclusoes.agendar(await ctx.send('❌ Você precisa anexar o comprovante (imagem ou PDF).'), atraso=10)
             return
 
         # 5. Resposta inicial ao usuário
         msg_resposta = await ctx.send('📥 Comprovante recebido! Aguardando verificação dos moderadores. Em até 10 min–2h vamos checar. Não finalize o pedido até receber confirmação.')
 
         try:
-            # 6. Salvar comprovante localmente
-            attachment = ctx.message.attachments[0]
-            extensao = attachment.filename.split('.')[-1]
+            # 6. Baixar todos os anexos em paralelo (streaming direto para o disco)
             timestamp = datetime.utcnow().timestamp()
-            nome_arquivo = f'{pedido_id}_{ctx.author.id}_{timestamp}.{extensao}'
-            caminho_arquivo = os.path.join(self.comprovantes_dir, nome_arquivo)
-            
-            await attachment.save(caminho_arquivo)
-            print(f"📁 Comprovante salvo: {nome_arquivo}")
+            prefixo = re.sub(r'[^A-Za-z0-9_-]', '', pedido_id) or 'pedido'
+            anexos = []
+            for i, anexo in enumerate(ctx.message.attachments):
+                extensao = re.sub(r'[^a-z0-9]', '', anexo.filename.rsplit('.', 1)[-1].lower()) or 'bin'
+                nome_arquivo = f'{prefixo}_{ctx.author.id}_{timestamp}_{i}.{extensao}'
+                anexos.append((anexo, os.path.join(self.comprovantes_dir, nome_arquivo)))
+
+            salvos, recusas = await self.bot.ingestor.baixar_todos(anexos)
+            if not salvos:
+                await msg_resposta.edit(content='❌ Nenhum anexo válido:\n' + '\n'.join(recusas))
+                self.bot.exclusoes.agendar(ctx.message, msg_resposta, atraso=15)
+                return
+            if recusas:
+                self.bot.exclusoes.agendar(await ctx.send('⚠️ Alguns anexos foram ignorados:\n' + '\n'.join(recusas)), atraso=15)
+
+            # 7. Guardar pelo conteúdo (SHA-256), normalizando imagens novas fora do event loop,
+            #    e procurar o mesmo comprovante em pedidos anteriores
+            caminhos = await asyncio.gather(*(
+                self.bot.blobs.adotar(
+                    destino, sha256, destino.rsplit('.', 1)[-1],
+                    preparar=self.bot.imagens.preparar if (a.content_type or '').startswith('image/') else None
+                )
+                for a, destino, sha256 in salvos
+            ))
+            caminhos = list(dict.fromkeys(caminhos))
+            miniatura = next((caminho_miniatura(c) for c in caminhos if os.path.exists(caminho_miniatura(c))), None)
+            repetidos = await self.bot.blobs.registrar(
+                list(dict.fromkeys(sha256 for _, _, sha256 in salvos)), pedido_id, ctx.author.id
+            )
 
-            # 7. Enviar para canal de moderadores
+            # Envio ao armazenamento em segundo plano; a URI final já vai para o pedido
+            caminho_arquivo = ';'.join(
+                self.bot.armazenamento.agendar(c, os.path.relpath(c, ARMAZENAMENTO_DIR).replace(os.sep, '/'))
+                for c in caminhos
+            )
+            print(f"📁 Comprovante salvo: {len(caminhos)} arquivo(s) para o pedido {pedido_id}")
+            if repetidos:
+                print(f"⚠️ Comprovante do pedido {pedido_id} já apareceu em {len(repetidos)} pedido(s) anterior(es)")
+
+            # 8. Enviar para canal de moderadores
             if MOD_CHANNEL_ID:
                 mod_channel = self.bot.get_channel(MOD_CHANNEL_ID)
                 if mod_channel:
                     embed = discord.Embed(
-                        title='🔔 Novo Comprovante Recebido',
-                        color=discord.Color.gold(),
+                        title='🔔 Novo Comprovante Recebido' if not repetidos else '⚠️ Comprovante Repetido',
+                        color=discord.Color.gold() if not repetidos else discord.Color.red(),
                         timestamp=datetime.utcnow()
                     )
                     embed.add_field(name='Pedido ID', value=pedido_id, inline=True)
@@ -345,24 +637,41 @@ class ComprovanteCog(commands.Cog):
                     if mensagem:
                         embed.add_field(name='Mensagem', value=mensagem, inline=False)
                     
-                    embed.set_image(url=attachment.url)
+                    if repetidos:
+                        linhas = []
+                        for r in repetidos[:5]:
+                            tipo = '🟥 Idêntico' if r['tipo'] == 'idêntico' else f"🟧 Semelhante ({r['distancia']} bits)"
+                            linhas.append(f"{tipo} ao pedido `{r['pedido_id']}` de <@{r['user_id']}>")
+                        if len(repetidos) > 5:
+                            linhas.append(f'... e mais {len(repetidos) - 5}')
+                        embed.add_field(name='Já enviado antes', value='\n'.join(linhas), inline=False)
+
+                    # A miniatura vai junto na mensagem: o link do CDN morre quando o !pago é apagado
+                    arquivo = None
+                    if miniatura:
+                        arquivo = discord.File(miniatura, filename='comprovante.jpg')
+                        embed.set_image(url='attachment://comprovante.jpg')
+                    if len(salvos) > 1 or not miniatura:
+                        embed.add_field(
+                            name='Anexos',
+                            value='\n'.join(f'`{a.filename}`' for a, _, _ in salvos),
+                            inline=False
+                        )
                     embed.set_footer(text=f'Enviado por {ctx.author}', icon_url=ctx.author.avatar.url if ctx.author.avatar else None)
 
-                    # Adicionar botões de aprovação/reprovação
-                    view = VerificationButtons(self.bot, pedido_id, ctx.author.id, plano, caminho_arquivo)
-                    await mod_channel.send(embed=embed, view=view)
+                    # Adicionar botões de aprovação/reprovação (o estado fica no banco local, pelo ID da mensagem)
+                    mensagem_mod = await self.bot.agendador.enviar(
+                        f'canal:{mod_channel.id}:mensagens',
+                        partial(mod_channel.send, embed=embed, view=VerificationButtons.componentes(self.bot),
+                                file=arquivo or discord.utils.MISSING)
+                    )
+                    self.bot.revisoes.guardar(mensagem_mod.id, pedido_id, ctx.author.id, plano, caminho_arquivo)
 
-            # 8. Apagar mensagens após 3 segundos (sigilo)
-            await asyncio.sleep(3)
-            try:
-                await ctx.message.delete()
-                await msg_resposta.delete()
-                print(f"🗑️ Mensagens apagadas para sigilo (Pedido: {pedido_id})")
-            except:
-                pass
+            # 9. Apagar mensagens após 3 segundos (sigilo)
+            self.bot.exclusoes.agendar(ctx.message, msg_resposta, atraso=3)
 
         except Exception as e:
-            await ctx.send(f'❌ Erro ao processar comprovante: {str(e)}', delete_after=10)
+            self.bot.exclusoes.agendar(await ctx.send(f'❌ Erro ao processar comprovante: {str(e)}'), atraso=10)
             print(f"❌ Erro no comando pago: {e}")
 
 async def setup(bot):
@@ -1,10 +1,28 @@
 import discord
 from discord.ext import commands
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from functools import partial
+import asyncio
 import os
+import shutil
+import tempfile
+
+from core.admissao import admissao
+from core.agendador import Prioridade
+from core.exportacao import FORMATOS, ExportadorPedidos
+from core.pipeline import Pipeline
 
 MOD_ROLE_ID = int(os.getenv('MOD_ROLE_ID', 0))
 LOG_CHANNEL_ID = int(os.getenv('LOG_CHANNEL_ID', 0))
+PEDIDOS_POR_PAGINA = 10
+
+# Só o que a listagem mostra (e o que o cursor precisa)
+COLUNAS_LISTAGEM = ('id', 'pedido_id', 'user_id', 'pedido_number', 'plano', 'status', 'canal_id', 'timestamp')
+STATUS_EMOJI = {
+    'aceito': '✅',
+    'reprovado': '❌',
+    'fechado': '🔒'
+}
 
 class PedidosCog(commands.Cog):
     """Cog para gerenciar pedidos (comandos extras)"""
@@ -13,6 +31,7 @@ class PedidosCog(commands.Cog):
         self.bot = bot
 
     @commands.command(name='statuspag', aliases=['status'])
+    @admissao('statuspag')
     async def statuspag(self, ctx, pedido_id: str = None):
         """Verifica o status de um pedido pelo ID"""
         
@@ -26,12 +45,12 @@ class PedidosCog(commands.Cog):
             return
 
         try:
-            supabase = self.bot.supabase
+            db = self.bot.db
             
             # Buscar pedido no Supabase
-            result = supabase.table('pedidos').select('*').eq('pedido_id', pedido_id).execute()
+            pedido = await db.buscar_pedido(pedido_id)
             
-            if not result.data:
+            if not pedido:
                 embed = discord.Embed(
                     title="❌ Pedido Não Encontrado",
                     description=f'Nenhum pedido encontrado com ID: `{pedido_id}`',
@@ -39,8 +58,6 @@ class PedidosCog(commands.Cog):
                 )
                 await ctx.send(embed=embed)
                 return
-
-            pedido = result.data[0]
             
             # Definir cor baseada no status
             cores = {
@@ -114,12 +131,12 @@ class PedidosCog(commands.Cog):
             return
 
         try:
-            supabase = self.bot.supabase
+            db = self.bot.db
             
             # Buscar pedido
-            result = supabase.table('pedidos').select('*').eq('pedido_id', pedido_id).execute()
+            pedido = await db.buscar_pedido(pedido_id)
             
-            if not result.data:
+            if not pedido:
                 embed = discord.Embed(
                     title="❌ Pedido Não Encontrado",
                     description=f'Nenhum pedido encontrado com ID: `{pedido_id}`',
@@ -127,8 +144,6 @@ class PedidosCog(commands.Cog):
                 )
                 await ctx.send(embed=embed)
                 return
-
-            pedido = result.data[0]
             
             # Verificar se o pedido está aceito
             if pedido['status'] != 'aceito':
@@ -140,58 +155,82 @@ class PedidosCog(commands.Cog):
                 await ctx.send(embed=embed)
                 return
 
-            # Atualizar status no Supabase
-            supabase.table('pedidos').update({
-                'status': 'fechado',
-                'fechado_em': datetime.utcnow().isoformat(),
-                'fechado_por': ctx.author.id
-            }).eq('pedido_id', pedido_id).execute()
+            canal = ctx.guild.get_channel(pedido['canal_id']) if pedido['canal_id'] else None
+            agendador = self.bot.agendador
 
-            # Arquivar canal
-            if pedido['canal_id']:
-                canal = ctx.guild.get_channel(pedido['canal_id'])
+            async def salvar(_):
+                # Atualizar status no banco
+                await db.atualizar_pedido(pedido_id, {
+                    'status': 'fechado',
+                    'fechado_em': datetime.now(timezone.utc).isoformat(),
+                    'fechado_por': ctx.author.id
+                })
+
+            async def arquivar_canal(_):
+                # Renomear canal para indicar arquivamento (limite do Discord: 2 renomeações a cada 10 min)
                 if canal:
-                    try:
-                        # Renomear canal para indicar arquivamento
+                    async def renomear():
                         await canal.edit(name=f"arquivado-{canal.name}")
-                        
-                        # Enviar mensagem de encerramento no canal
-                        embed_canal = discord.Embed(
-                            title='🔒 Pedido Fechado',
-                            description=f'Este pedido foi fechado por {ctx.author.mention}.\n\n'
-                                       f'O canal ficará arquivado para registro.',
-                            color=discord.Color.orange(),
-                            timestamp=datetime.utcnow()
-                        )
-                        await canal.send(embed=embed_canal)
                         print(f"📦 Canal arquivado: {canal.name}")
-                    except Exception as e:
-                        print(f"❌ Erro ao arquivar canal: {e}")
-
-            # Log no canal de logs
-            if LOG_CHANNEL_ID:
-                log_channel = ctx.guild.get_channel(LOG_CHANNEL_ID)
-                if log_channel:
-                    embed_log = discord.Embed(
+
+                    agendador.disparar(
+                        f'canal_nome:{canal.id}', renomear,
+                        prioridade=Prioridade.ARQUIVAMENTO,
+                        chave=f'canal_nome:{canal.id}'
+                    )
+
+            async def avisar_canal(_):
+                # Enviar mensagem de encerramento no canal
+                if canal:
+                    embed_canal = discord.Embed(
                         title='🔒 Pedido Fechado',
+                        description=f'Este pedido foi fechado por {ctx.author.mention}.\n\n'
+                                   f'O canal ficará arquivado para registro.',
                         color=discord.Color.orange(),
                         timestamp=datetime.utcnow()
                     )
-                    embed_log.add_field(name='Pedido ID', value=pedido_id, inline=True)
-                    embed_log.add_field(name='Número', value=f"#{pedido['pedido_number']}", inline=True)
-                    embed_log.add_field(name='Plano', value=pedido['plano'], inline=True)
-                    embed_log.add_field(name='Fechado por', value=ctx.author.mention, inline=True)
-                    await log_channel.send(embed=embed_log)
+                    await agendador.enviar(f'canal:{canal.id}:mensagens', partial(canal.send, embed=embed_canal))
 
-            # Resposta de sucesso
-            embed = discord.Embed(
-                title='✅ Pedido Fechado',
-                description=f'Pedido `{pedido_id}` fechado com sucesso!',
-                color=discord.Color.green()
+            async def registrar_log(_):
+                # Log no canal de logs
+                if LOG_CHANNEL_ID:
+                    log_channel = ctx.guild.get_channel(LOG_CHANNEL_ID)
+                    if log_channel:
+                        embed_log = discord.Embed(
+                            title='🔒 Pedido Fechado',
+                            color=discord.Color.orange(),
+                            timestamp=datetime.utcnow()
+                        )
+                        embed_log.add_field(name='Pedido ID', value=pedido_id, inline=True)
+                        embed_log.add_field(name='Número', value=f"#{pedido['pedido_number']}", inline=True)
+                        embed_log.add_field(name='Plano', value=pedido['plano'], inline=True)
+                        embed_log.add_field(name='Fechado por', value=ctx.author.mention, inline=True)
+                        agendador.disparar(f'canal:{log_channel.id}:mensagens', partial(log_channel.send, embed=embed_log))
+
+            async def responder(_):
+                # Resposta de sucesso
+                embed = discord.Embed(
+                    title='✅ Pedido Fechado',
+                    description=f'Pedido `{pedido_id}` fechado com sucesso!',
+                    color=discord.Color.green()
+                )
+                embed.add_field(name='Número', value=f"#{pedido['pedido_number']}", inline=True)
+                embed.add_field(name='Plano', value=pedido['plano'], inline=True)
+                await ctx.send(embed=embed)
+
+            # O banco confirma primeiro; arquivar, avisar, logar e responder rodam em paralelo depois
+            resultados = await (
+                Pipeline('fechamento')
+                .etapa('salvar', salvar)
+                .etapa('arquivar_canal', arquivar_canal, depende_de=('salvar',))
+                .etapa('avisar_canal', avisar_canal, depende_de=('salvar',))
+                .etapa('registrar_log', registrar_log, depende_de=('salvar',))
+                .etapa('responder', responder, depende_de=('salvar',))
+                .executar()
             )
-            embed.add_field(name='Número', value=f"#{pedido['pedido_number']}", inline=True)
-            embed.add_field(name='Plano', value=pedido['plano'], inline=True)
-            await ctx.send(embed=embed)
+            if not resultados['salvar'].ok:
+                raise resultados['salvar'].erro
+            self.bot.estatisticas.registrar_fechamento(pedido['plano'])
 
         except Exception as e:
             embed = discord.Embed(
@@ -208,21 +247,32 @@ class PedidosCog(commands.Cog):
         """Mostra o último número sequencial usado (somente moderadores)"""
         
         try:
-            supabase = self.bot.supabase
-            result = supabase.table('contador').select('ultimo_numero').execute()
+            db = self.bot.db
+            alocador = self.bot.alocador
+
+            # Marca d'água reservada (contador) e usada (maior número gravado) em paralelo
+            reservado, usado = await asyncio.gather(
+                db.obter_ultimo_numero(),
+                db.obter_maior_numero_usado()
+            )
             
             embed = discord.Embed(
                 title='🔢 Contador de Pedidos',
                 color=discord.Color.blue()
             )
             
-            if result.data:
-                numero = result.data[0]['ultimo_numero']
-                embed.description = f'**Último número usado:** {numero}\n**Próximo pedido será:** #{numero + 1}'
+            if reservado is not None:
+                proximo = alocador.proximo_local or reservado + 1
+                embed.description = (
+                    f'**Último número reservado:** {reservado}\n'
+                    f'**Último número usado:** {usado if usado is not None else "nenhum"}\n'
+                    f'**Livres no bloco local:** {alocador.livres} (bloco de {alocador.bloco})\n'
+                    f'**Próximo pedido será:** #{proximo}'
+                )
             else:
                 embed.description = 'Nenhum pedido aprovado ainda.\n**Próximo pedido será:** #1'
             
-            embed.set_footer(text=f"Consultado por {ctx.author}")
+            embed.set_footer(text=f"Consultado por {ctx.author} | {db.espelho.descrever_defasagem()}")
             await ctx.send(embed=embed)
 
         except Exception as e:
@@ -236,13 +286,17 @@ class PedidosCog(commands.Cog):
 
     @commands.command(name='listarpedidos', aliases=['pedidos', 'listar'])
     @commands.has_permissions(administrator=True)
-    async def listarpedidos(self, ctx, status: str = None):
-        """Lista pedidos por status (somente moderadores)"""
+    async def listarpedidos(self, ctx, status: str = None, *filtros: str):
+        """Lista pedidos por status, com filtros e páginas (somente moderadores)
+
+        Filtros opcionais: `plano:Starter`, `mod:@moderador`, `de:AAAA-MM-DD`, `ate:AAAA-MM-DD`
+        """
         
         try:
-            supabase = self.bot.supabase
-            
             # Buscar pedidos
+            if status and ':' in status:
+                filtros = (status, *filtros)
+                status = None
             if status:
                 status = status.lower()
                 if status not in ['aceito', 'reprovado', 'fechado']:
@@ -253,12 +307,23 @@ class PedidosCog(commands.Cog):
                     )
                     await ctx.send(embed=embed)
                     return
-                
-                result = supabase.table('pedidos').select('*').eq('status', status).order('timestamp', desc=True).limit(10).execute()
-            else:
-                result = supabase.table('pedidos').select('*').order('timestamp', desc=True).limit(10).execute()
+
+            try:
+                consulta = interpretar_filtros(filtros)
+            except ValueError as e:
+                embed = discord.Embed(
+                    title="❌ Filtro Inválido",
+                    description=f'{e}\n\n**Exemplo:**\n```!listarpedidos aceito plano:Starter mod:@Fulano de:2024-01-01 ate:2024-02-01```',
+                    color=discord.Color.red()
+                )
+                await ctx.send(embed=embed)
+                return
+            consulta['status'] = status
+
+            paginas = PaginaPedidos(self.bot.db, ctx.author.id, consulta)
+            pedidos = await paginas.carregar(0)
             
-            if not result.data:
+            if not pedidos:
                 embed = discord.Embed(
                     title='📋 Lista de Pedidos',
                     description='Nenhum pedido encontrado.',
@@ -266,50 +331,9 @@ class PedidosCog(commands.Cog):
                 )
                 await ctx.send(embed=embed)
                 return
-            
-            # Criar embed
-            embed = discord.Embed(
-                title=f'📋 Lista de Pedidos ({len(result.data)})',
-                color=discord.Color.blue()
-            )
-            
-            if status:
-                embed.description = f'Filtro: **{status.upper()}**'
-            
-            # Adicionar pedidos ao embed
-            for pedido in result.data[:10]:
-                status_emoji = {
-                    'aceito': '✅',
-                    'reprovado': '❌',
-                    'fechado': '🔒'
-                }
-                emoji = status_emoji.get(pedido['status'], '❓')
-                
-                numero_str = f"#{pedido['pedido_number']}" if pedido['pedido_number'] else "N/A"
-                
-                user = ctx.guild.get_member(pedido['user_id'])
-                user_str = user.mention if user else f"ID: {pedido['user_id']}"
-                
-                valor = f"{emoji} **{pedido['status'].upper()}** | {numero_str}\n"
-                valor += f"Cliente: {user_str}\n"
-                valor += f"Plano: **{pedido['plano']}**\n"
-                
-                if pedido['canal_id']:
-                    canal = ctx.guild.get_channel(pedido['canal_id'])
-                    if canal:
-                        valor += f"Canal: {canal.mention}\n"
-                
-                data = datetime.fromisoformat(pedido['timestamp']).strftime('%d/%m/%Y %H:%M')
-                valor += f"Data: {data}"
-                
-                embed.add_field(
-                    name=f"Pedido {pedido['pedido_id']}",
-                    value=valor,
-                    inline=False
-                )
-            
-            embed.set_footer(text=f"Consultado por {ctx.author} | Mostrando últimos 10 pedidos")
-            await ctx.send(embed=embed)
+
+            paginas.mensagem = await ctx.send(embed=paginas.montar_embed(ctx.author), view=paginas)
+            paginas.prebuscar()
 
         except Exception as e:
             embed = discord.Embed(
@@ -320,5 +344,275 @@ class PedidosCog(commands.Cog):
             await ctx.send(embed=embed)
             print(f"❌ Erro no comando listarpedidos: {e}")
 
+
+    @commands.command(name='exportarpedidos', aliases=['exportar'])
+    @commands.has_permissions(administrator=True)
+    async def exportarpedidos(self, ctx, status: str = None, desde: str = None, ate: str = None, formato: str = 'csv'):
+        """Exporta o histórico de pedidos em CSV/JSONL comprimido (somente moderadores)"""
+
+        # 1. Validar argumentos (`todos` pula o filtro de status)
+        try:
+            status = None if not status or status.lower() == 'todos' else status.lower()
+            if status and status not in ['aceito', 'reprovado', 'fechado']:
+                raise ValueError('Status válidos: **aceito**, **reprovado**, **fechado** ou **todos**')
+            consulta = interpretar_filtros(tuple(f'{chave}:{valor}' for chave, valor in (('de', desde), ('ate', ate)) if valor))
+            formato = formato.lower()
+            if formato not in FORMATOS:
+                raise ValueError(f'Formato inválido: use {" ou ".join(FORMATOS)}')
+        except ValueError as e:
+            embed = discord.Embed(
+                title="❌ Erro",
+                description=f'{e}\n\n**Uso correto:**\n```!exportarpedidos [status|todos] [AAAA-MM-DD] [AAAA-MM-DD] [csv|jsonl]```',
+                color=discord.Color.red()
+            )
+            await ctx.send(embed=embed)
+            return
+
+        aviso = await ctx.send('⏳ Gerando exportação...')
+        pasta = tempfile.mkdtemp(prefix='exportacao_')
+        try:
+            # 2. Gerar as partes, cada uma abaixo do limite de upload do servidor
+            exportador = ExportadorPedidos(self.bot.db, pasta, formato=formato, limite_bytes=ctx.guild.filesize_limit)
+            prefixo = f"pedidos-{status or 'todos'}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}"
+            partes = await exportador.exportar(prefixo, status=status, **consulta)
+
+            # 3. Enviar (até 10 anexos por mensagem)
+            for inicio in range(0, len(partes), 10):
+                arquivos = [discord.File(caminho) for caminho in partes[inicio:inicio + 10]]
+                await ctx.send(files=arquivos)
+
+            resumo = f'✅ Exportação concluída: {exportador.registros} pedidos em {len(partes)} arquivo(s).'
+            if exportador.pendentes_outbox:
+                resumo += f'\n⚠️ {exportador.pendentes_outbox} escrita(s) ainda não enviada(s) ao Supabase ficaram de fora.'
+            await aviso.edit(content=resumo)
+            print(f"📤 Exportação de {exportador.registros} pedidos por {ctx.author} ({len(partes)} parte(s))")
+
+        except Exception as e:
+            await aviso.edit(content=f'❌ Erro ao exportar pedidos: {str(e)}')
+            print(f"❌ Erro no comando exportarpedidos: {e}")
+        finally:
+            shutil.rmtree(pasta, ignore_errors=True)
+
+    @commands.command(name='estatisticas', aliases=['stats'])
+    @commands.has_permissions(administrator=True)
+    async def estatisticas(self, ctx, periodo: str = '30d'):
+        """Taxa de aprovação, volume por plano e tempo de decisão por moderador (somente moderadores)"""
+
+        # 1. Interpretar o período: hoje, Nd (ex.: 7d, 30d) ou total
+        periodo = periodo.lower()
+        if periodo == 'hoje':
+            dias, titulo = 1, 'hoje'
+        elif periodo == 'total':
+            dias, titulo = None, 'todo o histórico'
+        elif periodo.endswith('d') and periodo[:-1].isdigit() and int(periodo[:-1]) > 0:
+            dias, titulo = int(periodo[:-1]), f'últimos {periodo[:-1]} dias'
+        else:
+            embed = discord.Embed(
+                title="❌ Período Inválido",
+                description='**Uso correto:**\n```!estatisticas [hoje|7d|30d|total]```',
+                color=discord.Color.red()
+            )
+            await ctx.send(embed=embed)
+            return
+
+        # 2. Somar os contadores diários (sem consultar a tabela de pedidos)
+        resumo = self.bot.estatisticas.resumo(dias)
+        totais = resumo['totais']
+        taxa = resumo['taxa_aprovacao']
+
+        embed = discord.Embed(
+            title=f'📊 Estatísticas — {titulo}',
+            color=discord.Color.blue(),
+            timestamp=datetime.utcnow()
+        )
+        embed.add_field(name='✅ Aprovados', value=str(totais['aprovado']), inline=True)
+        embed.add_field(name='❌ Reprovados', value=str(totais['reprovado']), inline=True)
+        embed.add_field(name='🔒 Fechados', value=str(totais['fechado']), inline=True)
+        embed.add_field(name='📈 Taxa de aprovação', value=f'{taxa:.1%}' if taxa is not None else '—', inline=False)
+
+        # 3. Volume por plano
+        if resumo['planos']:
+            linhas = [
+                f"**{plano}:** {c['aprovado']} ✅ · {c['reprovado']} ❌ · {c['fechado']} 🔒"
+                for plano, c in sorted(resumo['planos'].items())
+            ]
+            embed.add_field(name='📦 Por plano', value='\n'.join(linhas), inline=False)
+
+        # 4. Moderadores, dos que mais decidiram para os que menos
+        if resumo['moderadores']:
+            ordem = sorted(
+                resumo['moderadores'].items(), key=lambda item: item[1]['aprovado'] + item[1]['reprovado'], reverse=True
+            )
+            linhas = []
+            for moderador_id, m in ordem[:10]:
+                tempo = formatar_duracao(m['tempo_medio_s']) if m['tempo_medio_s'] is not None else '—'
+                linhas.append(f"<@{moderador_id}>: {m['aprovado']} ✅ · {m['reprovado']} ❌ · ⏱️ {tempo}")
+            embed.add_field(name='👮 Moderadores (tempo médio de decisão)', value='\n'.join(linhas), inline=False)
+
+        reconciliado = resumo['reconciliado_em']
+        sincronia = f"Reconciliado em {reconciliado[:16].replace('T', ' ')} UTC" if reconciliado else 'Ainda não reconciliado'
+        embed.set_footer(text=f"Consultado por {ctx.author} | {sincronia}")
+        await ctx.send(embed=embed)
+
+
+def formatar_duracao(segundos: float) -> str:
+    """`95` → `1min 35s`; `7300` → `2h 1min`"""
+    minutos, segundos = divmod(int(segundos), 60)
+    horas, minutos = divmod(minutos, 60)
+    if horas:
+        return f'{horas}h {minutos}min'
+    if minutos:
+        return f'{minutos}min {segundos}s'
+    return f'{segundos}s'
+
+
+def interpretar_filtros(filtros: tuple) -> dict:
+    """Converte `chave:valor` do comando nos argumentos de `listar_pedidos`"""
+    consulta = {}
+    for filtro in filtros:
+        chave, _, valor = filtro.partition(':')
+        chave = chave.lower()
+        if not valor:
+            raise ValueError(f'Filtro sem valor: `{filtro}`')
+        if chave == 'plano':
+            consulta['plano'] = valor.capitalize()
+        elif chave in ('mod', 'moderador'):
+            numero = valor.strip('<@!>')
+            if not numero.isdigit():
+                raise ValueError(f'Moderador inválido: `{valor}` (mencione ou use o ID)')
+            consulta['moderador_id'] = int(numero)
+        elif chave in ('de', 'desde', 'ate', 'até'):
+            try:
+                data = datetime.strptime(valor, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+            except ValueError:
+                raise ValueError(f'Data inválida: `{valor}` (use AAAA-MM-DD)')
+            if chave in ('de', 'desde'):
+                consulta['desde'] = data.isoformat()
+            else:
+                # Inclusivo: até o fim do dia informado
+                consulta['ate'] = (data + timedelta(days=1)).isoformat()
+        else:
+            raise ValueError(f'Filtro desconhecido: `{chave}`')
+    return consulta
+
+
+class PaginaPedidos(discord.ui.View):
+    """Navegação por páginas com cursor (timestamp, id); a próxima página é buscada enquanto esta é lida"""
+
+    def __init__(self, db, autor_id: int, consulta: dict, por_pagina: int = PEDIDOS_POR_PAGINA):
+        super().__init__(timeout=300)
+        self.db = db
+        self.autor_id = autor_id
+        self.consulta = consulta
+        self.por_pagina = por_pagina
+        self.mensagem: discord.Message | None = None
+        self.pagina = 0
+        # Cursor de início de cada página já vista e as páginas em cache (voltar não consulta de novo)
+        self._cursores: list[tuple | None] = [None]
+        self._paginas: dict[int, list[dict]] = {}
+        self._prebusca: asyncio.Task | None = None
+
+    async def _buscar(self, cursor: tuple | None) -> list[dict]:
+        # Um a mais que a página: diz se existe próxima sem outra consulta
+        return await self.db.listar_pedidos(
+            limite=self.por_pagina + 1, colunas=COLUNAS_LISTAGEM, cursor=cursor, **self.consulta
+        )
+
+    async def carregar(self, pagina: int) -> list[dict]:
+        if pagina not in self._paginas:
+            linhas = None
+            if pagina == self.pagina + 1 and self._prebusca is not None:
+                try:
+                    linhas = await self._prebusca
+                except Exception:
+                    linhas = None
+            if linhas is None:
+                linhas = await self._buscar(self._cursores[pagina])
+            self._paginas[pagina] = linhas
+            if len(linhas) > self.por_pagina and len(self._cursores) == pagina + 1:
+                ultimo = linhas[self.por_pagina - 1]
+                self._cursores.append((ultimo['timestamp'], ultimo['id']))
+
+        self.pagina = pagina
+        self.anterior.disabled = pagina == 0
+        self.proxima.disabled = len(self._paginas[pagina]) <= self.por_pagina
+        return self._paginas[pagina][:self.por_pagina]
+
+    def prebuscar(self):
+        """Dispara a busca da página seguinte em segundo plano"""
+        self._prebusca = None
+        seguinte = self.pagina + 1
+        if seguinte < len(self._cursores) and seguinte not in self._paginas:
+            self._prebusca = asyncio.create_task(self._buscar(self._cursores[seguinte]))
+
+    def montar_embed(self, autor) -> discord.Embed:
+        pedidos = self._paginas[self.pagina][:self.por_pagina]
+        embed = discord.Embed(
+            title=f'📋 Lista de Pedidos — página {self.pagina + 1}',
+            color=discord.Color.blue()
+        )
+
+        descricao = []
+        if self.consulta.get('status'):
+            descricao.append(f"Filtro: **{self.consulta['status'].upper()}**")
+        if self.consulta.get('plano'):
+            descricao.append(f"Plano: **{self.consulta['plano']}**")
+        if self.consulta.get('moderador_id'):
+            descricao.append(f"Moderador: <@{self.consulta['moderador_id']}>")
+        if self.consulta.get('desde') or self.consulta.get('ate'):
+            de = self.consulta['desde'][:10] if self.consulta.get('desde') else '…'
+            ate = (datetime.fromisoformat(self.consulta['ate']) - timedelta(days=1)).strftime('%Y-%m-%d') \
+                if self.consulta.get('ate') else '…'
+            descricao.append(f'Período: {de} → {ate}')
+        if descricao:
+            embed.description = ' | '.join(descricao)
+
+        # Menções em vez de get_member/get_channel: o Discord resolve na exibição
+        for pedido in pedidos:
+            emoji = STATUS_EMOJI.get(pedido['status'], '❓')
+            numero_str = f"#{pedido['pedido_number']}" if pedido['pedido_number'] else "N/A"
+
+            valor = f"{emoji} **{pedido['status'].upper()}** | {numero_str}\n"
+            valor += f"Cliente: <@{pedido['user_id']}>\n"
+            valor += f"Plano: **{pedido['plano']}**\n"
+            if pedido['canal_id']:
+                valor += f"Canal: <#{pedido['canal_id']}>\n"
+            if pedido['timestamp']:
+                data = datetime.fromisoformat(pedido['timestamp']).strftime('%d/%m/%Y %H:%M')
+                valor += f"Data: {data}"
+
+            embed.add_field(name=f"Pedido {pedido['pedido_id']}", value=valor, inline=False)
+
+        embed.set_footer(text=f"Consultado por {autor} | {len(pedidos)} pedidos nesta página | {self.db.espelho.descrever_defasagem()}")
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.autor_id:
+            await interaction.response.send_message('❌ Só quem pediu a lista pode navegar nela.', ephemeral=True)
+            return False
+        return True
+
+    async def _mostrar(self, interaction: discord.Interaction, pagina: int):
+        await self.carregar(pagina)
+        await interaction.response.edit_message(embed=self.montar_embed(interaction.user), view=self)
+        self.prebuscar()
+
+    @discord.ui.button(label='◀️ Anterior', style=discord.ButtonStyle.secondary, disabled=True)
+    async def anterior(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._mostrar(interaction, self.pagina - 1)
+
+    @discord.ui.button(label='Próxima ▶️', style=discord.ButtonStyle.secondary)
+    async def proxima(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._mostrar(interaction, self.pagina + 1)
+
+    async def on_timeout(self):
+        if self._prebusca:
+            self._prebusca.cancel()
+        if self.mensagem:
+            try:
+                await self.mensagem.edit(view=None)
+            except discord.HTTPException:
+                pass
+
 async def setup(bot):
     await bot.add_cog(PedidosCog(bot))
\ No newline at end of file
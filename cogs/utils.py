@@ -38,7 +38,9 @@ class UtilsCog(commands.Cog):
                 name='🛡️ Comandos para Moderadores',
                 value='`!fecharpedido <ID-pedido>` - Fechar e arquivar um pedido\n'
                       '`!ultimonumero` - Ver último número sequencial usado\n'
-                      '`!listarpedidos [status]` - Listar pedidos (aceito/reprovado/fechado)\n'
+                      '`!listarpedidos [status] [plano:X] [mod:@mod] [de:AAAA-MM-DD] [ate:AAAA-MM-DD]` - Listar pedidos com páginas\n'
+                      '`!exportarpedidos [status|todos] [desde] [ate] [csv|jsonl]` - Exportar histórico (arquivo .gz)\n'
+                      '`!estatisticas [hoje|7d|30d|total]` - Aprovação, planos e tempo de decisão\n'
                       '**Obs:** Aprovação/reprovação é feita via botões no canal de moderação',
                 inline=False
             )
@@ -0,0 +1 @@
+"""Serviços compartilhados entre o bot e os cogs"""
@@ -0,0 +1,161 @@
+"""Controle de admissão dos comandos caros (baldes de tokens por usuário, canal e global)"""
+import os
+import time
+from collections import OrderedDict
+
+from discord.ext import commands
+
+# "capacidade/janela em segundos": a capacidade é a rajada aceita, reposta aos poucos ao longo da janela
+LIMITES_PADRAO = {
+    'pago': {'usuario': '3/60', 'canal': '10/60', 'global': '30/60'},
+    'statuspag': {'usuario': '5/30', 'canal': '20/60', 'global': '60/60'},
+}
+# Profundidade máxima de cada fila antes de recusar trabalho novo
+ADMISSAO_FILA_AGENDADOR = int(os.getenv('ADMISSAO_FILA_AGENDADOR', 200))
+ADMISSAO_FILA_OUTBOX = int(os.getenv('ADMISSAO_FILA_OUTBOX', 500))
+ADMISSAO_FILA_ARMAZENAMENTO = int(os.getenv('ADMISSAO_FILA_ARMAZENAMENTO', 50))
+ADMISSAO_ESPERA_SOBRECARGA = float(os.getenv('ADMISSAO_ESPERA_SOBRECARGA', 30))
+# Ler as filas pode custar (COUNT no outbox): uma leitura vale por esse tempo
+ADMISSAO_LEITURA_FILAS = float(os.getenv('ADMISSAO_LEITURA_FILAS', 1))
+
+
+def _limite(comando: str, escopo: str) -> tuple[float, float]:
+    """`ADMISSAO_PAGO_USUARIO=3/60` → (capacidade 3, 3 tokens a cada 60 s)"""
+    valor = os.getenv(f'ADMISSAO_{comando.upper()}_{escopo.upper()}', LIMITES_PADRAO[comando][escopo])
+    capacidade, _, janela = valor.partition('/')
+    capacidade = float(capacidade)
+    return capacidade, capacidade / float(janela)
+
+
+class AdmissaoNegada(commands.CheckFailure):
+    """Comando recusado; `espera` é quanto falta (em segundos) para valer a pena tentar de novo"""
+
+    def __init__(self, motivo: str, espera: float):
+        super().__init__(f'{motivo}: tente de novo em {espera:.0f}s')
+        self.motivo = motivo
+        self.espera = espera
+
+
+class BaldesTokens:
+    """Um balde por chave, reabastecido preguiçosamente: cada consulta é O(1)
+
+    Só é guardado quem consumiu tokens recentemente. Um balde parado por
+    `capacidade / taxa` segundos já estaria cheio de novo, igual a um balde
+    novo, então é descartado; como a ordem é a do último uso, os parados
+    estão sempre no começo e saem em O(1) amortizado.
+    """
+
+    def __init__(self, capacidade: float, taxa: float):
+        self.capacidade = capacidade
+        self.taxa = taxa
+        self.tempo_cheio = capacidade / taxa
+        self._baldes: OrderedDict[object, tuple[float, float]] = OrderedDict()
+
+    def __len__(self):
+        return len(self._baldes)
+
+    def _expirar(self, agora: float):
+        while self._baldes:
+            chave, (_, atualizado_em) = next(iter(self._baldes.items()))
+            if agora - atualizado_em < self.tempo_cheio:
+                break
+            del self._baldes[chave]
+
+    def disponivel(self, chave, agora: float) -> float:
+        """Tokens no balde agora"""
+        self._expirar(agora)
+        entrada = self._baldes.get(chave)
+        if entrada is None:
+            return self.capacidade
+        tokens, atualizado_em = entrada
+        return min(self.capacidade, tokens + (agora - atualizado_em) * self.taxa)
+
+    def espera(self, chave, agora: float) -> float:
+        """Segundos até haver um token (0 se já há)"""
+        return max(0.0, (1 - self.disponivel(chave, agora)) / self.taxa)
+
+    def consumir(self, chave, agora: float):
+        self._baldes[chave] = (self.disponivel(chave, agora) - 1, agora)
+        self._baldes.move_to_end(chave)
+
+
+class ControleAdmissao:
+    """Decide se um `!pago`/`!statuspag` roda agora, e senão, em quanto tempo tentar de novo
+
+    Três baldes por comando (usuário, canal e global); o pedido só consome
+    tokens se passar em todos, para uma recusa no global não gastar a cota
+    do usuário. Antes dos baldes, se alguma fila interna (ações do Discord,
+    outbox, uploads) estiver funda demais, o comando é recusado sem tocar em
+    nenhum balde.
+    """
+
+    def __init__(self, bot, comandos: tuple = tuple(LIMITES_PADRAO)):
+        self.bot = bot
+        self._baldes = {
+            comando: {escopo: BaldesTokens(*_limite(comando, escopo)) for escopo in ('usuario', 'canal', 'global')}
+            for comando in comandos
+        }
+        self._filas_lidas_em = float('-inf')
+        self._sobrecarga: str | None = None
+
+        # Métricas
+        self.admitidos = 0
+        self.negados: dict[str, int] = {}
+
+    def _filas_cheias(self, agora: float) -> str | None:
+        """Nome da primeira fila acima do limite (leitura reaproveitada por `ADMISSAO_LEITURA_FILAS`)"""
+        if agora - self._filas_lidas_em < ADMISSAO_LEITURA_FILAS:
+            return self._sobrecarga
+
+        bot = self.bot
+        filas = [
+            ('agendador', bot.agendador.profundidade, ADMISSAO_FILA_AGENDADOR),
+            ('armazenamento', bot.armazenamento.metricas()['pendentes'], ADMISSAO_FILA_ARMAZENAMENTO),
+        ]
+        if bot.db and bot.db.outbox:
+            filas.append(('outbox', bot.db.outbox.metricas()['pendentes'], ADMISSAO_FILA_OUTBOX))
+        self._sobrecarga = next((nome for nome, profundidade, limite in filas if profundidade > limite), None)
+        self._filas_lidas_em = agora
+        return self._sobrecarga
+
+    def verificar(self, comando: str, user_id: int, canal_id: int):
+        """Consome os tokens ou levanta `AdmissaoNegada`"""
+        agora = time.monotonic()
+
+        fila = self._filas_cheias(agora)
+        if fila:
+            self._negar(f'sobrecarga:{fila}')
+            raise AdmissaoNegada('sobrecarga', ADMISSAO_ESPERA_SOBRECARGA)
+
+        baldes = self._baldes[comando]
+        chaves = {'usuario': user_id, 'canal': canal_id, 'global': None}
+        espera, escopo = max((baldes[e].espera(chaves[e], agora), e) for e in chaves)
+        if espera > 0:
+            self._negar(escopo)
+            raise AdmissaoNegada(escopo, espera)
+
+        for e, chave in chaves.items():
+            baldes[e].consumir(chave, agora)
+        self.admitidos += 1
+
+    def _negar(self, motivo: str):
+        self.negados[motivo] = self.negados.get(motivo, 0) + 1
+
+    def metricas(self) -> dict:
+        return {
+            'admitidos': self.admitidos,
+            'negados': dict(self.negados),
+            'baldes_ativos': {
+                comando: {escopo: len(b) for escopo, b in baldes.items()}
+                for comando, baldes in self._baldes.items()
+            },
+            'sobrecarga': self._sobrecarga,
+        }
+
+
+def admissao(comando: str):
+    """Check de comando: `@admissao('pago')` logo abaixo do `@commands.command`"""
+    async def predicado(ctx) -> bool:
+        ctx.bot.admissao.verificar(comando, ctx.author.id, ctx.channel.id)
+        return True
+    return commands.check(predicado)
@@ -0,0 +1,207 @@
+"""Agendador das chamadas REST ao Discord, organizado por bucket de rota"""
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import deque
+from enum import IntEnum
+
+AGENDADOR_WORKERS = int(os.getenv('AGENDADOR_WORKERS', 4))
+
+# Limites conhecidos que o discord.py só descobre depois de esgotar (prefixo da rota → (chamadas, janela em s))
+LIMITES_ROTA = {
+    'canal_nome': (2, 600.0),
+}
+
+
+class Prioridade(IntEnum):
+    """Menor valor sai primeiro"""
+    RESPOSTA = 0
+    NOTIFICACAO = 1
+    LOG = 2
+    ARQUIVAMENTO = 3
+
+
+class _Acao:
+    __slots__ = ('rota', 'prioridade', 'seq', 'funcao', 'futuro', 'chave', 'criada_em', 'iniciada')
+
+    def __init__(self, rota, prioridade, seq, funcao, chave):
+        self.rota = rota
+        self.prioridade = prioridade
+        self.seq = seq
+        self.funcao = funcao
+        self.chave = chave
+        self.futuro = asyncio.get_running_loop().create_future()
+        self.criada_em = time.monotonic()
+        self.iniciada = False
+
+
+class AgendadorDiscord:
+    """Fila de ações do Discord com prioridade, uma ação por vez em cada rota
+
+    `rota` identifica o bucket (ex.: `canal:123:mensagens`, `dm:456`,
+    `canal_nome:789`); ações da mesma rota são serializadas e rotas
+    diferentes rodam em paralelo até `workers`. Ações com a mesma `chave`
+    ainda não iniciadas são fundidas: só a última é executada e todos os
+    chamadores recebem o mesmo resultado.
+    """
+
+    def __init__(self, workers: int = AGENDADOR_WORKERS):
+        self.workers = workers
+        self._filas: dict[str, list] = {}
+        self._ocupadas: set[str] = set()
+        self._por_chave: dict[str, _Acao] = {}
+        self._liberada_em: dict[str, float] = {}
+        self._historico: dict[str, deque] = {}
+        self._seq = itertools.count()
+        self._sinal = asyncio.Event()
+        self._tarefas: list[asyncio.Task] = []
+
+        # Métricas
+        self.executadas = 0
+        self.falhas = 0
+        self.coalescidas = 0
+        self._esperas_ms: deque[float] = deque(maxlen=500)
+
+    def iniciar(self):
+        if not self._tarefas:
+            self._tarefas = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def parar(self):
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        self._tarefas = []
+
+    # ==========================
+    # 📥 Envio
+    # ==========================
+    def enviar(self, rota: str, funcao, *, prioridade: Prioridade = Prioridade.NOTIFICACAO,
+               chave: str = None) -> asyncio.Future:
+        """Agenda `funcao()` (que retorna uma coroutine) e devolve um Future com o resultado"""
+        if chave:
+            existente = self._por_chave.get(chave)
+            if existente and not existente.iniciada:
+                existente.funcao = funcao
+                self.coalescidas += 1
+                if prioridade < existente.prioridade:
+                    # A entrada antiga no heap fica obsoleta e é descartada ao sair
+                    existente.prioridade = prioridade
+                    heapq.heappush(self._filas[existente.rota], (prioridade, existente.seq, existente))
+                    self._sinal.set()
+                return existente.futuro
+
+        acao = _Acao(rota, prioridade, next(self._seq), funcao, chave)
+        heapq.heappush(self._filas.setdefault(rota, []), (prioridade, acao.seq, acao))
+        if chave:
+            self._por_chave[chave] = acao
+        self._sinal.set()
+        return acao.futuro
+
+    def disparar(self, rota: str, funcao, *, prioridade: Prioridade = Prioridade.LOG, chave: str = None):
+        """Como `enviar`, para quem não vai aguardar: falhas são apenas registradas no log"""
+        futuro = self.enviar(rota, funcao, prioridade=prioridade, chave=chave)
+        futuro.add_done_callback(lambda f: self._registrar_falha(rota, f))
+
+    @staticmethod
+    def _registrar_falha(rota: str, futuro: asyncio.Future):
+        if not futuro.cancelled() and futuro.exception():
+            print(f"❌ [Agendador] Falha em {rota}: {futuro.exception()}")
+
+    # ==========================
+    # ⚙️ Execução
+    # ==========================
+    def _proxima(self) -> tuple[_Acao | None, float | None]:
+        """Escolhe a ação de maior prioridade entre as rotas livres; devolve também a próxima liberação"""
+        agora = time.monotonic()
+        melhor = None
+        proxima_liberacao = None
+
+        for rota, fila in list(self._filas.items()):
+            if rota in self._ocupadas:
+                continue
+            while fila and (fila[0][2].iniciada or fila[0][0] != fila[0][2].prioridade):
+                heapq.heappop(fila)
+            if not fila:
+                del self._filas[rota]
+                continue
+
+            liberada = self._liberada_em.get(rota, 0)
+            if liberada > agora:
+                espera = liberada - agora
+                proxima_liberacao = espera if proxima_liberacao is None else min(proxima_liberacao, espera)
+                continue
+
+            if melhor is None or fila[0][:2] < melhor[:2]:
+                melhor = fila[0]
+
+        if melhor is None:
+            return None, proxima_liberacao
+
+        acao = melhor[2]
+        heapq.heappop(self._filas[acao.rota])
+        acao.iniciada = True
+        if acao.chave and self._por_chave.get(acao.chave) is acao:
+            del self._por_chave[acao.chave]
+        self._ocupadas.add(acao.rota)
+        return acao, None
+
+    def _contabilizar_limite(self, rota: str):
+        limite = LIMITES_ROTA.get(rota.split(':', 1)[0])
+        if not limite:
+            return
+        chamadas, janela = limite
+        historico = self._historico.setdefault(rota, deque(maxlen=chamadas))
+        historico.append(time.monotonic())
+        if len(historico) == chamadas:
+            self._liberada_em[rota] = historico[0] + janela
+
+    async def _worker(self):
+        while True:
+            acao, espera = self._proxima()
+            if acao is None:
+                self._sinal.clear()
+                try:
+                    await asyncio.wait_for(self._sinal.wait(), timeout=espera)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._esperas_ms.append((time.monotonic() - acao.criada_em) * 1000)
+            try:
+                resultado = await acao.funcao()
+                if not acao.futuro.done():
+                    acao.futuro.set_result(resultado)
+            except asyncio.CancelledError:
+                acao.futuro.cancel()
+                raise
+            except Exception as e:
+                self.falhas += 1
+                if not acao.futuro.done():
+                    acao.futuro.set_exception(e)
+            finally:
+                self.executadas += 1
+                self._ocupadas.discard(acao.rota)
+                self._contabilizar_limite(acao.rota)
+                self._sinal.set()
+
+    # ==========================
+    # 📊 Métricas
+    # ==========================
+    @property
+    def profundidade(self) -> int:
+        return sum(1 for fila in self._filas.values() for prioridade, _, acao in fila
+                   if not acao.iniciada and prioridade == acao.prioridade)
+
+    def metricas(self) -> dict:
+        esperas = sorted(self._esperas_ms)
+        return {
+            'profundidade': self.profundidade,
+            'em_execucao': len(self._ocupadas),
+            'executadas': self.executadas,
+            'falhas': self.falhas,
+            'coalescidas': self.coalescidas,
+            'espera_ms_p50': round(esperas[len(esperas) // 2], 1) if esperas else None,
+            'espera_ms_p95': round(esperas[int(len(esperas) * 0.95)], 1) if esperas else None,
+            'rotas_limitadas': sum(1 for t in self._liberada_em.values() if t > time.monotonic()),
+        }
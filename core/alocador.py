@@ -0,0 +1,58 @@
+"""Alocação de números sequenciais de pedido (`pedido-cliente-N`)"""
+import asyncio
+import os
+
+# Quantos números reservar por ida ao Supabase (1 = aprovação atômica via RPC `aprovar_pedido`)
+PEDIDOS_BLOCO_NUMEROS = int(os.getenv('PEDIDOS_BLOCO_NUMEROS', 1))
+
+
+class AlocadorNumeros:
+    """Entrega números de pedido sem colisão, opcionalmente reservando-os em blocos
+
+    Com `bloco=1` (padrão) cada aprovação é uma única chamada atômica
+    (`aprovar_pedido`), com ou sem outbox: número e registro são gravados
+    juntos no Supabase, e só as escritas seguintes (canal etc.) vão pela fila.
+    Com `bloco>1` o contador é incrementado de uma vez por `reservar_numeros` e os
+    números seguintes saem da memória; os que sobrarem num restart viram lacunas.
+    Nesse modo a inserção segue o caminho normal (outbox, se ativo).
+    """
+
+    def __init__(self, db, bloco: int = PEDIDOS_BLOCO_NUMEROS):
+        self.db = db
+        self.bloco = max(1, bloco)
+        self.ultimo_usado: int | None = None
+        self._proximo = 1
+        self._limite = 0
+        self._trava = asyncio.Lock()
+
+    @property
+    def livres(self) -> int:
+        """Números já reservados no Supabase e ainda não entregues"""
+        return max(0, self._limite - self._proximo + 1)
+
+    @property
+    def proximo_local(self) -> int | None:
+        """Próximo número a ser entregue sem ir ao Supabase (None se o bloco acabou)"""
+        return self._proximo if self.livres else None
+
+    async def proximo(self) -> int:
+        """Entrega o próximo número, reservando um novo bloco quando o atual acaba"""
+        async with self._trava:
+            if not self.livres:
+                self._limite = await self.db.reservar_numeros(self.bloco)
+                self._proximo = self._limite - self.bloco + 1
+            numero = self._proximo
+            self._proximo += 1
+            self.ultimo_usado = numero
+            return numero
+
+    async def aprovar(self, dados: dict) -> dict:
+        """Numera e insere um pedido aceito, retornando o registro gravado"""
+        if self.bloco == 1:
+            registro = await self.db.aprovar_pedido(dados)
+        else:
+            numero = await self.proximo()
+            registro = await self.db.inserir_pedido({**dados, 'pedido_number': numero})
+
+        self.ultimo_usado = registro['pedido_number']
+        return registro
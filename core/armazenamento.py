@@ -0,0 +1,293 @@
+"""Onde os comprovantes ficam guardados: disco local ou um object storage compatível com S3"""
+import asyncio
+import hashlib
+import hmac
+import os
+import shutil
+import time
+import xml.etree.ElementTree as ET
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from urllib.parse import quote, urlsplit
+
+import aiofiles
+import aiohttp
+from yarl import URL
+
+ARMAZENAMENTO = os.getenv('ARMAZENAMENTO', 'local').lower()
+ARMAZENAMENTO_DIR = os.getenv('ARMAZENAMENTO_DIR', 'comprovantes')
+ARMAZENAMENTO_TENTATIVAS = int(os.getenv('ARMAZENAMENTO_TENTATIVAS', 5))
+# Chaves já enviadas lembradas para não reenviar o mesmo blob (as mais antigas são esquecidas)
+ARMAZENAMENTO_ENVIADOS_MAX = int(os.getenv('ARMAZENAMENTO_ENVIADOS_MAX', 4096))
+
+# S3, MinIO ou o endpoint S3 do Supabase Storage (https://<projeto>.supabase.co/storage/v1/s3)
+S3_ENDPOINT = os.getenv('S3_ENDPOINT', '').rstrip('/')
+S3_BUCKET = os.getenv('S3_BUCKET', '')
+S3_REGIAO = os.getenv('S3_REGIAO', 'us-east-1')
+S3_CHAVE_ACESSO = os.getenv('S3_CHAVE_ACESSO', '')
+S3_CHAVE_SECRETA = os.getenv('S3_CHAVE_SECRETA', '')
+S3_PREFIXO = os.getenv('S3_PREFIXO', 'comprovantes/')
+# Partes do multipart (o S3 exige no mínimo 5 MB, exceto a última)
+S3_PARTE_BYTES = max(5 * 1024 * 1024, int(os.getenv('S3_PARTE_BYTES', 8 * 1024 * 1024)))
+
+
+class ErroArmazenamento(Exception):
+    """Falha ao guardar um arquivo no backend (HTTP, rede ou disco)"""
+
+    def __init__(self, mensagem: str, status: int = None):
+        super().__init__(mensagem)
+        self.status = status
+
+
+class Armazenamento(ABC):
+    """Interface comum dos backends
+
+    `chave` é o caminho relativo do arquivo (ex.: `blobs/ab/abcd….webp`) e
+    `uri(chave)` é o que vai para `comprovante_path`. `agendar` devolve a URI
+    na hora e faz o envio em segundo plano, com novas tentativas. Um blob
+    repetido não é reenviado enquanto a chave estiver entre as
+    `max_enviados` mais recentes; depois disso, no pior caso, é enviado de
+    novo (mesmo conteúdo, mesma chave).
+    """
+
+    nome = 'base'
+
+    def __init__(self, tentativas: int = ARMAZENAMENTO_TENTATIVAS, max_enviados: int = ARMAZENAMENTO_ENVIADOS_MAX):
+        self.tentativas = tentativas
+        self.max_enviados = max_enviados
+        self._pendentes: set[asyncio.Task] = set()
+        self._enviados: OrderedDict[str, None] = OrderedDict()
+
+        # Métricas
+        self.envios = 0
+        self.falhas = 0
+        self.bytes_enviados = 0
+
+    @abstractmethod
+    def uri(self, chave: str) -> str:
+        ...
+
+    async def abrir(self, session=None):
+        pass
+
+    @abstractmethod
+    async def enviar(self, caminho_local: str, chave: str) -> str:
+        """Envia e só retorna quando o arquivo estiver guardado"""
+
+    def agendar(self, caminho_local: str, chave: str) -> str:
+        if chave in self._enviados:
+            self._enviados.move_to_end(chave)
+        else:
+            self._enviados[chave] = None
+            while len(self._enviados) > self.max_enviados:
+                self._enviados.popitem(last=False)
+            tarefa = asyncio.create_task(self._enviar_com_tentativas(caminho_local, chave))
+            self._pendentes.add(tarefa)
+            tarefa.add_done_callback(self._pendentes.discard)
+        return self.uri(chave)
+
+    async def _enviar_com_tentativas(self, caminho_local: str, chave: str):
+        for tentativa in range(1, self.tentativas + 1):
+            try:
+                await self.enviar(caminho_local, chave)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                definitivo = isinstance(e, ErroArmazenamento) and e.status and 400 <= e.status < 500 and e.status != 429
+                if definitivo or tentativa == self.tentativas:
+                    self.falhas += 1
+                    self._enviados.pop(chave, None)
+                    print(f"❌ [Armazenamento] Falha ao enviar {chave} ({tentativa} tentativa(s)): {e}")
+                    return
+                await asyncio.sleep(min(60, 2 ** tentativa))
+
+    async def fechar(self, espera: float = 30):
+        """Dá um tempo para os envios em andamento terminarem"""
+        if self._pendentes:
+            print(f"⏳ [Armazenamento] Aguardando {len(self._pendentes)} envio(s) pendente(s)...")
+            _, restantes = await asyncio.wait(self._pendentes, timeout=espera)
+            for tarefa in restantes:
+                tarefa.cancel()
+
+    def metricas(self) -> dict:
+        return {
+            'backend': self.nome,
+            'pendentes': len(self._pendentes),
+            'envios': self.envios,
+            'falhas': self.falhas,
+            'bytes_enviados': self.bytes_enviados,
+        }
+
+
+class ArmazenamentoLocal(Armazenamento):
+    """Arquivos numa pasta do próprio servidor (some a cada deploy no Render)"""
+
+    nome = 'local'
+
+    def __init__(self, raiz: str = ARMAZENAMENTO_DIR, **kwargs):
+        super().__init__(**kwargs)
+        self.raiz = raiz
+
+    def uri(self, chave: str) -> str:
+        return os.path.join(self.raiz, chave)
+
+    async def abrir(self, session=None):
+        os.makedirs(self.raiz, exist_ok=True)
+
+    async def enviar(self, caminho_local: str, chave: str) -> str:
+        destino = self.uri(chave)
+        if os.path.abspath(caminho_local) != os.path.abspath(destino):
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            await asyncio.to_thread(shutil.copyfile, caminho_local, destino)
+            self.bytes_enviados += os.path.getsize(destino)
+        self.envios += 1
+        return destino
+
+
+class ArmazenamentoS3(Armazenamento):
+    """Bucket compatível com S3 (AWS, MinIO, Supabase Storage), assinado com SigV4 e URLs path-style
+
+    Arquivos maiores que `parte_bytes` vão por multipart upload, lidos do
+    disco uma parte por vez: a memória usada fica limitada ao tamanho da parte.
+    """
+
+    nome = 's3'
+
+    def __init__(self, endpoint: str = S3_ENDPOINT, bucket: str = S3_BUCKET, regiao: str = S3_REGIAO,
+                 chave_acesso: str = S3_CHAVE_ACESSO, chave_secreta: str = S3_CHAVE_SECRETA,
+                 prefixo: str = S3_PREFIXO, parte_bytes: int = S3_PARTE_BYTES, **kwargs):
+        super().__init__(**kwargs)
+        if not endpoint or not bucket:
+            raise ValueError('S3_ENDPOINT e S3_BUCKET são obrigatórios para ARMAZENAMENTO=s3')
+        self.endpoint = endpoint
+        self.host = urlsplit(endpoint).netloc
+        self.bucket = bucket
+        self.regiao = regiao
+        self.chave_acesso = chave_acesso
+        self.chave_secreta = chave_secreta
+        self.prefixo = prefixo
+        self.parte_bytes = parte_bytes
+        self.session: aiohttp.ClientSession | None = None
+        self._sessao_propria = False
+        self.timeout = aiohttp.ClientTimeout(total=120)
+
+    def uri(self, chave: str) -> str:
+        return f's3://{self.bucket}/{self.prefixo}{chave}'
+
+    async def abrir(self, session: aiohttp.ClientSession = None):
+        if session is not None:
+            self.session = session
+            self._sessao_propria = False
+        elif self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession()
+            self._sessao_propria = True
+
+    async def fechar(self, espera: float = 30):
+        await super().fechar(espera)
+        if self._sessao_propria and self.session and not self.session.closed:
+            await self.session.close()
+
+    # ==========================
+    # ✍️ Assinatura (SigV4)
+    # ==========================
+    def _assinar(self, metodo: str, caminho: str, query: dict, payload_sha256: str, agora: float = None) -> dict:
+        instante = time.gmtime(agora if agora is not None else time.time())
+        amz_data = time.strftime('%Y%m%dT%H%M%SZ', instante)
+        dia = amz_data[:8]
+
+        headers = {'host': self.host, 'x-amz-content-sha256': payload_sha256, 'x-amz-date': amz_data}
+        assinados = ';'.join(sorted(headers))
+        requisicao_canonica = '\n'.join([
+            metodo,
+            quote(caminho, safe='/~'),
+            '&'.join(f'{quote(k, safe="~")}={quote(str(v), safe="~")}' for k, v in sorted(query.items())),
+            ''.join(f'{k}:{headers[k]}\n' for k in sorted(headers)),
+            assinados,
+            payload_sha256,
+        ])
+        escopo = f'{dia}/{self.regiao}/s3/aws4_request'
+        texto = '\n'.join([
+            'AWS4-HMAC-SHA256', amz_data, escopo,
+            hashlib.sha256(requisicao_canonica.encode()).hexdigest(),
+        ])
+
+        chave = f'AWS4{self.chave_secreta}'.encode()
+        for parte in (dia, self.regiao, 's3', 'aws4_request'):
+            chave = hmac.new(chave, parte.encode(), hashlib.sha256).digest()
+        assinatura = hmac.new(chave, texto.encode(), hashlib.sha256).hexdigest()
+
+        headers['Authorization'] = (
+            f'AWS4-HMAC-SHA256 Credential={self.chave_acesso}/{escopo}, '
+            f'SignedHeaders={assinados}, Signature={assinatura}'
+        )
+        return headers
+
+    async def _requisicao(self, metodo: str, chave: str, *, query: dict = None, corpo: bytes = b'') -> tuple:
+        query = query or {}
+        caminho = f'/{self.bucket}/{self.prefixo}{chave}'
+        headers = self._assinar(metodo, caminho, query, hashlib.sha256(corpo).hexdigest())
+        url = self.endpoint + quote(caminho, safe='/~')
+        if query:
+            url += '?' + '&'.join(f'{quote(k, safe="~")}={quote(str(v), safe="~")}' for k, v in sorted(query.items()))
+
+        async with self.session.request(metodo, URL(url, encoded=True), headers=headers, data=corpo,
+                                        timeout=self.timeout) as resp:
+            texto = await resp.text()
+            if resp.status >= 300:
+                raise ErroArmazenamento(f'{metodo} {chave}: HTTP {resp.status} {texto[:300]}', resp.status)
+            return resp.headers, texto
+
+    # ==========================
+    # 📤 Envio
+    # ==========================
+    async def enviar(self, caminho_local: str, chave: str) -> str:
+        await self.abrir()
+        tamanho = os.path.getsize(caminho_local)
+        if tamanho <= self.parte_bytes:
+            async with aiofiles.open(caminho_local, 'rb') as arquivo:
+                await self._requisicao('PUT', chave, corpo=await arquivo.read())
+        else:
+            await self._enviar_multipart(caminho_local, chave)
+
+        self.envios += 1
+        self.bytes_enviados += tamanho
+        return self.uri(chave)
+
+    async def _enviar_multipart(self, caminho_local: str, chave: str):
+        _, texto = await self._requisicao('POST', chave, query={'uploads': ''})
+        upload_id = ET.fromstring(texto).findtext('{*}UploadId')
+        if not upload_id:
+            raise ErroArmazenamento(f'POST {chave}: resposta sem UploadId')
+
+        try:
+            etags = []
+            async with aiofiles.open(caminho_local, 'rb') as arquivo:
+                numero = 1
+                while parte := await arquivo.read(self.parte_bytes):
+                    headers, _ = await self._requisicao(
+                        'PUT', chave, query={'partNumber': numero, 'uploadId': upload_id}, corpo=parte
+                    )
+                    etags.append((numero, headers['ETag']))
+                    numero += 1
+
+            corpo = '<CompleteMultipartUpload>' + ''.join(
+                f'<Part><PartNumber>{n}</PartNumber><ETag>{etag}</ETag></Part>' for n, etag in etags
+            ) + '</CompleteMultipartUpload>'
+            _, texto = await self._requisicao('POST', chave, query={'uploadId': upload_id}, corpo=corpo.encode())
+            # O S3 pode responder 200 e mesmo assim falhar na conclusão
+            if '<Error>' in texto:
+                raise ErroArmazenamento(f'POST {chave}: falha ao concluir multipart {texto[:300]}')
+        except BaseException:
+            try:
+                await self._requisicao('DELETE', chave, query={'uploadId': upload_id})
+            except Exception:
+                pass
+            raise
+
+
+def criar_armazenamento() -> Armazenamento:
+    """Backend escolhido por `ARMAZENAMENTO` (local | s3)"""
+    if ARMAZENAMENTO == 's3':
+        return ArmazenamentoS3()
+    return ArmazenamentoLocal()
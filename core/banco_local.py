@@ -0,0 +1,19 @@
+"""Banco SQLite local (modo WAL) compartilhado pelos serviços do bot"""
+import os
+import sqlite3
+
+LOCAL_DB_PATH = os.getenv('LOCAL_DB_PATH', os.path.join('dados', 'local.db'))
+
+
+def abrir_banco(caminho: str = LOCAL_DB_PATH) -> sqlite3.Connection:
+    """Abre uma conexão em modo WAL que pode ser usada a partir de threads auxiliares"""
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+
+    conn = sqlite3.connect(caminho, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA busy_timeout=5000')
+    return conn
@@ -0,0 +1,221 @@
+"""Armazenamento de comprovantes endereçado por conteúdo (SHA-256) com índice de quase-duplicatas"""
+import asyncio
+import os
+import threading
+import time
+
+from core.armazenamento import ARMAZENAMENTO_DIR
+from core.banco_local import LOCAL_DB_PATH, abrir_banco
+from core.imagens import carregar_pil
+
+BLOBS_DIR = os.getenv('BLOBS_DIR', os.path.join(ARMAZENAMENTO_DIR, 'blobs'))
+# Distância de Hamming máxima entre dHashes para considerar duas imagens "a mesma"
+DHASH_LIMIAR = int(os.getenv('DHASH_LIMIAR', 6))
+# 8 faixas de 8 bits: duas hashes a até 7 bits de distância coincidem em pelo menos uma faixa
+_FAIXAS = 8
+
+
+def calcular_dhash(caminho: str) -> int | None:
+    """dHash de 64 bits (gradiente horizontal numa miniatura 9x8 em tons de cinza); None se não for imagem"""
+    Image, _ = carregar_pil()
+    try:
+        with Image.open(caminho) as imagem:
+            pixels = list(imagem.convert('L').resize((9, 8), Image.LANCZOS).getdata())
+    except (OSError, Image.DecompressionBombError):
+        return None
+
+    valor = 0
+    for linha in range(8):
+        for coluna in range(8):
+            esquerda = pixels[linha * 9 + coluna]
+            direita = pixels[linha * 9 + coluna + 1]
+            valor = (valor << 1) | (esquerda > direita)
+    return valor
+
+
+def caminho_miniatura(caminho: str) -> str:
+    """Miniatura JPEG gravada ao lado do blob"""
+    return f'{os.path.splitext(caminho)[0]}.mini.jpg'
+
+
+def _com_sinal(valor: int) -> int:
+    """SQLite só guarda inteiros de 64 bits com sinal"""
+    return valor - (1 << 64) if valor >= 1 << 63 else valor
+
+
+def _faixas(valor: int) -> list[tuple[int, int]]:
+    return [(i, (valor >> (8 * i)) & 0xFF) for i in range(_FAIXAS)]
+
+
+class RepositorioBlobs:
+    """Guarda cada comprovante uma única vez, em `blobs/<sha[:2]>/<sha>.<ext>`
+
+    Cada blob é ligado aos pedidos em que apareceu; imagens também entram num
+    índice de dHash (dividido em faixas para a busca não varrer a tabela) para
+    achar o mesmo print recortado, recomprimido ou com outra resolução.
+    """
+
+    def __init__(self, caminho: str = LOCAL_DB_PATH, pasta: str = BLOBS_DIR, limiar: int = DHASH_LIMIAR):
+        self.caminho = caminho
+        self.pasta = pasta
+        self.limiar = limiar
+        self._conn = None
+        self._trava = threading.Lock()
+
+        # Métricas
+        self.novos = 0
+        self.reaproveitados = 0
+        self.duplicatas = 0
+
+    def abrir(self):
+        if self._conn is not None:
+            return
+
+        os.makedirs(self.pasta, exist_ok=True)
+        self._conn = abrir_banco(self.caminho)
+        with self._trava, self._conn:
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS blobs (
+                    sha256 TEXT PRIMARY KEY,
+                    caminho TEXT NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    dhash INTEGER,
+                    criado_em REAL NOT NULL
+                );
+
+                CREATE TABLE IF NOT EXISTS blob_pedidos (
+                    sha256 TEXT NOT NULL,
+                    pedido_id TEXT NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    criado_em REAL NOT NULL,
+                    PRIMARY KEY (sha256, pedido_id, user_id)
+                );
+
+                CREATE TABLE IF NOT EXISTS dhash_faixas (
+                    faixa INTEGER NOT NULL,
+                    valor INTEGER NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    PRIMARY KEY (faixa, valor, sha256)
+                );
+            ''')
+
+    def fechar(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ==========================
+    # 📥 Gravação
+    # ==========================
+    def _localizar(self, sha256: str) -> str | None:
+        with self._trava:
+            linha = self._conn.execute('SELECT caminho FROM blobs WHERE sha256 = ?', (sha256,)).fetchone()
+        if linha and os.path.exists(linha['caminho']):
+            return linha['caminho']
+        return None
+
+    def _gravar(self, arquivo: str, sha256: str, extensao: str, miniatura: str | None) -> str:
+        pasta = os.path.join(self.pasta, sha256[:2])
+        os.makedirs(pasta, exist_ok=True)
+        destino = os.path.join(pasta, f'{sha256}.{extensao}')
+        os.replace(arquivo, destino)
+        if miniatura:
+            os.replace(miniatura, caminho_miniatura(destino))
+
+        dhash = calcular_dhash(destino)
+        with self._trava, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO blobs (sha256, caminho, tamanho, dhash, criado_em) VALUES (?, ?, ?, ?, ?)',
+                (sha256, destino, os.path.getsize(destino),
+                 _com_sinal(dhash) if dhash is not None else None, time.time())
+            )
+            if dhash is not None:
+                self._conn.executemany(
+                    'INSERT OR IGNORE INTO dhash_faixas (faixa, valor, sha256) VALUES (?, ?, ?)',
+                    [(faixa, valor, sha256) for faixa, valor in _faixas(dhash)]
+                )
+        return destino
+
+    async def adotar(self, temporario: str, sha256: str, extensao: str, preparar=None) -> str:
+        """Move o arquivo baixado para o endereço do seu conteúdo; se já existir, descarta a cópia
+
+        `preparar(temporario)` (opcional, coroutine) roda só para conteúdo
+        novo e devolve `(arquivo, extensão, miniatura ou None)` — é onde a
+        imagem é normalizada. A chave continua sendo o SHA-256 do original.
+        """
+        existente = await asyncio.to_thread(self._localizar, sha256)
+        if existente:
+            os.remove(temporario)
+            self.reaproveitados += 1
+            return existente
+
+        miniatura = None
+        if preparar:
+            temporario, extensao, miniatura = await preparar(temporario)
+        caminho = await asyncio.to_thread(self._gravar, temporario, sha256, extensao, miniatura)
+        self.novos += 1
+        return caminho
+
+    # ==========================
+    # 🔎 Duplicatas
+    # ==========================
+    def _registrar(self, shas: list[str], pedido_id: str, user_id: int) -> list[dict]:
+        with self._trava, self._conn:
+            ocorrencias = {}
+            for sha in shas:
+                # Mesmo conteúdo exato
+                for linha in self._conn.execute(
+                    'SELECT pedido_id, user_id FROM blob_pedidos WHERE sha256 = ? AND NOT (pedido_id = ? AND user_id = ?)',
+                    (sha, pedido_id, user_id)
+                ):
+                    ocorrencias.setdefault((linha['pedido_id'], linha['user_id']), {'tipo': 'idêntico', 'distancia': 0})
+
+                # Imagem parecida (dHash perto o bastante)
+                linha = self._conn.execute('SELECT dhash FROM blobs WHERE sha256 = ?', (sha,)).fetchone()
+                if linha and linha['dhash'] is not None:
+                    dhash = linha['dhash'] & 0xFFFFFFFFFFFFFFFF
+                    filtro = ' OR '.join('(f.faixa = ? AND f.valor = ?)' for _ in range(_FAIXAS))
+                    parametros = [v for par in _faixas(dhash) for v in par]
+                    candidatos = self._conn.execute(
+                        f'SELECT DISTINCT b.sha256, b.dhash FROM dhash_faixas f '
+                        f'JOIN blobs b ON b.sha256 = f.sha256 WHERE ({filtro}) AND b.sha256 != ?',
+                        (*parametros, sha)
+                    ).fetchall()
+                    for candidato in candidatos:
+                        distancia = bin(dhash ^ (candidato['dhash'] & 0xFFFFFFFFFFFFFFFF)).count('1')
+                        if distancia > self.limiar:
+                            continue
+                        for uso in self._conn.execute(
+                            'SELECT pedido_id, user_id FROM blob_pedidos WHERE sha256 = ?', (candidato['sha256'],)
+                        ):
+                            chave = (uso['pedido_id'], uso['user_id'])
+                            if chave == (pedido_id, user_id):
+                                continue
+                            atual = ocorrencias.get(chave)
+                            if atual is None or distancia < atual['distancia']:
+                                ocorrencias[chave] = {'tipo': 'semelhante', 'distancia': distancia}
+
+            agora = time.time()
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO blob_pedidos (sha256, pedido_id, user_id, criado_em) VALUES (?, ?, ?, ?)',
+                [(sha, pedido_id, user_id, agora) for sha in shas]
+            )
+
+        return [
+            {'pedido_id': p, 'user_id': u, **info}
+            for (p, u), info in sorted(ocorrencias.items(), key=lambda item: item[1]['distancia'])
+        ]
+
+    async def registrar(self, shas: list[str], pedido_id: str, user_id: int) -> list[dict]:
+        """Liga os blobs ao pedido e devolve os pedidos anteriores que usaram o mesmo comprovante"""
+        ocorrencias = await asyncio.to_thread(self._registrar, shas, pedido_id, user_id)
+        if ocorrencias:
+            self.duplicatas += 1
+        return ocorrencias
+
+    def metricas(self) -> dict:
+        return {
+            'novos': self.novos,
+            'reaproveitados': self.reaproveitados,
+            'comprovantes_repetidos': self.duplicatas,
+        }
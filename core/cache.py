@@ -0,0 +1,83 @@
+"""Cache em memória dos registros de pedidos"""
+import os
+import time
+from collections import OrderedDict
+
+CACHE_PEDIDOS_MAX = int(os.getenv('CACHE_PEDIDOS_MAX', 2000))
+CACHE_PEDIDOS_TTL = float(os.getenv('CACHE_PEDIDOS_TTL', 300))
+# Pedidos ainda não decididos são consultados em sequência pelo cliente: guardar o "não encontrado" também
+CACHE_PEDIDOS_TTL_NEGATIVO = float(os.getenv('CACHE_PEDIDOS_TTL_NEGATIVO', 60))
+
+
+class CachePedidos:
+    """Cache TTL + LRU indexado por `pedido_id`, limitado a `max_entradas` registros
+
+    `obter` devolve `(encontrado, registro)`; `registro` pode ser None quando o
+    cache lembra que o pedido não existe. Os registros não são copiados, então
+    quem lê não deve alterá-los.
+    """
+
+    def __init__(self, max_entradas: int = CACHE_PEDIDOS_MAX, ttl: float = CACHE_PEDIDOS_TTL,
+                 ttl_negativo: float = CACHE_PEDIDOS_TTL_NEGATIVO):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self._dados: OrderedDict[str, tuple[float, dict | None]] = OrderedDict()
+
+        # Contadores para monitoramento
+        self.acertos = 0
+        self.falhas = 0
+        self.expirados = 0
+        self.descartados = 0
+
+    def __len__(self):
+        return len(self._dados)
+
+    def obter(self, pedido_id: str) -> tuple[bool, dict | None]:
+        """Busca um pedido no cache, renovando sua posição no LRU"""
+        entrada = self._dados.get(pedido_id)
+        if entrada is None:
+            self.falhas += 1
+            return False, None
+
+        expira_em, registro = entrada
+        if expira_em < time.monotonic():
+            del self._dados[pedido_id]
+            self.expirados += 1
+            self.falhas += 1
+            return False, None
+
+        self._dados.move_to_end(pedido_id)
+        self.acertos += 1
+        return True, registro
+
+    def guardar(self, pedido_id: str, registro: dict | None):
+        """Grava (ou substitui) um pedido; `None` registra que ele não existe"""
+        ttl = self.ttl if registro is not None else self.ttl_negativo
+        self._dados[pedido_id] = (time.monotonic() + ttl, registro)
+        self._dados.move_to_end(pedido_id)
+
+        while len(self._dados) > self.max_entradas:
+            self._dados.popitem(last=False)
+            self.descartados += 1
+
+    def invalidar(self, pedido_id: str):
+        """Remove um pedido do cache"""
+        self._dados.pop(pedido_id, None)
+
+    def limpar(self):
+        """Esvazia o cache sem zerar os contadores"""
+        self._dados.clear()
+
+    def metricas(self) -> dict:
+        """Resumo para monitoramento (acertos, falhas, taxa de acerto, ocupação)"""
+        consultas = self.acertos + self.falhas
+        return {
+            'entradas': len(self._dados),
+            'max_entradas': self.max_entradas,
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'expirados': self.expirados,
+            'descartados': self.descartados,
+            'taxa_acerto': round(self.acertos / consultas, 4) if consultas else 0.0,
+        }
@@ -0,0 +1,193 @@
+"""Garantia de uma única decisão (aceitar/reprovar) por comprovante"""
+import sqlite3
+import threading
+import time
+
+from core.banco_local import LOCAL_DB_PATH, abrir_banco
+from core.repositorio import ErroRepositorio
+
+# Reivindicação ainda "em andamento" depois disso foi interrompida (restart no meio da aprovação)
+DECISAO_EXPIRACAO = 600
+
+
+class ControleDecisoes:
+    """Single-flight das decisões dos moderadores
+
+    Duas camadas, ambas consultadas antes de qualquer chamada ao Supabase ou
+    ao Discord:
+    - em memória, o pedido (`pedido_id` + usuário) que já está sendo
+      decidido — o segundo clique é recusado na hora, sem ficar esperando.
+      Expira junto com a reivindicação gravada (`DECISAO_EXPIRACAO`);
+    - no SQLite, a transição pendente → decidido: `mensagem_id` é chave
+      primária e só pode existir uma aprovação por pedido (índice único
+      parcial). Sobrevive a restarts.
+
+    Como a reivindicação roda inteira no event loop, sem `await`, ela é
+    atômica em relação às outras corrotinas.
+
+    O SQLite some num redeploy; a barreira entre instâncias é o índice único
+    `idx_pedidos_uma_decisao` do Supabase. O 409 dele é reconhecido por
+    `conflito_remoto` e a decisão de lá é adotada localmente com `adotar`.
+    """
+
+    def __init__(self, caminho: str = LOCAL_DB_PATH):
+        self.caminho = caminho
+        self._conn = None
+        self._trava = threading.Lock()
+        self._em_andamento: dict[tuple, dict] = {}
+
+        # Métricas
+        self.reivindicadas = 0
+        self.contendidas_memoria = 0
+        self.contendidas_banco = 0
+        self.liberadas = 0
+        self.expiradas = 0
+        self.adotadas = 0
+
+    def abrir(self):
+        if self._conn is not None:
+            return
+
+        self._conn = abrir_banco(self.caminho)
+        with self._trava, self._conn:
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS decisoes (
+                    mensagem_id INTEGER PRIMARY KEY,
+                    pedido_id TEXT NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    decisao TEXT NOT NULL,
+                    moderador_id INTEGER NOT NULL,
+                    estado TEXT NOT NULL DEFAULT 'em_andamento',
+                    criado_em REAL NOT NULL
+                );
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_decisoes_um_aceito
+                    ON decisoes(pedido_id, user_id) WHERE decisao = 'aceito';
+            ''')
+
+    def fechar(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ==========================
+    # 🔒 Reivindicar
+    # ==========================
+    def _em_andamento_ativo(self, chave: tuple) -> dict | None:
+        """Reivindicação em memória ainda válida (uma aprovação travada não bloqueia o pedido para sempre)"""
+        atual = self._em_andamento.get(chave)
+        if atual and atual['expira_em'] < time.time():
+            del self._em_andamento[chave]
+            self.expiradas += 1
+            return None
+        return atual
+
+    def consultar(self, mensagem_id: int, pedido_id: str, user_id: int) -> dict | None:
+        """Decisão já tomada (ou em andamento) para a mensagem ou para o pedido; None se está livre"""
+        atual = self._em_andamento_ativo((pedido_id, user_id))
+        if atual:
+            return atual
+        with self._trava:
+            linha = self._conn.execute(
+                'SELECT decisao, moderador_id, estado FROM decisoes WHERE mensagem_id = ?', (mensagem_id,)
+            ).fetchone()
+        return dict(linha) if linha else None
+
+    def reivindicar(self, mensagem_id: int, pedido_id: str, user_id: int,
+                    decisao: str, moderador_id: int) -> dict | None:
+        """Tenta ficar com a decisão; retorna None em caso de sucesso ou quem chegou antes"""
+        chave = (pedido_id, user_id)
+        atual = self._em_andamento_ativo(chave)
+        if atual:
+            self.contendidas_memoria += 1
+            return atual
+
+        try:
+            with self._trava, self._conn:
+                self._conn.execute(
+                    "DELETE FROM decisoes WHERE estado = 'em_andamento' AND criado_em < ? "
+                    "AND (mensagem_id = ? OR (pedido_id = ? AND user_id = ?))",
+                    (time.time() - DECISAO_EXPIRACAO, mensagem_id, pedido_id, user_id)
+                )
+                self._conn.execute(
+                    'INSERT INTO decisoes (mensagem_id, pedido_id, user_id, decisao, moderador_id, criado_em) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (mensagem_id, pedido_id, user_id, decisao, moderador_id, time.time())
+                )
+        except sqlite3.IntegrityError:
+            self.contendidas_banco += 1
+            with self._trava:
+                linha = self._conn.execute(
+                    "SELECT decisao, moderador_id, estado FROM decisoes "
+                    "WHERE mensagem_id = ? OR (pedido_id = ? AND user_id = ? AND decisao = 'aceito')",
+                    (mensagem_id, pedido_id, user_id)
+                ).fetchone()
+            return dict(linha) if linha else {'decisao': decisao, 'moderador_id': None, 'estado': 'em_andamento'}
+
+        self._em_andamento[chave] = {
+            'decisao': decisao, 'moderador_id': moderador_id, 'estado': 'em_andamento',
+            'expira_em': time.time() + DECISAO_EXPIRACAO,
+        }
+        self.reivindicadas += 1
+        return None
+
+    def concluir(self, mensagem_id: int, pedido_id: str, user_id: int):
+        """A decisão foi gravada: a reivindicação vira definitiva"""
+        self._em_andamento.pop((pedido_id, user_id), None)
+        with self._trava, self._conn:
+            self._conn.execute("UPDATE decisoes SET estado = 'decidido' WHERE mensagem_id = ?", (mensagem_id,))
+
+    def liberar(self, mensagem_id: int, pedido_id: str, user_id: int):
+        """Nada foi gravado (falha antes do banco): outro moderador pode tentar de novo
+
+        Uma decisão já concluída nunca é desfeita aqui.
+        """
+        self._em_andamento.pop((pedido_id, user_id), None)
+        with self._trava, self._conn:
+            self._conn.execute(
+                "DELETE FROM decisoes WHERE mensagem_id = ? AND estado = 'em_andamento'", (mensagem_id,)
+            )
+        self.liberadas += 1
+
+    @staticmethod
+    def conflito_remoto(erro: Exception) -> bool:
+        """409 de `idx_pedidos_uma_decisao`/`idx_pedidos_um_aceito`: o Supabase já tem uma decisão"""
+        return (isinstance(erro, ErroRepositorio) and erro.status == 409
+                and any(indice in erro.detalhe for indice in ('idx_pedidos_uma_decisao', 'idx_pedidos_um_aceito')))
+
+    def adotar(self, mensagem_id: int, pedido_id: str, user_id: int, registro: dict | None) -> dict:
+        """Guarda como definitiva a decisão encontrada no Supabase (`registro`: status e moderador)"""
+        decisao = 'reprovado' if registro and registro['status'] == 'reprovado' else 'aceito'
+        moderador_id = registro.get('moderador_id') if registro else None
+        self._em_andamento.pop((pedido_id, user_id), None)
+        try:
+            with self._trava, self._conn:
+                self._conn.execute(
+                    "UPDATE decisoes SET decisao = ?, moderador_id = COALESCE(?, moderador_id), estado = 'decidido' "
+                    "WHERE mensagem_id = ?",
+                    (decisao, moderador_id, mensagem_id)
+                )
+        except sqlite3.IntegrityError:
+            # A aprovação do pedido já está registrada localmente por outra mensagem
+            self.liberar(mensagem_id, pedido_id, user_id)
+        self.adotadas += 1
+        return {'decisao': decisao, 'moderador_id': moderador_id, 'estado': 'decidido'}
+
+    @staticmethod
+    def descrever(atual: dict) -> str:
+        """Texto para o moderador que chegou depois"""
+        acao = 'aprovado' if atual['decisao'] == 'aceito' else 'reprovado'
+        quem = f" por <@{atual['moderador_id']}>" if atual.get('moderador_id') else ''
+        if atual.get('estado') == 'decidido':
+            return f'⚠️ Este pedido já foi {acao}{quem}.'
+        return f'⚠️ Este pedido já está sendo {acao}{quem}.'
+
+    def metricas(self) -> dict:
+        return {
+            'em_andamento': len(self._em_andamento),
+            'reivindicadas': self.reivindicadas,
+            'contendidas_memoria': self.contendidas_memoria,
+            'contendidas_banco': self.contendidas_banco,
+            'liberadas': self.liberadas,
+            'expiradas': self.expiradas,
+            'adotadas': self.adotadas,
+        }
@@ -0,0 +1,294 @@
+"""Espelho local (SQLite) das tabelas `pedidos` e `contador`"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from core.banco_local import LOCAL_DB_PATH, abrir_banco
+
+# Margem de sobreposição da sincronização incremental (cobre relógios e commits atrasados)
+ESPELHO_MARGEM = float(os.getenv('ESPELHO_MARGEM', 300))
+
+COLUNAS = (
+    'id', 'pedido_id', 'user_id', 'pedido_number', 'plano', 'status', 'moderador_id',
+    'moderador_nome', 'canal_id', 'comprovante_path', 'motivo_reprovacao', 'timestamp',
+    'fechado_em', 'fechado_por', 'chave_idempotencia', 'mensagem_id'
+)
+
+_SQL_UPSERT = (
+    f"INSERT INTO pedidos ({', '.join(COLUNAS)}) VALUES ({', '.join('?' * len(COLUNAS))}) "
+    f"ON CONFLICT(id) DO UPDATE SET "
+    + ', '.join(f'{c} = excluded.{c}' for c in COLUNAS[1:])
+)
+
+
+_COLUNAS_DATA = ('timestamp', 'fechado_em')
+
+
+def _para_utc(valor: str) -> datetime:
+    """Converte um timestamp ISO (com ou sem fuso) para datetime em UTC"""
+    data = datetime.fromisoformat(valor)
+    if data.tzinfo is None:
+        return data.replace(tzinfo=timezone.utc)
+    return data.astimezone(timezone.utc)
+
+
+def _normalizar(valor: str | None) -> str | None:
+    """Timestamp no formato único do espelho (UTC, microssegundos, `+00:00`)
+
+    Tudo é guardado e comparado como texto (ORDER BY, cursor, filtros): só
+    com largura e fuso fixos a ordem do texto é a ordem do tempo.
+    """
+    return _para_utc(valor).isoformat(timespec='microseconds') if valor else valor
+
+
+def _normalizar_datas(dados: dict) -> dict:
+    return {**dados, **{c: _normalizar(dados[c]) for c in _COLUNAS_DATA if c in dados}}
+
+
+class EspelhoPedidos:
+    """Cópia local dos pedidos, usada pelas leituras enquanto o Supabase é a fonte da verdade
+
+    As escritas do próprio bot são aplicadas na hora; o resto chega pela
+    sincronização incremental baseada em `timestamp`/`fechado_em`. Inserções
+    ainda no outbox ficam com `id` negativo até o Supabase devolver o registro
+    definitivo (casado pela `chave_idempotencia`).
+    """
+
+    def __init__(self, caminho: str = LOCAL_DB_PATH):
+        self.caminho = caminho
+        self.marca: str | None = None
+        self.sincronizado_em: float | None = None
+        self._conn = None
+        self._trava = threading.Lock()
+
+    def abrir(self):
+        """Cria as tabelas (se preciso) e recupera o estado da última sincronização"""
+        if self._conn is not None:
+            return
+
+        self._conn = abrir_banco(self.caminho)
+        with self._trava, self._conn:
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS pedidos (
+                    id INTEGER PRIMARY KEY,
+                    pedido_id TEXT NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    pedido_number INTEGER,
+                    plano TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    moderador_id INTEGER,
+                    moderador_nome TEXT,
+                    canal_id INTEGER,
+                    comprovante_path TEXT,
+                    motivo_reprovacao TEXT,
+                    timestamp TEXT,
+                    fechado_em TEXT,
+                    fechado_por INTEGER,
+                    chave_idempotencia TEXT,
+                    mensagem_id INTEGER
+                );
+                CREATE INDEX IF NOT EXISTS idx_pedidos_pedido_id ON pedidos(pedido_id);
+                CREATE INDEX IF NOT EXISTS idx_pedidos_status_timestamp ON pedidos(status, timestamp);
+                CREATE INDEX IF NOT EXISTS idx_pedidos_timestamp ON pedidos(timestamp);
+
+                CREATE TABLE IF NOT EXISTS contador (
+                    id INTEGER PRIMARY KEY,
+                    ultimo_numero INTEGER NOT NULL
+                );
+
+                CREATE TABLE IF NOT EXISTS espelho_meta (
+                    chave TEXT PRIMARY KEY,
+                    valor TEXT
+                );
+            ''')
+            colunas = {linha['name'] for linha in self._conn.execute('PRAGMA table_info(pedidos)')}
+            for coluna, tipo in (('chave_idempotencia', 'TEXT'), ('mensagem_id', 'INTEGER')):
+                if coluna not in colunas:
+                    self._conn.execute(f'ALTER TABLE pedidos ADD COLUMN {coluna} {tipo}')
+            self._conn.execute(
+                'CREATE UNIQUE INDEX IF NOT EXISTS idx_pedidos_chave ON pedidos(chave_idempotencia)'
+            )
+            meta = dict(self._conn.execute('SELECT chave, valor FROM espelho_meta').fetchall())
+
+            # Registros gravados antes da normalização (naive do bot misturado com `+00:00` do Supabase)
+            antigos = self._conn.execute(
+                'SELECT id, timestamp, fechado_em FROM pedidos '
+                'WHERE length(timestamp) != 32 OR length(fechado_em) != 32'
+            ).fetchall()
+            self._conn.executemany(
+                'UPDATE pedidos SET timestamp = ?, fechado_em = ? WHERE id = ?',
+                [(_normalizar(l['timestamp']), _normalizar(l['fechado_em']), l['id']) for l in antigos]
+            )
+
+        self.marca = meta.get('marca')
+        if meta.get('sincronizado_em'):
+            self.sincronizado_em = float(meta['sincronizado_em'])
+
+    def fechar(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    @property
+    def pronto(self) -> bool:
+        """True depois da primeira sincronização completa (nesta ou numa execução anterior)"""
+        return self._conn is not None and self.sincronizado_em is not None
+
+    # ==========================
+    # 🔄 Sincronização
+    # ==========================
+    def aplicar(self, registros: list[dict]):
+        """Insere ou atualiza registros vindos do Supabase"""
+        if not registros:
+            return
+        linhas = [tuple(_normalizar_datas(r).get(c) for c in COLUNAS) for r in registros]
+        definitivos = [(r['chave_idempotencia'],) for r in registros
+                       if r.get('chave_idempotencia') and r['id'] > 0]
+        with self._trava, self._conn:
+            # Registro definitivo chegou: descarta a versão provisória do outbox
+            self._conn.executemany(
+                'DELETE FROM pedidos WHERE id < 0 AND chave_idempotencia = ?', definitivos
+            )
+            self._conn.executemany(_SQL_UPSERT, linhas)
+
+    def atualizar_local(self, filtro: dict, dados: dict):
+        """Aplica uma atualização pendente (ainda no outbox) aos registros que batem com `filtro`"""
+        colunas = [c for c in dados if c in COLUNAS]
+        if not colunas:
+            return
+        dados = _normalizar_datas(dados)
+        sql = (
+            f"UPDATE pedidos SET {', '.join(f'{c} = ?' for c in colunas)} "
+            f"WHERE {' AND '.join(f'{c} = ?' for c in filtro)}"
+        )
+        with self._trava, self._conn:
+            self._conn.execute(sql, [dados[c] for c in colunas] + list(filtro.values()))
+
+    def remover_local(self, filtro: dict):
+        """Apaga os registros que batem com `filtro` (inserção desfeita)"""
+        sql = f"DELETE FROM pedidos WHERE {' AND '.join(f'{c} = ?' for c in filtro)}"
+        with self._trava, self._conn:
+            self._conn.execute(sql, list(filtro.values()))
+
+    def definir_contador(self, numero: int):
+        """Atualiza o contador local sem nunca voltar para trás"""
+        with self._trava, self._conn:
+            self._conn.execute(
+                'INSERT INTO contador (id, ultimo_numero) VALUES (1, ?) '
+                'ON CONFLICT(id) DO UPDATE SET ultimo_numero = MAX(ultimo_numero, excluded.ultimo_numero)',
+                (numero,)
+            )
+
+    def desde_para_sincronizar(self) -> str | None:
+        """Marca (UTC, com margem) a partir da qual buscar alterações; None = carga completa"""
+        if not self.marca:
+            return None
+        desde = _para_utc(self.marca) - timedelta(seconds=ESPELHO_MARGEM)
+        return desde.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+    def concluir_sincronizacao(self):
+        """Avança a marca d'água para o maior `timestamp`/`fechado_em` conhecido"""
+        with self._trava, self._conn:
+            linha = self._conn.execute('SELECT MAX(timestamp), MAX(fechado_em) FROM pedidos').fetchone()
+            candidatas = [v for v in linha if v]
+            if candidatas:
+                self.marca = max(candidatas, key=_para_utc)
+            self.sincronizado_em = time.time()
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO espelho_meta (chave, valor) VALUES (?, ?)',
+                [('marca', self.marca), ('sincronizado_em', str(self.sincronizado_em))]
+            )
+
+    def defasagem(self) -> float | None:
+        """Segundos desde a última sincronização bem-sucedida"""
+        if self.sincronizado_em is None:
+            return None
+        return time.time() - self.sincronizado_em
+
+    def descrever_defasagem(self) -> str:
+        """Texto curto para rodapés de embeds"""
+        defasagem = self.defasagem()
+        if defasagem is None:
+            return 'espelho local ainda não sincronizado'
+        if defasagem < 120:
+            return f'espelho local atualizado há {defasagem:.0f}s'
+        return f'espelho local atualizado há {defasagem / 60:.0f} min'
+
+    # ==========================
+    # 📖 Leituras
+    # ==========================
+    def buscar_pedido(self, pedido_id: str) -> dict | None:
+        with self._trava:
+            linha = self._conn.execute(
+                'SELECT * FROM pedidos WHERE pedido_id = ? ORDER BY timestamp DESC, id DESC LIMIT 1',
+                (pedido_id,)
+            ).fetchone()
+        return dict(linha) if linha else None
+
+    def listar_pedidos(self, status: str = None, limite: int = 10, *, colunas: tuple = COLUNAS,
+                       plano: str = None, moderador_id: int = None, desde: str = None, ate: str = None,
+                       cursor: tuple = None) -> list[dict]:
+        """Pedidos do mais novo para o mais antigo; `cursor` = (timestamp, id) do último item da página anterior"""
+        condicoes, params = [], []
+        for coluna, valor in (('status', status), ('plano', plano), ('moderador_id', moderador_id)):
+            if valor is not None:
+                condicoes.append(f'{coluna} = ?')
+                params.append(valor)
+        if desde:
+            condicoes.append('timestamp >= ?')
+            params.append(_normalizar(desde))
+        if ate:
+            condicoes.append('timestamp < ?')
+            params.append(_normalizar(ate))
+        if cursor:
+            condicoes.append('(timestamp, id) < (?, ?)')
+            params.extend((_normalizar(cursor[0]), cursor[1]))
+
+        sql = f"SELECT {', '.join(colunas)} FROM pedidos"
+        if condicoes:
+            sql += ' WHERE ' + ' AND '.join(condicoes)
+        sql += ' ORDER BY timestamp DESC, id DESC LIMIT ?'
+        params.append(limite)
+        with self._trava:
+            return [dict(linha) for linha in self._conn.execute(sql, params).fetchall()]
+
+    def ultimo_numero(self) -> int | None:
+        with self._trava:
+            linha = self._conn.execute('SELECT ultimo_numero FROM contador WHERE id = 1').fetchone()
+        return linha[0] if linha else None
+
+    def maior_numero_usado(self) -> int | None:
+        with self._trava:
+            return self._conn.execute('SELECT MAX(pedido_number) FROM pedidos').fetchone()[0]
+
+    def agregados(self) -> tuple[list, list]:
+        """Contagens por (dia, plano, evento) e por (dia, moderador, evento), para as estatísticas"""
+        with self._trava:
+            por_plano = self._conn.execute('''
+                SELECT substr(timestamp, 1, 10) AS dia, plano,
+                       CASE WHEN status = 'reprovado' THEN 'reprovado' ELSE 'aprovado' END AS evento,
+                       COUNT(*) AS quantidade
+                FROM pedidos WHERE timestamp IS NOT NULL GROUP BY 1, 2, 3
+                UNION ALL
+                SELECT substr(fechado_em, 1, 10), plano, 'fechado', COUNT(*)
+                FROM pedidos WHERE status = 'fechado' AND fechado_em IS NOT NULL GROUP BY 1, 2
+            ''').fetchall()
+            por_moderador = self._conn.execute('''
+                SELECT substr(timestamp, 1, 10) AS dia, moderador_id,
+                       CASE WHEN status = 'reprovado' THEN 'reprovado' ELSE 'aprovado' END AS evento,
+                       COUNT(*) AS quantidade
+                FROM pedidos WHERE timestamp IS NOT NULL AND moderador_id IS NOT NULL GROUP BY 1, 2, 3
+            ''').fetchall()
+        return [tuple(linha) for linha in por_plano], [tuple(linha) for linha in por_moderador]
+
+    def metricas(self) -> dict:
+        with self._trava:
+            registros = self._conn.execute('SELECT COUNT(*) FROM pedidos').fetchone()[0] if self._conn else 0
+        defasagem = self.defasagem()
+        return {
+            'pronto': self.pronto,
+            'registros': registros,
+            'marca': self.marca,
+            'defasagem_s': round(defasagem, 1) if defasagem is not None else None,
+        }
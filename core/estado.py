@@ -0,0 +1,49 @@
+"""Pequeno armazenamento chave → valor (JSON) no SQLite local, para estado do bot entre reinícios"""
+import json
+import threading
+
+from core.banco_local import LOCAL_DB_PATH, abrir_banco
+
+
+class EstadoLocal:
+    """IDs de mensagens fixas, marcas de sincronização e afins — nada que precise ir para o Supabase"""
+
+    def __init__(self, caminho: str = LOCAL_DB_PATH):
+        self.caminho = caminho
+        self._conn = None
+        self._trava = threading.Lock()
+
+    def abrir(self):
+        if self._conn is not None:
+            return
+
+        self._conn = abrir_banco(self.caminho)
+        with self._trava, self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS estado_bot (
+                    chave TEXT PRIMARY KEY,
+                    valor TEXT NOT NULL
+                )
+            ''')
+
+    def fechar(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def obter(self, chave: str, padrao=None):
+        with self._trava:
+            linha = self._conn.execute('SELECT valor FROM estado_bot WHERE chave = ?', (chave,)).fetchone()
+        return json.loads(linha['valor']) if linha else padrao
+
+    def definir(self, chave: str, valor):
+        with self._trava, self._conn:
+            self._conn.execute(
+                'INSERT INTO estado_bot (chave, valor) VALUES (?, ?) '
+                'ON CONFLICT(chave) DO UPDATE SET valor = excluded.valor',
+                (chave, json.dumps(valor))
+            )
+
+    def remover(self, chave: str):
+        with self._trava, self._conn:
+            self._conn.execute('DELETE FROM estado_bot WHERE chave = ?', (chave,))
@@ -0,0 +1,226 @@
+"""Estatísticas de pedidos mantidas incrementalmente (aprovação, volume por plano, tempo de decisão)"""
+import asyncio
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+from core.banco_local import LOCAL_DB_PATH, abrir_banco
+
+ESTATISTICAS_INTERVALO = float(os.getenv('ESTATISTICAS_INTERVALO', 3600))
+
+EVENTOS = ('aprovado', 'reprovado', 'fechado')
+
+
+def _dia(quando: datetime = None) -> str:
+    return (quando or datetime.now(timezone.utc)).strftime('%Y-%m-%d')
+
+
+def agregar(registros: list[dict]) -> tuple[list, list]:
+    """Mesmas contagens de `EspelhoPedidos.agregados`, a partir de registros do Supabase"""
+    por_plano: dict[tuple, int] = {}
+    por_moderador: dict[tuple, int] = {}
+    for r in registros:
+        if r.get('timestamp'):
+            evento = 'reprovado' if r['status'] == 'reprovado' else 'aprovado'
+            chave = (r['timestamp'][:10], r['plano'], evento)
+            por_plano[chave] = por_plano.get(chave, 0) + 1
+            if r.get('moderador_id'):
+                chave = (r['timestamp'][:10], r['moderador_id'], evento)
+                por_moderador[chave] = por_moderador.get(chave, 0) + 1
+        if r['status'] == 'fechado' and r.get('fechado_em'):
+            chave = (r['fechado_em'][:10], r['plano'], 'fechado')
+            por_plano[chave] = por_plano.get(chave, 0) + 1
+    return ([(*k, v) for k, v in por_plano.items()], [(*k, v) for k, v in por_moderador.items()])
+
+
+class EstatisticasPedidos:
+    """Contadores diários atualizados a cada aprovação/reprovação/fechamento
+
+    Ler um período soma apenas os baldes diários (dias × planos), nunca a
+    tabela de pedidos. A reconciliação periódica refaz as contagens a partir
+    do espelho (ou do Supabase, se o espelho não estiver pronto) e corrige o
+    que tiver escapado; os tempos de decisão só existem nos eventos e são
+    preservados.
+    """
+
+    def __init__(self, caminho: str = LOCAL_DB_PATH):
+        self.caminho = caminho
+        self._conn = None
+        # A reconciliação grava a partir de uma thread auxiliar
+        self._trava = threading.Lock()
+        self._por_plano: dict[tuple, int] = {}
+        # (dia, moderador_id, evento) → [quantidade, soma dos tempos de decisão (s), decisões com tempo]
+        self._por_moderador: dict[tuple, list] = {}
+        self.reconciliado_em: datetime | None = None
+        self.divergencias = 0
+
+    def abrir(self):
+        if self._conn is not None:
+            return
+
+        self._conn = abrir_banco(self.caminho)
+        with self._trava, self._conn:
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS estat_planos (
+                    dia TEXT NOT NULL,
+                    plano TEXT NOT NULL,
+                    evento TEXT NOT NULL,
+                    quantidade INTEGER NOT NULL,
+                    PRIMARY KEY (dia, plano, evento)
+                ) WITHOUT ROWID;
+
+                CREATE TABLE IF NOT EXISTS estat_moderadores (
+                    dia TEXT NOT NULL,
+                    moderador_id INTEGER NOT NULL,
+                    evento TEXT NOT NULL,
+                    quantidade INTEGER NOT NULL,
+                    soma_segundos REAL NOT NULL DEFAULT 0,
+                    com_tempo INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (dia, moderador_id, evento)
+                ) WITHOUT ROWID;
+            ''')
+            for dia, plano, evento, quantidade in self._conn.execute('SELECT * FROM estat_planos'):
+                self._por_plano[(dia, plano, evento)] = quantidade
+            for dia, moderador_id, evento, quantidade, soma, com_tempo in self._conn.execute(
+                'SELECT * FROM estat_moderadores'
+            ):
+                self._por_moderador[(dia, moderador_id, evento)] = [quantidade, soma, com_tempo]
+
+    def fechar(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ==========================
+    # 📥 Eventos
+    # ==========================
+    def _somar_plano(self, dia: str, plano: str, evento: str):
+        chave = (dia, plano, evento)
+        self._por_plano[chave] = self._por_plano.get(chave, 0) + 1
+        self._conn.execute(
+            'INSERT INTO estat_planos (dia, plano, evento, quantidade) VALUES (?, ?, ?, 1) '
+            'ON CONFLICT DO UPDATE SET quantidade = quantidade + 1',
+            chave
+        )
+
+    def registrar_decisao(self, plano: str, evento: str, moderador_id: int, duracao_s: float = None):
+        """`evento` é 'aprovado' ou 'reprovado'; `duracao_s` vai do envio do comprovante até a decisão"""
+        dia = _dia()
+        with self._trava, self._conn:
+            self._somar_plano(dia, plano, evento)
+            atual = self._por_moderador.setdefault((dia, moderador_id, evento), [0, 0.0, 0])
+            atual[0] += 1
+            if duracao_s is not None:
+                atual[1] += duracao_s
+                atual[2] += 1
+            self._conn.execute(
+                'INSERT OR REPLACE INTO estat_moderadores VALUES (?, ?, ?, ?, ?, ?)',
+                (dia, moderador_id, evento, *atual)
+            )
+
+    def registrar_fechamento(self, plano: str):
+        with self._trava, self._conn:
+            self._somar_plano(_dia(), plano, 'fechado')
+
+    # ==========================
+    # 📊 Leitura
+    # ==========================
+    def resumo(self, dias: int = None) -> dict:
+        """Totais dos últimos `dias` dias (incluindo hoje); None = todo o histórico"""
+        corte = _dia(datetime.now(timezone.utc) - timedelta(days=dias - 1)) if dias else ''
+        totais = dict.fromkeys(EVENTOS, 0)
+        planos: dict[str, dict] = {}
+        moderadores: dict[int, dict] = {}
+
+        with self._trava:
+            for (dia, plano, evento), quantidade in self._por_plano.items():
+                if dia >= corte:
+                    totais[evento] += quantidade
+                    planos.setdefault(plano, dict.fromkeys(EVENTOS, 0))[evento] += quantidade
+            for (dia, moderador_id, evento), (quantidade, soma, com_tempo) in self._por_moderador.items():
+                if dia >= corte:
+                    m = moderadores.setdefault(moderador_id, {'aprovado': 0, 'reprovado': 0, 'soma': 0.0, 'com_tempo': 0})
+                    m[evento] += quantidade
+                    m['soma'] += soma
+                    m['com_tempo'] += com_tempo
+
+        decididos = totais['aprovado'] + totais['reprovado']
+        return {
+            'dias': dias,
+            'totais': totais,
+            'taxa_aprovacao': round(totais['aprovado'] / decididos, 4) if decididos else None,
+            'planos': planos,
+            'moderadores': {
+                moderador_id: {
+                    'aprovado': m['aprovado'],
+                    'reprovado': m['reprovado'],
+                    'tempo_medio_s': round(m['soma'] / m['com_tempo'], 1) if m['com_tempo'] else None,
+                }
+                for moderador_id, m in moderadores.items()
+            },
+            'reconciliado_em': self.reconciliado_em.isoformat() if self.reconciliado_em else None,
+        }
+
+    # ==========================
+    # 🔄 Reconciliação
+    # ==========================
+    def _substituir(self, por_plano: list, por_moderador: list) -> int:
+        novos_planos = {(dia, plano, evento): q for dia, plano, evento, q in por_plano if dia}
+        with self._trava, self._conn:
+            divergencias = sum(
+                1 for chave in set(novos_planos) | set(self._por_plano)
+                if novos_planos.get(chave, 0) != self._por_plano.get(chave, 0)
+            )
+            self._por_plano = novos_planos
+            self._conn.execute('DELETE FROM estat_planos')
+            self._conn.executemany(
+                'INSERT INTO estat_planos VALUES (?, ?, ?, ?)', [(*k, v) for k, v in novos_planos.items()]
+            )
+
+            # Quantidades vêm da fonte; tempos de decisão são preservados
+            novos_moderadores = {}
+            for dia, moderador_id, evento, quantidade in por_moderador:
+                if not dia:
+                    continue
+                _, soma, com_tempo = self._por_moderador.get((dia, moderador_id, evento), (0, 0.0, 0))
+                novos_moderadores[(dia, moderador_id, evento)] = [quantidade, soma, com_tempo]
+            self._por_moderador = novos_moderadores
+            self._conn.execute('DELETE FROM estat_moderadores')
+            self._conn.executemany(
+                'INSERT INTO estat_moderadores VALUES (?, ?, ?, ?, ?, ?)',
+                [(*k, *v) for k, v in novos_moderadores.items()]
+            )
+        return divergencias
+
+    async def reconciliar(self, db) -> int:
+        """Recalcula as contagens a partir dos pedidos; retorna quantos baldes estavam diferentes"""
+        if db.leitura_local:
+            por_plano, por_moderador = await asyncio.to_thread(db.espelho.agregados)
+        else:
+            registros, apos_id = [], 0
+            while True:
+                pagina = await db.listar_remoto(apos_id=apos_id)
+                if not pagina:
+                    break
+                registros.extend(
+                    {c: r.get(c) for c in ('timestamp', 'fechado_em', 'status', 'plano', 'moderador_id')}
+                    for r in pagina
+                )
+                apos_id = pagina[-1]['id']
+            por_plano, por_moderador = agregar(registros)
+
+        divergencias = await asyncio.to_thread(self._substituir, por_plano, por_moderador)
+        self.reconciliado_em = datetime.now(timezone.utc)
+        self.divergencias += divergencias
+        return divergencias
+
+    async def executar(self, db, intervalo: float = ESTATISTICAS_INTERVALO):
+        """Reconciliação periódica (a primeira logo no início)"""
+        while True:
+            try:
+                divergencias = await self.reconciliar(db)
+                if divergencias:
+                    print(f"📊 [Estatísticas] Reconciliadas ({divergencias} contagens corrigidas)")
+            except Exception as e:
+                print(f"❌ [Estatísticas] Erro na reconciliação: {e}")
+            await asyncio.sleep(intervalo)
@@ -0,0 +1,211 @@
+"""Exclusões agendadas de mensagens (sigilo dos comprovantes, avisos temporários)"""
+import asyncio
+import heapq
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import discord
+
+from core.agendador import Prioridade
+from core.banco_local import LOCAL_DB_PATH, abrir_banco
+
+EXCLUSOES_TENTATIVAS = int(os.getenv('EXCLUSOES_TENTATIVAS', 5))
+# O Discord só apaga em lote mensagens com menos de 14 dias, no máximo 100 por chamada
+_LIMITE_LOTE = 100
+_IDADE_MAXIMA_LOTE = timedelta(days=14) - timedelta(minutes=5)
+
+
+class AgendadorExclusoes:
+    """Um heap de (horário, canal, mensagem) e um único worker no lugar de um `sleep` por mensagem
+
+    As exclusões vencidas são agrupadas por canal e saem num só
+    `delete_messages`. Tudo fica gravado no SQLite local, então um restart
+    não deixa comprovantes esquecidos no canal. Reagendar uma mensagem não
+    tira a entrada antiga do heap: `_agendadas` guarda o horário vigente de
+    cada uma e entradas que não batem com ele são descartadas ao sair.
+    """
+
+    def __init__(self, bot, caminho: str = LOCAL_DB_PATH, tentativas: int = EXCLUSOES_TENTATIVAS):
+        self.bot = bot
+        self.caminho = caminho
+        self.tentativas = tentativas
+        self._heap: list[tuple[float, int, int]] = []
+        self._agendadas: dict[tuple[int, int], float] = {}
+        self._sinal = asyncio.Event()
+        self._tarefa: asyncio.Task | None = None
+        self._conn = None
+
+        # Métricas
+        self.apagadas = 0
+        self.chamadas = 0
+        self.falhas = 0
+
+    def abrir(self):
+        if self._conn is not None:
+            return
+
+        self._conn = abrir_banco(self.caminho)
+        with self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS exclusoes (
+                    canal_id INTEGER NOT NULL,
+                    mensagem_id INTEGER NOT NULL,
+                    apagar_em REAL NOT NULL,
+                    tentativas INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (canal_id, mensagem_id)
+                )
+            ''')
+        for apagar_em, canal_id, mensagem_id in self._conn.execute(
+            'SELECT apagar_em, canal_id, mensagem_id FROM exclusoes'
+        ):
+            self._heap.append((apagar_em, canal_id, mensagem_id))
+            self._agendadas[(canal_id, mensagem_id)] = apagar_em
+        heapq.heapify(self._heap)
+        if self._heap:
+            print(f"🗑️ [Exclusões] {len(self._heap)} exclusões pendentes recuperadas")
+
+    def iniciar(self):
+        if self._tarefa is None:
+            self._tarefa = asyncio.create_task(self._executar())
+
+    def parar(self):
+        if self._tarefa:
+            self._tarefa.cancel()
+            self._tarefa = None
+
+    def fechar(self):
+        self.parar()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    @property
+    def pendentes(self) -> int:
+        return len(self._agendadas)
+
+    # ==========================
+    # 📥 Agendar
+    # ==========================
+    def agendar(self, *mensagens: discord.Message, atraso: float):
+        """Apaga as mensagens daqui a `atraso` segundos (mensagens None são ignoradas)"""
+        apagar_em = time.time() + atraso
+        linhas = [(apagar_em, m.channel.id, m.id) for m in mensagens if m is not None]
+        if not linhas:
+            return
+        with self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO exclusoes (apagar_em, canal_id, mensagem_id) VALUES (?, ?, ?)', linhas
+            )
+        for linha in linhas:
+            self._empilhar(*linha)
+        self._sinal.set()
+
+    def _empilhar(self, apagar_em: float, canal_id: int, mensagem_id: int):
+        self._agendadas[(canal_id, mensagem_id)] = apagar_em
+        heapq.heappush(self._heap, (apagar_em, canal_id, mensagem_id))
+
+    def _descartar_obsoletas(self):
+        """Tira do topo do heap as entradas substituídas por um reagendamento ou já concluídas"""
+        while self._heap:
+            apagar_em, canal_id, mensagem_id = self._heap[0]
+            if self._agendadas.get((canal_id, mensagem_id)) == apagar_em:
+                break
+            heapq.heappop(self._heap)
+
+    # ==========================
+    # ⚙️ Execução
+    # ==========================
+    def _vencidas(self) -> dict[int, list[int]]:
+        agora = time.time()
+        por_canal: dict[int, list[int]] = {}
+        self._descartar_obsoletas()
+        while self._heap and self._heap[0][0] <= agora:
+            _, canal_id, mensagem_id = heapq.heappop(self._heap)
+            # Sai do mapa já aqui: um reagendamento durante a exclusão volta a valer
+            del self._agendadas[(canal_id, mensagem_id)]
+            por_canal.setdefault(canal_id, []).append(mensagem_id)
+            self._descartar_obsoletas()
+        return por_canal
+
+    async def _executar(self):
+        await self.bot.wait_until_ready()
+        while True:
+            por_canal = self._vencidas()
+            if not por_canal:
+                espera = self._heap[0][0] - time.time() if self._heap else None
+                self._sinal.clear()
+                try:
+                    await asyncio.wait_for(self._sinal.wait(), timeout=espera)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await asyncio.gather(*(self._apagar_canal(c, ids) for c, ids in por_canal.items()))
+
+    async def _apagar_canal(self, canal_id: int, ids: list[int]):
+        canal = self.bot.get_channel(canal_id)
+        if canal is None:
+            # Canal apagado (ou fora do cache): não há o que fazer
+            self._concluir(canal_id, ids)
+            return
+
+        limite = datetime.now(timezone.utc) - _IDADE_MAXIMA_LOTE
+        recentes = [i for i in ids if discord.utils.snowflake_time(i) > limite]
+        antigas = [i for i in ids if i not in recentes]
+
+        lotes = [recentes[i:i + _LIMITE_LOTE] for i in range(0, len(recentes), _LIMITE_LOTE)]
+        lotes += [[i] for i in antigas]
+        for lote in lotes:
+            try:
+                await self.bot.agendador.enviar(
+                    f'canal:{canal_id}:exclusoes', lambda l=lote: self._chamar(canal, l), prioridade=Prioridade.LOG
+                )
+                self.apagadas += len(lote)
+                self._concluir(canal_id, lote)
+            except discord.NotFound:
+                self._concluir(canal_id, lote)
+            except Exception as e:
+                self.falhas += 1
+                print(f"❌ [Exclusões] Falha ao apagar {len(lote)} mensagem(ns) no canal {canal_id}: {e}")
+                self._reagendar(canal_id, lote)
+
+    async def _chamar(self, canal, ids: list[int]):
+        self.chamadas += 1
+        if len(ids) == 1:
+            await canal.get_partial_message(ids[0]).delete()
+        else:
+            await canal.delete_messages([discord.Object(id=i) for i in ids])
+
+    def _concluir(self, canal_id: int, ids: list[int]):
+        with self._conn:
+            self._conn.executemany(
+                'DELETE FROM exclusoes WHERE canal_id = ? AND mensagem_id = ?', [(canal_id, i) for i in ids]
+            )
+
+    def _reagendar(self, canal_id: int, ids: list[int]):
+        with self._conn:
+            for mensagem_id in ids:
+                linha = self._conn.execute(
+                    'SELECT tentativas FROM exclusoes WHERE canal_id = ? AND mensagem_id = ?', (canal_id, mensagem_id)
+                ).fetchone()
+                tentativas = (linha['tentativas'] if linha else 0) + 1
+                if tentativas >= self.tentativas:
+                    self._conn.execute(
+                        'DELETE FROM exclusoes WHERE canal_id = ? AND mensagem_id = ?', (canal_id, mensagem_id)
+                    )
+                    continue
+                apagar_em = time.time() + 30 * 2 ** tentativas
+                self._conn.execute(
+                    'UPDATE exclusoes SET apagar_em = ?, tentativas = ? WHERE canal_id = ? AND mensagem_id = ?',
+                    (apagar_em, tentativas, canal_id, mensagem_id)
+                )
+                self._empilhar(apagar_em, canal_id, mensagem_id)
+
+    def metricas(self) -> dict:
+        return {
+            'pendentes': self.pendentes,
+            'apagadas': self.apagadas,
+            'chamadas': self.chamadas,
+            'falhas': self.falhas,
+        }
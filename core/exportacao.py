@@ -0,0 +1,116 @@
+"""Exportação do histórico de pedidos em CSV/JSONL comprimido, página por página"""
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+
+from core.espelho import COLUNAS
+from core.repositorio import SUPABASE_PAGINA
+
+FORMATOS = ('csv', 'jsonl')
+# Folga para o que ainda está no buffer do compressor e o trailer do gzip
+_MARGEM_BYTES = 256 * 1024
+
+
+class _ArquivoParte:
+    """Um `.gz` aberto; `tamanho` é o quanto já foi de fato gravado no disco"""
+
+    def __init__(self, caminho: str, formato: str):
+        self.caminho = caminho
+        self._bruto = open(caminho, 'wb')
+        self._gzip = gzip.GzipFile(fileobj=self._bruto, mode='wb', compresslevel=6)
+        self._texto = io.TextIOWrapper(self._gzip, encoding='utf-8', newline='')
+        self._csv = None
+        if formato == 'csv':
+            self._csv = csv.DictWriter(self._texto, fieldnames=COLUNAS, extrasaction='ignore')
+            self._csv.writeheader()
+
+    @property
+    def tamanho(self) -> int:
+        return self._bruto.tell()
+
+    def escrever(self, registro: dict):
+        if self._csv:
+            self._csv.writerow(registro)
+        else:
+            self._texto.write(json.dumps(registro, ensure_ascii=False, default=str) + '\n')
+
+    def fechar(self):
+        self._texto.close()
+        self._bruto.close()
+
+
+class ExportadorPedidos:
+    """Lê `pedidos` por cursor (timestamp, id) e grava em partes comprimidas de até `limite_bytes`
+
+    Só uma página fica na memória por vez; a compressão roda numa thread
+    auxiliar para não travar o event loop. `limite_bytes=0` gera um único
+    arquivo.
+
+    O histórico sai sempre do Supabase, nunca do espelho local: antes, o
+    outbox é drenado para que as escritas do próprio bot entrem no arquivo.
+    O que não puder ser enviado agora fica de fora e é contado em
+    `pendentes_outbox`.
+    """
+
+    def __init__(self, db, pasta: str, *, formato: str = 'csv', limite_bytes: int = 0,
+                 pagina: int = SUPABASE_PAGINA):
+        if formato not in FORMATOS:
+            raise ValueError(f'Formato inválido: {formato} (use {" ou ".join(FORMATOS)})')
+        self.db = db
+        self.pasta = pasta
+        self.formato = formato
+        self.limite_bytes = limite_bytes
+        self.pagina = pagina
+        self.registros = 0
+        self.pendentes_outbox = 0
+        self.partes: list[str] = []
+        self._atual: _ArquivoParte | None = None
+
+    def _nova_parte(self, prefixo: str) -> _ArquivoParte:
+        caminho = os.path.join(self.pasta, f'{prefixo}-parte{len(self.partes) + 1:02d}.{self.formato}.gz')
+        self.partes.append(caminho)
+        return _ArquivoParte(caminho, self.formato)
+
+    def _gravar_pagina(self, registros: list[dict], prefixo: str):
+        for registro in registros:
+            if self._atual is None:
+                self._atual = self._nova_parte(prefixo)
+            self._atual.escrever(registro)
+            if self.limite_bytes and self._atual.tamanho >= self.limite_bytes - _MARGEM_BYTES:
+                self._atual.fechar()
+                self._atual = None
+
+    async def exportar(self, prefixo: str = 'pedidos', *, status: str = None,
+                       desde: str = None, ate: str = None) -> list[str]:
+        """Gera os arquivos e devolve os caminhos, na ordem"""
+        os.makedirs(self.pasta, exist_ok=True)
+        outbox = getattr(self.db, 'outbox', None)
+        if outbox:
+            await outbox.drenar(self.db)
+            self.pendentes_outbox = outbox.metricas()['pendentes']
+
+        cursor = None
+        try:
+            while True:
+                registros = await self.db.listar_pedidos(
+                    status, self.pagina, colunas=COLUNAS, desde=desde, ate=ate, cursor=cursor, remoto=True
+                )
+                if not registros:
+                    break
+                await asyncio.to_thread(self._gravar_pagina, registros, prefixo)
+                self.registros += len(registros)
+                if len(registros) < self.pagina:
+                    break
+                cursor = (registros[-1]['timestamp'], registros[-1]['id'])
+
+            if self._atual is None and not self.partes:
+                # Nada encontrado: ainda assim um arquivo (só com o cabeçalho, no CSV)
+                self._atual = self._nova_parte(prefixo)
+        finally:
+            if self._atual is not None:
+                self._atual.fechar()
+                self._atual = None
+        return self.partes
@@ -0,0 +1,126 @@
+"""Normalização de imagens dos comprovantes (sem EXIF, tamanho limitado) e miniaturas, fora do event loop"""
+import asyncio
+import functools
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+IMAGEM_LADO_MAX = int(os.getenv('IMAGEM_LADO_MAX', 2000))
+IMAGEM_FORMATO = os.getenv('IMAGEM_FORMATO', 'WEBP').upper()
+IMAGEM_QUALIDADE = int(os.getenv('IMAGEM_QUALIDADE', 80))
+MINIATURA_LADO = int(os.getenv('MINIATURA_LADO', 400))
+IMAGEM_PROCESSOS = int(os.getenv('IMAGEM_PROCESSOS', min(2, os.cpu_count() or 1)))
+
+EXTENSOES = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+
+@functools.cache
+def carregar_pil():
+    """Importa o Pillow no primeiro uso (não pesa na inicialização do bot); vale também nos processos auxiliares"""
+    from PIL import Image, ImageOps
+
+    # Prints de celular passam longe disso; acima é arquivo malicioso ou inútil
+    Image.MAX_IMAGE_PIXELS = 40_000_000
+    return Image, ImageOps
+
+
+def normalizar(origem: str, destino_base: str, lado_max: int = IMAGEM_LADO_MAX, formato: str = IMAGEM_FORMATO,
+               qualidade: int = IMAGEM_QUALIDADE, lado_miniatura: int = MINIATURA_LADO) -> dict:
+    """Roda no processo auxiliar: grava `<destino_base>.<ext>` e `<destino_base>.mini.jpg`
+
+    A orientação do EXIF é aplicada nos pixels antes de descartar os
+    metadados (nenhum `exif=` é passado ao salvar).
+    """
+    Image, ImageOps = carregar_pil()
+    with Image.open(origem) as original:
+        bytes_antes = os.path.getsize(origem)
+        imagem = ImageOps.exif_transpose(original)
+        if imagem.mode not in ('RGB', 'L'):
+            fundo = Image.new('RGB', imagem.size, 'white')
+            if imagem.mode in ('RGBA', 'LA', 'P'):
+                imagem = imagem.convert('RGBA')
+                fundo.paste(imagem, mask=imagem.split()[-1])
+            else:
+                fundo.paste(imagem.convert('RGB'))
+            imagem = fundo
+
+    imagem.thumbnail((lado_max, lado_max), Image.LANCZOS)
+    caminho = f'{destino_base}.{EXTENSOES[formato]}'
+    if formato == 'WEBP':
+        imagem.save(caminho, 'WEBP', quality=qualidade, method=4)
+    else:
+        imagem.save(caminho, 'JPEG', quality=qualidade, optimize=True, progressive=True)
+
+    miniatura = imagem.copy()
+    miniatura.thumbnail((lado_miniatura, lado_miniatura), Image.LANCZOS)
+    caminho_miniatura = f'{destino_base}.mini.jpg'
+    miniatura.convert('RGB').save(caminho_miniatura, 'JPEG', quality=70, optimize=True)
+
+    return {
+        'caminho': caminho,
+        'miniatura': caminho_miniatura,
+        'largura': imagem.width,
+        'altura': imagem.height,
+        'bytes_antes': bytes_antes,
+        'bytes_depois': os.path.getsize(caminho),
+    }
+
+
+class ProcessadorImagens:
+    """Fila de normalização num `ProcessPoolExecutor` (decodificar e re-codificar imagem é CPU pura)"""
+
+    def __init__(self, processos: int = IMAGEM_PROCESSOS):
+        self.processos = max(1, processos)
+        self._executor: ProcessPoolExecutor | None = None
+
+        # Métricas
+        self.processadas = 0
+        self.falhas = 0
+        self.bytes_economizados = 0
+        self._duracoes_ms: deque[float] = deque(maxlen=200)
+
+    def parar(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def normalizar(self, origem: str, destino_base: str) -> dict:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.processos)
+
+        inicio = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        resultado = await loop.run_in_executor(self._executor, normalizar, origem, destino_base)
+        self._duracoes_ms.append((time.perf_counter() - inicio) * 1000)
+        self.processadas += 1
+        self.bytes_economizados += max(0, resultado['bytes_antes'] - resultado['bytes_depois'])
+        return resultado
+
+    async def preparar(self, temporario: str) -> tuple[str, str, str | None]:
+        """Etapa pós-download usada pelo repositório de blobs: (arquivo, extensão, miniatura)
+
+        Se a imagem não puder ser decodificada o original é mantido, sem
+        miniatura, para o moderador ainda conseguir abrir o arquivo.
+        """
+        extensao = temporario.rsplit('.', 1)[-1]
+        try:
+            resultado = await self.normalizar(temporario, f'{temporario}.norm')
+        except Exception as e:
+            self.falhas += 1
+            print(f"⚠️ [Imagens] Mantendo original de {os.path.basename(temporario)}: {e}")
+            return temporario, extensao, None
+
+        os.remove(temporario)
+        return resultado['caminho'], resultado['caminho'].rsplit('.', 1)[-1], resultado['miniatura']
+
+    def metricas(self) -> dict:
+        duracoes = sorted(self._duracoes_ms)
+        return {
+            'processos': self.processos,
+            'processadas': self.processadas,
+            'falhas': self.falhas,
+            'bytes_economizados': self.bytes_economizados,
+            'duracao_ms_p50': round(duracoes[len(duracoes) // 2], 1) if duracoes else None,
+            'duracao_ms_p95': round(duracoes[int(len(duracoes) * 0.95)], 1) if duracoes else None,
+        }
@@ -0,0 +1,127 @@
+"""Download de anexos de comprovantes em streaming, com limites de tamanho e tipo"""
+import asyncio
+import hashlib
+import os
+
+import aiofiles
+import aiohttp
+
+COMPROVANTE_MAX_BYTES = int(os.getenv('COMPROVANTE_MAX_BYTES', 8 * 1024 * 1024))
+COMPROVANTE_TIPOS = tuple(
+    t.strip() for t in os.getenv('COMPROVANTE_TIPOS', 'image/png,image/jpeg,image/webp,application/pdf').split(',')
+    if t.strip()
+)
+COMPROVANTE_DOWNLOADS_SIMULTANEOS = int(os.getenv('COMPROVANTE_DOWNLOADS_SIMULTANEOS', 4))
+TAMANHO_BLOCO = 64 * 1024
+
+
+class ErroIngestao(Exception):
+    """Anexo recusado (tipo, tamanho) ou falha no download"""
+
+
+class IngestorAnexos:
+    """Baixa anexos do Discord direto para o disco, em blocos, sem carregar o arquivo na memória
+
+    Um semáforo global limita quantos downloads acontecem ao mesmo tempo no
+    processo inteiro; todos usam a sessão HTTP do bot (ou uma própria, se
+    nenhuma for passada em `abrir`).
+    """
+
+    def __init__(self, max_bytes: int = COMPROVANTE_MAX_BYTES, tipos: tuple = COMPROVANTE_TIPOS,
+                 simultaneos: int = COMPROVANTE_DOWNLOADS_SIMULTANEOS):
+        self.max_bytes = max_bytes
+        self.tipos = tipos
+        self.session: aiohttp.ClientSession | None = None
+        self._sessao_propria = False
+        self._semaforo = asyncio.Semaphore(simultaneos)
+
+        # Métricas
+        self.baixados = 0
+        self.recusados = 0
+        self.bytes_baixados = 0
+
+    def abrir(self, session: aiohttp.ClientSession):
+        self.session = session
+        self._sessao_propria = False
+
+    async def fechar(self):
+        if self._sessao_propria and self.session and not self.session.closed:
+            await self.session.close()
+
+    def validar(self, attachment):
+        """Checagem barata (metadados do Discord) antes de abrir qualquer conexão"""
+        tipo = (attachment.content_type or '').split(';')[0].strip().lower()
+        if tipo not in self.tipos:
+            raise ErroIngestao(f'`{attachment.filename}`: tipo não aceito ({tipo or "desconhecido"})')
+        if attachment.size > self.max_bytes:
+            raise ErroIngestao(
+                f'`{attachment.filename}`: arquivo grande demais '
+                f'({attachment.size / 1024 / 1024:.1f} MB, máximo {self.max_bytes / 1024 / 1024:.0f} MB)'
+            )
+
+    async def baixar(self, attachment, destino: str) -> tuple[int, str]:
+        """Salva o anexo em `destino`; retorna o número de bytes gravados e o SHA-256 do conteúdo"""
+        self.validar(attachment)
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession()
+            self._sessao_propria = True
+
+        temporario = f'{destino}.parte'
+        total = 0
+        resumo = hashlib.sha256()
+        async with self._semaforo:
+            try:
+                async with self.session.get(attachment.url, timeout=aiohttp.ClientTimeout(total=60)) as resp:
+                    if resp.status != 200:
+                        raise ErroIngestao(f'`{attachment.filename}`: download falhou (HTTP {resp.status})')
+                    if resp.content_length and resp.content_length > self.max_bytes:
+                        raise ErroIngestao(f'`{attachment.filename}`: arquivo grande demais')
+
+                    async with aiofiles.open(temporario, 'wb') as arquivo:
+                        async for bloco in resp.content.iter_chunked(TAMANHO_BLOCO):
+                            total += len(bloco)
+                            if total > self.max_bytes:
+                                raise ErroIngestao(f'`{attachment.filename}`: arquivo grande demais')
+                            resumo.update(bloco)
+                            await arquivo.write(bloco)
+
+                os.replace(temporario, destino)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                raise ErroIngestao(f'`{attachment.filename}`: download falhou ({e})') from e
+            finally:
+                if os.path.exists(temporario):
+                    os.remove(temporario)
+
+        self.baixados += 1
+        self.bytes_baixados += total
+        return total, resumo.hexdigest()
+
+    async def baixar_todos(self, anexos: list[tuple]) -> tuple[list, list[str]]:
+        """Baixa `(attachment, destino)` em paralelo
+
+        Retorna `(salvos, recusas)`: salvos como `(attachment, destino, sha256)`
+        e as recusas como mensagens prontas para o usuário.
+        """
+        resultados = await asyncio.gather(
+            *(self.baixar(attachment, destino) for attachment, destino in anexos),
+            return_exceptions=True
+        )
+
+        salvos, recusas = [], []
+        for (attachment, destino), resultado in zip(anexos, resultados):
+            if isinstance(resultado, ErroIngestao):
+                self.recusados += 1
+                recusas.append(str(resultado))
+            elif isinstance(resultado, BaseException):
+                self.recusados += 1
+                recusas.append(f'`{attachment.filename}`: erro inesperado ({resultado})')
+            else:
+                salvos.append((attachment, destino, resultado[1]))
+        return salvos, recusas
+
+    def metricas(self) -> dict:
+        return {
+            'baixados': self.baixados,
+            'recusados': self.recusados,
+            'bytes_baixados': self.bytes_baixados,
+        }
@@ -0,0 +1,146 @@
+"""Consulta de membros sem o cache completo do discord.py (intents mínimas, sem chunking)"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+import discord
+
+MEMBROS_CACHE_MAX = int(os.getenv('MEMBROS_CACHE_MAX', 256))
+MEMBROS_CACHE_TTL = float(os.getenv('MEMBROS_CACHE_TTL', 600))
+# Quem saiu do servidor costuma ser consultado de novo logo em seguida (aprovar/reprovar o mesmo pedido)
+MEMBROS_CACHE_TTL_NEGATIVO = float(os.getenv('MEMBROS_CACHE_TTL_NEGATIVO', 60))
+# minimo | membros | completo (ver `configuracao_gateway`)
+INTENTS_PERFIL = os.getenv('INTENTS_PERFIL', 'minimo').lower()
+
+
+def configuracao_gateway(perfil: str = INTENTS_PERFIL) -> dict:
+    """Argumentos de `commands.Bot` para cada perfil de intents
+
+    - `minimo`: mensagens de servidor/DM e conteúdo (comandos com `!`); nenhum
+      membro em cache além do próprio bot, consultas via `CacheMembros`.
+    - `membros`: acrescenta o intent privilegiado `members` (cache de quem
+      entra/fala), ainda sem baixar a lista inteira na inicialização.
+    - `completo`: o comportamento antigo (`Intents.all()` e chunking).
+    """
+    if perfil == 'completo':
+        intents = discord.Intents.all()
+        return {
+            'intents': intents,
+            'member_cache_flags': discord.MemberCacheFlags.from_intents(intents),
+            'chunk_guilds_at_startup': True,
+        }
+
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.guild_messages = True
+    intents.dm_messages = True
+    intents.message_content = True
+    if perfil == 'membros':
+        intents.members = True
+    elif perfil != 'minimo':
+        raise ValueError(f'INTENTS_PERFIL inválido: {perfil} (use minimo, membros ou completo)')
+
+    return {
+        'intents': intents,
+        'member_cache_flags': (
+            discord.MemberCacheFlags.from_intents(intents) if intents.members else discord.MemberCacheFlags.none()
+        ),
+        'chunk_guilds_at_startup': False,
+    }
+
+
+class CacheMembros:
+    """`guild.get_member` com reserva em `fetch_member`, guardando os resultados num LRU pequeno
+
+    Sem o intent `members` o discord.py quase não guarda membros; aqui só
+    ficam os poucos que o bot realmente precisa (clientes sendo aprovados ou
+    reprovados), no máximo `max_entradas`. Buscas simultâneas do mesmo membro
+    viram uma chamada só.
+    """
+
+    def __init__(self, max_entradas: int = MEMBROS_CACHE_MAX, ttl: float = MEMBROS_CACHE_TTL,
+                 ttl_negativo: float = MEMBROS_CACHE_TTL_NEGATIVO):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self._dados: OrderedDict[tuple[int, int], tuple[float, discord.Member | None]] = OrderedDict()
+        self._em_busca: dict[tuple[int, int], asyncio.Future] = {}
+
+        # Métricas
+        self.do_discord = 0
+        self.acertos = 0
+        self.buscas = 0
+        self.descartados = 0
+
+    async def obter(self, guild: discord.Guild, user_id: int) -> discord.Member | None:
+        """Membro do servidor, ou None se ele não está (mais) lá ou o Discord não respondeu"""
+        membro = guild.get_member(user_id)
+        if membro is not None:
+            self.do_discord += 1
+            return membro
+
+        chave = (guild.id, user_id)
+        entrada = self._dados.get(chave)
+        if entrada is not None:
+            expira_em, membro = entrada
+            if expira_em >= time.monotonic():
+                self._dados.move_to_end(chave)
+                self.acertos += 1
+                return membro
+            del self._dados[chave]
+
+        futuro = self._em_busca.get(chave)
+        if futuro is not None:
+            return await asyncio.shield(futuro)
+
+        futuro = self._em_busca[chave] = asyncio.get_running_loop().create_future()
+        try:
+            membro = await self._buscar(guild, user_id)
+        except asyncio.CancelledError:
+            futuro.cancel()
+            raise
+        except Exception as e:
+            futuro.set_exception(e)
+            # Pode não haver mais ninguém esperando: evita o aviso de exceção não lida
+            futuro.exception()
+            raise
+        else:
+            futuro.set_result(membro)
+            return membro
+        finally:
+            del self._em_busca[chave]
+
+    async def _buscar(self, guild: discord.Guild, user_id: int) -> discord.Member | None:
+        self.buscas += 1
+        try:
+            membro = await guild.fetch_member(user_id)
+        except discord.NotFound:
+            membro = None
+        except discord.HTTPException as e:
+            # Falha passageira: segue como "não encontrado", sem guardar
+            print(f"⚠️ [Membros] Falha ao buscar {user_id}: {e}")
+            return None
+        self._guardar((guild.id, user_id), membro)
+        return membro
+
+    def _guardar(self, chave: tuple[int, int], membro: discord.Member | None):
+        ttl = self.ttl if membro is not None else self.ttl_negativo
+        self._dados[chave] = (time.monotonic() + ttl, membro)
+        self._dados.move_to_end(chave)
+        while len(self._dados) > self.max_entradas:
+            self._dados.popitem(last=False)
+            self.descartados += 1
+
+    def invalidar(self, guild_id: int, user_id: int):
+        self._dados.pop((guild_id, user_id), None)
+
+    def metricas(self) -> dict:
+        return {
+            'entradas': len(self._dados),
+            'max_entradas': self.max_entradas,
+            'do_discord': self.do_discord,
+            'acertos': self.acertos,
+            'buscas': self.buscas,
+            'descartados': self.descartados,
+        }
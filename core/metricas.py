@@ -0,0 +1,331 @@
+"""Métricas no formato de exposição do Prometheus (histogramas, contadores e medidores)"""
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import discord
+
+METRICAS_PREFIXO = os.getenv('METRICAS_PREFIXO', 'unibot')
+METRICAS_LOOP_INTERVALO = float(os.getenv('METRICAS_LOOP_INTERVALO', 0.5))
+
+# Segundos; cobre de respostas do espelho local até uploads lentos
+BALDES_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BALDES_LOOP = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# custom_id gerado pelo discord.py para views sem ID fixo (um por mensagem: não vira rótulo)
+_ID_AUTOMATICO = re.compile(r'[0-9a-f]{32}')
+
+TIPO_INTERACAO = {
+    discord.InteractionType.application_command: 'comando',
+    discord.InteractionType.component: 'componente',
+    discord.InteractionType.modal_submit: 'modal',
+    discord.InteractionType.autocomplete: 'autocomplete',
+}
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatar(valor: float) -> str:
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+class _Metrica:
+    tipo = ''
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple, trava: threading.Lock):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self._trava = trava
+        self._series: dict[tuple, object] = {}
+
+    def _chave(self, rotulos: dict) -> tuple:
+        return tuple(str(rotulos.get(r, '')) for r in self.rotulos)
+
+    def _seletor(self, chave: tuple, extra: str = '') -> str:
+        pares = [f'{r}="{_escapar(v)}"' for r, v in zip(self.rotulos, chave)]
+        if extra:
+            pares.append(extra)
+        return '{' + ','.join(pares) + '}' if pares else ''
+
+    def linhas(self) -> list[str]:
+        saida = [f'# HELP {self.nome} {self.ajuda}', f'# TYPE {self.nome} {self.tipo}']
+        for chave, valor in sorted(self._series.items()):
+            saida.extend(self._linhas_serie(chave, valor))
+        return saida
+
+    def _linhas_serie(self, chave: tuple, valor) -> list[str]:
+        return [f'{self.nome}{self._seletor(chave)} {_formatar(valor)}']
+
+
+class Contador(_Metrica):
+    """Só cresce (`_total`)"""
+    tipo = 'counter'
+
+    def inc(self, valor: float = 1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._trava:
+            self._series[chave] = self._series.get(chave, 0) + valor
+
+    def sincronizar(self, total: float, **rotulos):
+        """Para contadores mantidos por outro componente (ex.: acertos do cache)"""
+        with self._trava:
+            self._series[self._chave(rotulos)] = total
+
+
+class Medidor(_Metrica):
+    """Valor instantâneo (fila, em andamento, atraso)"""
+    tipo = 'gauge'
+
+    def definir(self, valor: float, **rotulos):
+        with self._trava:
+            self._series[self._chave(rotulos)] = valor
+
+    def somar(self, delta: float, **rotulos):
+        chave = self._chave(rotulos)
+        with self._trava:
+            self._series[chave] = self._series.get(chave, 0) + delta
+
+
+class Histograma(_Metrica):
+    """Distribuição em baldes cumulativos, mais soma e contagem"""
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos, trava, baldes=BALDES_PADRAO):
+        super().__init__(nome, ajuda, rotulos, trava)
+        self.baldes = tuple(sorted(baldes))
+
+    def observar(self, valor: float, **rotulos):
+        chave = self._chave(rotulos)
+        with self._trava:
+            serie = self._series.get(chave)
+            if serie is None:
+                # [contagem por balde..., +Inf], soma
+                serie = self._series[chave] = [[0] * (len(self.baldes) + 1), 0.0]
+            for i, limite in enumerate(self.baldes):
+                if valor <= limite:
+                    serie[0][i] += 1
+                    break
+            else:
+                serie[0][-1] += 1
+            serie[1] += valor
+
+    def _linhas_serie(self, chave, serie) -> list[str]:
+        contagens, soma = serie
+        saida, acumulado = [], 0
+        for limite, quantidade in zip((*self.baldes, float('inf')), contagens):
+            acumulado += quantidade
+            le = 'le="' + _formatar(limite) + '"'
+            saida.append(f'{self.nome}_bucket{self._seletor(chave, le)} {acumulado}')
+        saida.append(f'{self.nome}_sum{self._seletor(chave)} {_formatar(soma)}')
+        saida.append(f'{self.nome}_count{self._seletor(chave)} {acumulado}')
+        return saida
+
+
+class RegistroMetricas:
+    """Conjunto de métricas servido em `/metrics`
+
+    Uma única trava protege todas as séries, para que threads auxiliares
+    (`asyncio.to_thread`) também possam registrar. `ao_expor` registra funções que
+    atualizam medidores derivados (ex.: taxa de acerto do cache) só quando
+    alguém lê.
+    """
+
+    def __init__(self, prefixo: str = METRICAS_PREFIXO):
+        self.prefixo = prefixo
+        self._trava = threading.Lock()
+        self._metricas: list[_Metrica] = []
+        self._coletores = []
+
+    def _criar(self, classe, nome, ajuda, rotulos, **extra):
+        metrica = classe(f'{self.prefixo}_{nome}', ajuda, tuple(rotulos), self._trava, **extra)
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nome: str, ajuda: str, rotulos: tuple = ()) -> Contador:
+        return self._criar(Contador, nome, ajuda, rotulos)
+
+    def medidor(self, nome: str, ajuda: str, rotulos: tuple = ()) -> Medidor:
+        return self._criar(Medidor, nome, ajuda, rotulos)
+
+    def histograma(self, nome: str, ajuda: str, rotulos: tuple = (), baldes=BALDES_PADRAO) -> Histograma:
+        return self._criar(Histograma, nome, ajuda, rotulos, baldes=baldes)
+
+    def ao_expor(self, coletor):
+        self._coletores.append(coletor)
+
+    def expor(self) -> str:
+        for coletor in self._coletores:
+            try:
+                coletor()
+            except Exception as e:
+                print(f"⚠️ [Métricas] Coletor falhou: {e}")
+        with self._trava:
+            linhas = [linha for metrica in self._metricas for linha in metrica.linhas()]
+        return '\n'.join(linhas) + '\n'
+
+
+class _LimitesDiscord(logging.Handler):
+    """Conta os 429 que o discord.py trata sozinho (ele só avisa no log `discord.http`)"""
+
+    def __init__(self, contador: Contador, espera: Contador):
+        super().__init__(logging.WARNING)
+        self.contador = contador
+        self.espera = espera
+
+    def emit(self, registro: logging.LogRecord):
+        mensagem = str(registro.msg)
+        if 'responded with 429' in mensagem and registro.args:
+            metodo, _, retry_after = registro.args
+            self.contador.inc(metodo=metodo)
+            self.espera.inc(float(retry_after))
+        elif mensagem.startswith('Global rate limit has been hit'):
+            self.contador.inc(metodo='global')
+
+
+class MetricasBot:
+    """Instrumentação do bot: comandos, interações, REST do Discord, Supabase e event loop"""
+
+    def __init__(self, registro: RegistroMetricas = None):
+        self.registro = registro or RegistroMetricas()
+        r = self.registro
+
+        self.comandos = r.histograma('comando_duracao_segundos', 'Duração dos comandos de prefixo', ('comando', 'resultado'))
+        self.comandos_erros = r.contador('comando_erros_total', 'Comandos que terminaram em erro', ('comando', 'erro'))
+        self.comandos_em_andamento = r.medidor('comandos_em_andamento', 'Comandos sendo executados agora')
+        self.interacoes = r.contador('interacoes_total', 'Interações recebidas (botões, modais, slash)', ('tipo', 'custom_id'))
+        self.interacoes_atraso = r.histograma(
+            'interacao_atraso_segundos', 'Do clique no Discord até o evento chegar ao bot', ('tipo',)
+        )
+
+        self.discord = r.histograma('discord_rest_duracao_segundos', 'Chamadas REST ao Discord (inclui esperas de rate limit)', ('metodo', 'rota'))
+        self.discord_erros = r.contador('discord_rest_erros_total', 'Chamadas REST ao Discord que falharam', ('metodo', 'rota', 'status'))
+        self.discord_em_andamento = r.medidor('discord_rest_em_andamento', 'Chamadas REST ao Discord em andamento')
+        self.discord_limites = r.contador('discord_rate_limits_total', 'Respostas 429 do Discord', ('metodo',))
+        self.discord_limites_espera = r.contador('discord_rate_limit_espera_segundos_total', 'Tempo total parado por 429')
+
+        self.supabase = r.histograma('supabase_duracao_segundos', 'Chamadas ao PostgREST do Supabase', ('metodo', 'recurso'))
+        self.supabase_erros = r.contador('supabase_erros_total', 'Chamadas ao Supabase que falharam', ('metodo', 'recurso', 'status'))
+        self.supabase_em_andamento = r.medidor('supabase_em_andamento', 'Chamadas ao Supabase em andamento')
+
+        self.loop_atraso = r.histograma('loop_atraso_segundos', 'Atraso do event loop em relação ao agendado', baldes=BALDES_LOOP)
+        self.loop_atraso_atual = r.medidor('loop_atraso_atual_segundos', 'Último atraso medido do event loop')
+
+        self.atraso_loop = 0.0
+        self._inicio_comandos: dict[int, float] = {}
+        self._tarefa_loop: asyncio.Task | None = None
+        self._handler: _LimitesDiscord | None = None
+
+    # ==========================
+    # 🔌 Instalação
+    # ==========================
+    def instrumentar(self, bot):
+        """Liga os eventos de comando/interação, o REST do Discord e a medição do loop"""
+        bot.add_listener(self._ao_comando, 'on_command')
+        bot.add_listener(self._ao_concluir_comando, 'on_command_completion')
+        bot.add_listener(self._ao_erro_comando, 'on_command_error')
+        bot.add_listener(self._ao_interagir, 'on_interaction')
+
+        original = bot.http.request
+
+        async def request(route, **kwargs):
+            # `route.path` é o modelo (`/channels/{channel_id}/messages`): cardinalidade fixa
+            inicio = time.perf_counter()
+            self.discord_em_andamento.somar(1)
+            try:
+                return await original(route, **kwargs)
+            except discord.HTTPException as e:
+                self.discord_erros.inc(metodo=route.method, rota=route.path, status=e.status)
+                raise
+            except Exception as e:
+                self.discord_erros.inc(metodo=route.method, rota=route.path, status=type(e).__name__)
+                raise
+            finally:
+                self.discord_em_andamento.somar(-1)
+                self.discord.observar(time.perf_counter() - inicio, metodo=route.method, rota=route.path)
+
+        bot.http.request = request
+
+        self._handler = _LimitesDiscord(self.discord_limites, self.discord_limites_espera)
+        logging.getLogger('discord.http').addHandler(self._handler)
+
+        if self._tarefa_loop is None:
+            self._tarefa_loop = asyncio.create_task(self._medir_loop())
+
+    def parar(self):
+        if self._tarefa_loop:
+            self._tarefa_loop.cancel()
+            self._tarefa_loop = None
+        if self._handler:
+            logging.getLogger('discord.http').removeHandler(self._handler)
+            self._handler = None
+
+    # ==========================
+    # 🎯 Eventos
+    # ==========================
+    async def _ao_comando(self, ctx):
+        self._inicio_comandos[ctx.message.id] = time.perf_counter()
+        self.comandos_em_andamento.somar(1)
+
+    def _fim_comando(self, ctx, resultado: str):
+        inicio = self._inicio_comandos.pop(ctx.message.id, None)
+        if inicio is None:
+            # Erro antes do comando começar (checagem, argumento): não entrou no "em andamento"
+            return
+        self.comandos_em_andamento.somar(-1)
+        nome = ctx.command.qualified_name if ctx.command else 'desconhecido'
+        self.comandos.observar(time.perf_counter() - inicio, comando=nome, resultado=resultado)
+
+    async def _ao_concluir_comando(self, ctx):
+        self._fim_comando(ctx, 'ok')
+
+    async def _ao_erro_comando(self, ctx, erro):
+        nome = ctx.command.qualified_name if ctx.command else 'desconhecido'
+        self.comandos_erros.inc(comando=nome, erro=type(getattr(erro, 'original', erro)).__name__)
+        self._fim_comando(ctx, 'erro')
+
+    async def _ao_interagir(self, interaction: discord.Interaction):
+        tipo = TIPO_INTERACAO.get(interaction.type, str(interaction.type.name))
+        dados = interaction.data or {}
+        custom_id = dados.get('custom_id') or dados.get('name', '')
+        if _ID_AUTOMATICO.fullmatch(custom_id):
+            custom_id = 'automatico'
+        self.interacoes.inc(tipo=tipo, custom_id=custom_id)
+        atraso = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+        self.interacoes_atraso.observar(max(atraso, 0.0), tipo=tipo)
+
+    @asynccontextmanager
+    async def medir_supabase(self, metodo: str, recurso: str):
+        """Envolve uma chamada ao Supabase; `ErroRepositorio.status` vira o rótulo do erro"""
+        recurso = recurso.split('?', 1)[0]
+        inicio = time.perf_counter()
+        self.supabase_em_andamento.somar(1)
+        try:
+            yield
+        except Exception as e:
+            self.supabase_erros.inc(metodo=metodo, recurso=recurso, status=getattr(e, 'status', None) or 'rede')
+            raise
+        finally:
+            self.supabase_em_andamento.somar(-1)
+            self.supabase.observar(time.perf_counter() - inicio, metodo=metodo, recurso=recurso)
+
+    async def _medir_loop(self, intervalo: float = METRICAS_LOOP_INTERVALO):
+        """Dorme `intervalo` e mede quanto a volta atrasou (callbacks bloqueando o loop)"""
+        while True:
+            inicio = time.perf_counter()
+            await asyncio.sleep(intervalo)
+            atraso = max(time.perf_counter() - inicio - intervalo, 0.0)
+            self.loop_atraso.observar(atraso)
+            self.loop_atraso_atual.definir(atraso)
+            self.atraso_loop = atraso
+
+    def expor(self) -> str:
+        return self.registro.expor()
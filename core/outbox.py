@@ -0,0 +1,234 @@
+"""Outbox persistente das escritas em `pedidos`"""
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+from core.banco_local import LOCAL_DB_PATH, abrir_banco
+from core.repositorio import ErroRepositorio
+
+OUTBOX_LOTE = int(os.getenv('OUTBOX_LOTE', 50))
+OUTBOX_INTERVALO = float(os.getenv('OUTBOX_INTERVALO', 30))
+OUTBOX_BACKOFF_BASE = float(os.getenv('OUTBOX_BACKOFF_BASE', 2))
+OUTBOX_BACKOFF_MAX = float(os.getenv('OUTBOX_BACKOFF_MAX', 300))
+
+# Erros HTTP que não adianta repetir (dados inválidos, permissão etc.)
+_STATUS_DEFINITIVOS = {400, 401, 403, 404, 405, 406, 409, 422}
+
+
+class OutboxPedidos:
+    """Fila local (SQLite) de inserções, atualizações e remoções de pedidos, enviada em segundo plano
+
+    Cada escrita é confirmada localmente e ganha uma chave de idempotência;
+    o worker agrupa inserções consecutivas num único POST em lote e repete
+    falhas temporárias com backoff exponencial, sempre na ordem de chegada.
+    Falhas definitivas (4xx) são marcadas como `falhou` e não travam a fila:
+    o espelho volta ao que o Supabase tem e `ao_descartar(operacao, dados,
+    filtro, erro)` é chamado para avisar os moderadores.
+    """
+
+    def __init__(self, caminho: str = LOCAL_DB_PATH, lote: int = OUTBOX_LOTE, ao_descartar=None):
+        self.caminho = caminho
+        self.lote = lote
+        self.ao_descartar = ao_descartar
+        self.enviados = 0
+        self.falhas = 0
+        self._conn = None
+        self._evento = asyncio.Event()
+        # Worker, exportação e desligamento podem drenar ao mesmo tempo: um de cada vez, para não reordenar
+        self._drenando = asyncio.Lock()
+
+    def abrir(self):
+        if self._conn is not None:
+            return
+
+        self._conn = abrir_banco(self.caminho)
+        self._conn.execute('PRAGMA synchronous=FULL')
+        with self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    operacao TEXT NOT NULL,
+                    chave TEXT NOT NULL UNIQUE,
+                    filtro TEXT,
+                    dados TEXT NOT NULL,
+                    estado TEXT NOT NULL DEFAULT 'pendente',
+                    tentativas INTEGER NOT NULL DEFAULT 0,
+                    proxima_tentativa REAL NOT NULL DEFAULT 0,
+                    ultimo_erro TEXT,
+                    criado_em REAL NOT NULL
+                )
+            ''')
+
+    def fechar(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ==========================
+    # 📥 Enfileirar
+    # ==========================
+    def _gravar(self, operacao: str, dados: dict, filtro: dict = None) -> int:
+        with self._conn:
+            cursor = self._conn.execute(
+                'INSERT INTO outbox (operacao, chave, filtro, dados, criado_em) VALUES (?, ?, ?, ?, ?)',
+                (operacao, uuid.uuid4().hex, json.dumps(filtro) if filtro else None, json.dumps(dados), time.time())
+            )
+        self._evento.set()
+        return cursor.lastrowid
+
+    def enfileirar_insercao(self, dados: dict) -> dict:
+        """Grava a inserção localmente e devolve o registro provisório (id negativo)"""
+        chave = dados.get('chave_idempotencia') or uuid.uuid4().hex
+        registro = {**dados, 'chave_idempotencia': chave}
+        entrada_id = self._gravar('inserir', registro)
+        return {**registro, 'id': -entrada_id}
+
+    def enfileirar_atualizacao(self, filtro: dict, dados: dict):
+        """Grava uma atualização (`filtro` coluna → valor) para envio posterior"""
+        self._gravar('atualizar', dados, filtro)
+
+    def enfileirar_remocao(self, filtro: dict):
+        """Grava a remoção dos registros que batem com `filtro` (desfaz uma inserção ainda na fila)"""
+        self._gravar('remover', {}, filtro)
+
+    # ==========================
+    # 📤 Drenar
+    # ==========================
+    def _entradas_pendentes(self) -> list:
+        return self._conn.execute(
+            "SELECT * FROM outbox WHERE estado = 'pendente' ORDER BY id LIMIT ?",
+            (self.lote,)
+        ).fetchall()
+
+    def _concluir(self, ids: list[int]):
+        with self._conn:
+            self._conn.executemany('DELETE FROM outbox WHERE id = ?', [(i,) for i in ids])
+        self.enviados += len(ids)
+
+    @staticmethod
+    def _definitivo(erro: Exception) -> bool:
+        return isinstance(erro, ErroRepositorio) and erro.status in _STATUS_DEFINITIVOS
+
+    @staticmethod
+    def _ja_gravado(entrada, erro: Exception) -> bool:
+        """409 na chave de idempotência: a inserção já chegou antes (a resposta é que se perdeu)"""
+        return (entrada['operacao'] == 'inserir' and isinstance(erro, ErroRepositorio)
+                and erro.status == 409 and 'chave_idempotencia' in erro.detalhe)
+
+    async def _descartar(self, db, entrada, erro: Exception):
+        dados = json.loads(entrada['dados'])
+        filtro = json.loads(entrada['filtro']) if entrada['filtro'] else None
+        try:
+            await db.desfazer_local(entrada['operacao'], dados, filtro)
+        except Exception as e:
+            print(f"⚠️ [Outbox] Espelho não corrigido após o descarte (a sincronização corrige depois): {e}")
+        if self.ao_descartar:
+            try:
+                self.ao_descartar(entrada['operacao'], dados, filtro, erro)
+            except Exception as e:
+                print(f"⚠️ [Outbox] Falha ao avisar sobre a escrita descartada: {e}")
+
+    def _registrar_falha(self, ids: list[int], erro: Exception) -> bool:
+        self.falhas += 1
+        definitivo = self._definitivo(erro)
+        with self._conn:
+            for entrada_id in ids:
+                tentativas = self._conn.execute(
+                    'SELECT tentativas FROM outbox WHERE id = ?', (entrada_id,)
+                ).fetchone()[0] + 1
+                atraso = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE ** tentativas) * random.uniform(0.5, 1)
+                self._conn.execute(
+                    'UPDATE outbox SET estado = ?, tentativas = ?, proxima_tentativa = ?, ultimo_erro = ? WHERE id = ?',
+                    ('falhou' if definitivo else 'pendente', tentativas, time.time() + atraso, str(erro)[:500], entrada_id)
+                )
+        return definitivo
+
+    async def drenar(self, db) -> int:
+        """Envia as entradas vencidas, na ordem; para na primeira falha temporária"""
+        async with self._drenando:
+            return await self._drenar(db)
+
+    async def _drenar(self, db) -> int:
+        enviados = 0
+        agora = time.time()
+        entradas = self._entradas_pendentes()
+        i = 0
+        sem_lote_ate = 0
+        while i < len(entradas):
+            entrada = entradas[i]
+            if entrada['proxima_tentativa'] > agora:
+                break
+
+            # Inserções consecutivas viram um único POST em lote
+            grupo = [entrada]
+            if entrada['operacao'] == 'inserir' and i >= sem_lote_ate:
+                while (i + len(grupo) < len(entradas)
+                       and entradas[i + len(grupo)]['operacao'] == 'inserir'
+                       and entradas[i + len(grupo)]['proxima_tentativa'] <= agora):
+                    grupo.append(entradas[i + len(grupo)])
+
+            ids = [e['id'] for e in grupo]
+            try:
+                if entrada['operacao'] == 'inserir':
+                    await db.inserir_lote_remoto([json.loads(e['dados']) for e in grupo])
+                elif entrada['operacao'] == 'remover':
+                    await db.remover_remoto(json.loads(entrada['filtro']))
+                else:
+                    await db.atualizar_remoto(json.loads(entrada['filtro']), json.loads(entrada['dados']))
+            except Exception as e:
+                if len(grupo) > 1 and self._definitivo(e):
+                    # Um registro inválido não pode derrubar o lote inteiro: reenvia um a um
+                    sem_lote_ate = i + len(grupo)
+                    continue
+                if not self._ja_gravado(entrada, e):
+                    if self._registrar_falha(ids, e):
+                        print(f"❌ [Outbox] Escrita descartada após erro definitivo: {e}")
+                        for descartada in grupo:
+                            await self._descartar(db, descartada, e)
+                        i += len(grupo)
+                        continue
+                    print(f"⚠️ [Outbox] Falha ao enviar ({len(grupo)} entradas), nova tentativa com backoff: {e}")
+                    break
+
+            self._concluir(ids)
+            enviados += len(grupo)
+            i += len(grupo)
+
+        return enviados
+
+    def _segundos_ate_proxima(self) -> float | None:
+        linha = self._conn.execute(
+            "SELECT MIN(proxima_tentativa) FROM outbox WHERE estado = 'pendente'"
+        ).fetchone()
+        if linha[0] is None:
+            return None
+        return max(0.0, linha[0] - time.time())
+
+    async def executar(self, db):
+        """Worker em segundo plano: drena sempre que algo é enfileirado ou um backoff vence"""
+        while True:
+            self._evento.clear()
+            try:
+                enviados = await self.drenar(db)
+                if enviados:
+                    print(f"📤 [Outbox] {enviados} escritas enviadas ao Supabase")
+            except Exception as e:
+                print(f"❌ [Outbox] Erro no worker: {e}")
+
+            espera = self._segundos_ate_proxima()
+            try:
+                await asyncio.wait_for(self._evento.wait(), timeout=espera if espera is not None else OUTBOX_INTERVALO)
+            except asyncio.TimeoutError:
+                pass
+
+    def metricas(self) -> dict:
+        contagem = dict(self._conn.execute('SELECT estado, COUNT(*) FROM outbox GROUP BY estado').fetchall())
+        return {
+            'pendentes': contagem.get('pendente', 0),
+            'falhas_definitivas': contagem.get('falhou', 0),
+            'enviados': self.enviados,
+            'falhas': self.falhas,
+        }
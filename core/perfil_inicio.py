@@ -0,0 +1,45 @@
+"""Cronômetro das fases de inicialização (imports, banco local, Supabase, cogs, gateway)"""
+import time
+
+
+class PerfilInicio:
+    """Registra quanto cada fase levou, do início do processo até o `on_ready`
+
+    `marcar(nome)` fecha a fase atual: o tempo contado é o desde a marca
+    anterior. Só usa a biblioteca padrão, para poder ser o primeiro import
+    do `main.py`.
+    """
+
+    def __init__(self, inicio: float = None):
+        self.inicio = inicio if inicio is not None else time.perf_counter()
+        self._ultima = self.inicio
+        self.fases: list[tuple[str, float]] = []
+        self.pronto_em: float | None = None
+
+    def marcar(self, nome: str) -> float:
+        agora = time.perf_counter()
+        duracao = agora - self._ultima
+        self.fases.append((nome, duracao))
+        self._ultima = agora
+        return duracao
+
+    def concluir(self, nome: str = 'gateway (ready)'):
+        """Última fase; só conta a primeira vez (reconexões também disparam `on_ready`)"""
+        if self.pronto_em is None:
+            self.marcar(nome)
+            self.pronto_em = self._ultima - self.inicio
+
+    @property
+    def total(self) -> float:
+        return (self.pronto_em if self.pronto_em is not None else time.perf_counter() - self.inicio)
+
+    def resumo(self) -> dict:
+        return {
+            'fases_ms': {nome: round(duracao * 1000, 1) for nome, duracao in self.fases},
+            'pronto_ms': round(self.pronto_em * 1000, 1) if self.pronto_em is not None else None,
+        }
+
+    def imprimir(self):
+        print(f"⏱️ [Inicialização] Pronto em {self.total * 1000:.0f} ms")
+        for nome, duracao in self.fases:
+            print(f"   {nome:<24} {duracao * 1000:8.1f} ms")
@@ -0,0 +1,85 @@
+"""Execução concorrente de etapas com dependências (aprovação, reprovação, fechamento)"""
+import asyncio
+import time
+
+
+class EtapaPulada(Exception):
+    """A etapa não rodou porque uma dependência falhou"""
+
+
+class ResultadoEtapa:
+    """Valor, erro e duração (ms) de uma etapa"""
+
+    __slots__ = ('valor', 'erro', 'duracao_ms')
+
+    def __init__(self, valor=None, erro: Exception = None, duracao_ms: float = 0.0):
+        self.valor = valor
+        self.erro = erro
+        self.duracao_ms = duracao_ms
+
+    @property
+    def ok(self) -> bool:
+        return self.erro is None
+
+
+class Pipeline:
+    """Pequeno grafo de etapas assíncronas
+
+    Cada etapa começa assim que suas dependências terminam; etapas
+    independentes rodam em paralelo. Uma falha fica isolada na própria etapa
+    e só pula as que dependem dela.
+    """
+
+    def __init__(self, nome: str):
+        self.nome = nome
+        self.duracao_ms = 0.0
+        self._etapas: dict[str, tuple] = {}
+
+    def etapa(self, nome: str, funcao, *, depende_de: tuple = ()):
+        """Registra `funcao(resultados)` — uma coroutine function que recebe o dict de valores já prontos"""
+        for dependencia in depende_de:
+            if dependencia not in self._etapas:
+                raise ValueError(f'Etapa "{nome}" depende de "{dependencia}", que não foi registrada antes')
+        self._etapas[nome] = (funcao, depende_de)
+        return self
+
+    async def executar(self) -> dict[str, ResultadoEtapa]:
+        """Roda todas as etapas e retorna o resultado de cada uma"""
+        inicio = time.perf_counter()
+        resultados: dict[str, ResultadoEtapa] = {}
+        valores: dict = {}
+        tarefas: dict[str, asyncio.Task] = {}
+
+        async def rodar(nome: str, funcao, depende_de: tuple):
+            if depende_de:
+                await asyncio.gather(*(tarefas[d] for d in depende_de))
+            falhas = [d for d in depende_de if not resultados[d].ok]
+            if falhas:
+                resultados[nome] = ResultadoEtapa(erro=EtapaPulada(', '.join(falhas)))
+                return
+
+            comeco = time.perf_counter()
+            try:
+                valor = await funcao(valores)
+                valores[nome] = valor
+                resultados[nome] = ResultadoEtapa(valor, duracao_ms=(time.perf_counter() - comeco) * 1000)
+            except Exception as e:
+                resultados[nome] = ResultadoEtapa(erro=e, duracao_ms=(time.perf_counter() - comeco) * 1000)
+
+        for nome, (funcao, depende_de) in self._etapas.items():
+            tarefas[nome] = asyncio.create_task(rodar(nome, funcao, depende_de))
+        await asyncio.gather(*tarefas.values())
+
+        self.duracao_ms = (time.perf_counter() - inicio) * 1000
+        self._registrar(resultados)
+        return resultados
+
+    def _registrar(self, resultados: dict[str, ResultadoEtapa]):
+        partes = []
+        for nome, resultado in resultados.items():
+            marca = '' if resultado.ok else ' ✗'
+            partes.append(f'{nome} {resultado.duracao_ms:.0f}ms{marca}')
+        print(f"⏱️ [{self.nome}] total {self.duracao_ms:.0f}ms | {', '.join(partes)}")
+        for nome, resultado in resultados.items():
+            if resultado.erro and not isinstance(resultado.erro, EtapaPulada):
+                print(f"❌ [{self.nome}] Etapa '{nome}' falhou: {resultado.erro}")
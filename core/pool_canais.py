@@ -0,0 +1,141 @@
+"""Pool de canais privados pré-criados para os pedidos aprovados"""
+import asyncio
+import os
+import time
+from collections import deque
+
+import discord
+
+POOL_CANAIS_TAMANHO = int(os.getenv('POOL_CANAIS_TAMANHO', 0))
+# Intervalo mínimo entre duas criações durante a reposição (poupa o rate limit de canais)
+POOL_CANAIS_INTERVALO = float(os.getenv('POOL_CANAIS_INTERVALO', 10))
+PREFIXO_RESERVA = 'reserva-'
+
+
+class PoolCanais:
+    """Mantém até `tamanho` canais ocultos na categoria de pedidos, prontos para serem reivindicados
+
+    Reivindicar custa uma única edição (nome + permissões) em vez da criação
+    completa. A reposição roda em segundo plano, um canal por vez, com
+    intervalo fixo e backoff em caso de erro.
+    """
+
+    def __init__(self, bot, categoria_id: int, tamanho: int = POOL_CANAIS_TAMANHO,
+                 intervalo: float = POOL_CANAIS_INTERVALO):
+        self.bot = bot
+        self.categoria_id = categoria_id
+        self.tamanho = tamanho
+        self.intervalo = intervalo
+        self._livres: deque[int] = deque()
+        self._repor = asyncio.Event()
+        self._tarefa: asyncio.Task | None = None
+
+        # Métricas
+        self.reivindicados = 0
+        self.faltas = 0
+        self.falhas_reivindicacao = 0
+        self.criados = 0
+        self._latencias_ms: deque[float] = deque(maxlen=200)
+
+    @property
+    def profundidade(self) -> int:
+        return len(self._livres)
+
+    def iniciar(self):
+        """Recupera canais de reserva já existentes e começa a reposição (idempotente)"""
+        if self._tarefa is not None:
+            return
+
+        categoria = self.bot.get_channel(self.categoria_id)
+        if not isinstance(categoria, discord.CategoryChannel):
+            print(f"⚠️ [PoolCanais] Categoria {self.categoria_id} não encontrada; pool desativado")
+            return
+
+        for canal in categoria.text_channels:
+            if canal.name.startswith(PREFIXO_RESERVA):
+                self._livres.append(canal.id)
+        print(f"🏊 [PoolCanais] {self.profundidade} canais de reserva recuperados (alvo: {self.tamanho})")
+
+        self._tarefa = asyncio.create_task(self._reposicao(categoria))
+
+    def parar(self):
+        if self._tarefa:
+            self._tarefa.cancel()
+            self._tarefa = None
+
+    async def reivindicar(self, nome: str, overwrites: dict) -> discord.TextChannel | None:
+        """Transforma um canal de reserva no canal do pedido; None se não houver reserva utilizável
+
+        Com None o chamador cria o canal do zero, então uma edição recusada
+        nunca impede a aprovação.
+        """
+        inicio = time.perf_counter()
+        while self._livres:
+            canal = self.bot.get_channel(self._livres.popleft())
+            if canal is None:
+                # Apagado manualmente enquanto estava na reserva
+                continue
+
+            self._repor.set()
+            try:
+                await canal.edit(name=nome, overwrites=overwrites)
+            except discord.NotFound:
+                # Apagado sem o cache saber: tenta a próxima reserva
+                continue
+            except discord.HTTPException as e:
+                # Rate limit, permissão etc.: a reserva volta para o fim da fila e o canal é criado direto
+                self._livres.append(canal.id)
+                self.falhas_reivindicacao += 1
+                print(f"⚠️ [PoolCanais] Falha ao reivindicar {canal.id}, criando canal novo: {e}")
+                return None
+            self.reivindicados += 1
+            self._latencias_ms.append((time.perf_counter() - inicio) * 1000)
+            return canal
+
+        self.faltas += 1
+        self._repor.set()
+        return None
+
+    async def _reposicao(self, categoria: discord.CategoryChannel):
+        guild = categoria.guild
+        falhas = 0
+        while True:
+            if self.profundidade >= self.tamanho:
+                self._repor.clear()
+                await self._repor.wait()
+                continue
+
+            try:
+                canal = await guild.create_text_channel(
+                    name=f'{PREFIXO_RESERVA}{int(time.time() * 1000) % 10_000_000}',
+                    category=categoria,
+                    overwrites={
+                        guild.default_role: discord.PermissionOverwrite(read_messages=False),
+                        guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True),
+                    },
+                    reason='Reserva do pool de canais de pedidos'
+                )
+                self._livres.append(canal.id)
+                self.criados += 1
+                falhas = 0
+                await asyncio.sleep(self.intervalo)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                falhas += 1
+                espera = min(600, self.intervalo * 2 ** falhas)
+                print(f"❌ [PoolCanais] Erro ao criar canal de reserva (nova tentativa em {espera:.0f}s): {e}")
+                await asyncio.sleep(espera)
+
+    def metricas(self) -> dict:
+        latencias = sorted(self._latencias_ms)
+        return {
+            'profundidade': self.profundidade,
+            'alvo': self.tamanho,
+            'reivindicados': self.reivindicados,
+            'faltas': self.faltas,
+            'falhas_reivindicacao': self.falhas_reivindicacao,
+            'criados': self.criados,
+            'latencia_reivindicacao_ms_p50': round(latencias[len(latencias) // 2], 1) if latencias else None,
+            'latencia_reivindicacao_ms_p95': round(latencias[int(len(latencias) * 0.95)], 1) if latencias else None,
+        }
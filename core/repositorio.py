@@ -0,0 +1,376 @@
+"""Camada de dados assíncrona para as tabelas `pedidos` e `contador` do Supabase"""
+import asyncio
+import contextlib
+import os
+
+import aiohttp
+
+from core.cache import CachePedidos
+from core.espelho import COLUNAS, EspelhoPedidos
+
+# Limites padrão (podem ser ajustados por variável de ambiente)
+SUPABASE_TIMEOUT = float(os.getenv('SUPABASE_TIMEOUT', 10))
+SUPABASE_MAX_CONCORRENCIA = int(os.getenv('SUPABASE_MAX_CONCORRENCIA', 8))
+SUPABASE_PAGINA = int(os.getenv('SUPABASE_PAGINA', 1000))
+
+
+class ErroRepositorio(Exception):
+    """Falha ao falar com o Supabase (HTTP, rede ou timeout)"""
+
+    def __init__(self, mensagem: str, status: int = None, detalhe: str = ''):
+        super().__init__(mensagem)
+        self.status = status
+        self.detalhe = detalhe
+
+
+class RepositorioSupabase:
+    """Acesso assíncrono ao PostgREST do Supabase com conexões keep-alive reaproveitadas
+
+    Com um `espelho` sincronizado, as leituras são respondidas localmente e o
+    Supabase só recebe escritas e a sincronização periódica. Com um `outbox`,
+    as escritas em `pedidos` também são confirmadas localmente e enviadas em
+    segundo plano — exceto `aprovar_pedido`, que precisa do número definitivo.
+    """
+
+    def __init__(self, url: str, chave: str, *, max_concorrencia: int = SUPABASE_MAX_CONCORRENCIA,
+                 timeout: float = SUPABASE_TIMEOUT, cache: CachePedidos = None,
+                 espelho: EspelhoPedidos = None, outbox=None, metricas=None):
+        if not url or not chave:
+            raise ErroRepositorio('SUPABASE_URL e SUPABASE_KEY precisam estar definidos')
+
+        self.base_url = f"{url.rstrip('/')}/rest/v1"
+        self.headers = {
+            'apikey': chave,
+            'Authorization': f'Bearer {chave}',
+            'Content-Type': 'application/json',
+        }
+        self.max_concorrencia = max_concorrencia
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.session: aiohttp.ClientSession | None = None
+        self._sessao_propria = False
+        self.cache = cache if cache is not None else CachePedidos()
+        self.espelho = espelho
+        self.outbox = outbox
+        self.metricas = metricas
+        self._semaforo = asyncio.Semaphore(max_concorrencia)
+
+    # ==========================
+    # 🔌 Ciclo de vida
+    # ==========================
+    async def iniciar(self, session: aiohttp.ClientSession = None):
+        """Abre o espelho local e passa a usar `session` (ou um pool próprio, fora do bot); idempotente"""
+        if self.espelho:
+            self.espelho.abrir()
+        if self.outbox:
+            self.outbox.abrir()
+        if session is not None:
+            self.session = session
+            self._sessao_propria = False
+        elif self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concorrencia,
+                keepalive_timeout=60,
+                ttl_dns_cache=300
+            )
+            self.session = aiohttp.ClientSession(connector=connector)
+            self._sessao_propria = True
+
+    async def fechar(self):
+        """Fecha o pool de conexões HTTP (se for dele) e o espelho local"""
+        if self._sessao_propria and self.session and not self.session.closed:
+            await self.session.close()
+        if self.espelho:
+            self.espelho.fechar()
+        if self.outbox:
+            self.outbox.fechar()
+
+    @property
+    def leitura_local(self) -> bool:
+        """True quando as leituras podem ser servidas pelo espelho local"""
+        return self.espelho is not None and self.espelho.pronto
+
+    async def _requisicao(self, metodo: str, recurso: str, *, params: dict = None,
+                          json=None, prefer: str = None):
+        """Executa uma chamada REST com limite de concorrência e timeout por chamada"""
+        if self.session is None or self.session.closed:
+            await self.iniciar()
+
+        headers = dict(self.headers)
+        if prefer:
+            headers['Prefer'] = prefer
+
+        medir = self.metricas.medir_supabase(metodo, recurso) if self.metricas else contextlib.nullcontext()
+        async with self._semaforo, medir:
+            try:
+                async with self.session.request(
+                    metodo,
+                    f'{self.base_url}/{recurso}',
+                    params=params,
+                    json=json,
+                    headers=headers,
+                    timeout=self.timeout
+                ) as resp:
+                    if resp.status >= 400:
+                        detalhe = await resp.text()
+                        raise ErroRepositorio(
+                            f'{metodo} {recurso} → HTTP {resp.status}: {detalhe[:200]}', resp.status, detalhe
+                        )
+                    dados = await resp.json(content_type=None)
+                    return [] if dados is None else dados
+            except asyncio.TimeoutError as e:
+                raise ErroRepositorio(f'{metodo} {recurso} → timeout após {self.timeout.total}s') from e
+            except aiohttp.ClientError as e:
+                raise ErroRepositorio(f'{metodo} {recurso} → {e}') from e
+
+    # ==========================
+    # 📦 Pedidos
+    # ==========================
+    async def buscar_pedido(self, pedido_id: str) -> dict | None:
+        """Retorna o registro mais recente do `pedido_id` (lido do cache quando possível)"""
+        encontrado, registro = self.cache.obter(pedido_id)
+        if encontrado:
+            return registro
+
+        if self.leitura_local:
+            registro = self.espelho.buscar_pedido(pedido_id)
+        else:
+            dados = await self._requisicao('GET', 'pedidos', params={
+                'select': '*',
+                'pedido_id': f'eq.{pedido_id}',
+                'order': 'timestamp.desc',
+                'limit': '1'
+            })
+            registro = dados[0] if dados else None
+        self.cache.guardar(pedido_id, registro)
+        return registro
+
+    async def listar_pedidos(self, status: str = None, limite: int = 10, *, colunas: tuple = None,
+                             plano: str = None, moderador_id: int = None, desde: str = None, ate: str = None,
+                             cursor: tuple = None, remoto: bool = False) -> list[dict]:
+        """Lista os pedidos mais recentes, com filtros opcionais e paginação por cursor
+
+        `cursor` é o (timestamp, id) do último pedido da página anterior;
+        a ordem (timestamp, id) desc casa com o índice `(status, timestamp)`.
+        `remoto=True` ignora o espelho (dados possivelmente defasados e provisórios).
+        """
+        if self.leitura_local and not remoto:
+            return self.espelho.listar_pedidos(
+                status, limite, colunas=colunas or COLUNAS, plano=plano, moderador_id=moderador_id,
+                desde=desde, ate=ate, cursor=cursor
+            )
+
+        params = {
+            'select': ','.join(colunas) if colunas else '*',
+            'order': 'timestamp.desc,id.desc',
+            'limit': str(limite),
+        }
+        for coluna, valor in (('status', status), ('plano', plano), ('moderador_id', moderador_id)):
+            if valor is not None:
+                params[coluna] = f'eq.{valor}'
+        intervalo = []
+        if desde:
+            intervalo.append(f'timestamp.gte."{desde}"')
+        if ate:
+            intervalo.append(f'timestamp.lt."{ate}"')
+        if intervalo:
+            params['and'] = f"({','.join(intervalo)})"
+        if cursor:
+            timestamp, pedido_id = cursor
+            params['or'] = f'(timestamp.lt."{timestamp}",and(timestamp.eq."{timestamp}",id.lt.{pedido_id}))'
+        return await self._requisicao('GET', 'pedidos', params=params)
+
+    async def inserir_pedido(self, dados: dict) -> dict | None:
+        """Insere um pedido e retorna o registro criado (provisório, se passar pelo outbox)"""
+        if self.outbox:
+            return self._atualizar_cache(self.outbox.enfileirar_insercao(dados))
+
+        criado = await self._requisicao('POST', 'pedidos', json=dados, prefer='return=representation')
+        return self._atualizar_cache(criado[0] if criado else None, dados['pedido_id'])
+
+    async def aprovar_pedido(self, dados: dict) -> dict:
+        """Reserva o próximo número e insere o pedido aceito numa única chamada (RPC `aprovar_pedido`)"""
+        registro = await self._requisicao('POST', 'rpc/aprovar_pedido', json={'p_pedido': dados})
+        if self.espelho and registro:
+            self.espelho.definir_contador(registro['pedido_number'])
+        return self._atualizar_cache(registro, dados['pedido_id'])
+
+    async def reprovar_pedido(self, dados: dict) -> dict:
+        """Grava a reprovação direto no Supabase (RPC `reprovar_pedido`), para um conflito aparecer na hora"""
+        registro = await self._requisicao('POST', 'rpc/reprovar_pedido', json={'p_pedido': dados})
+        return self._atualizar_cache(registro, dados['pedido_id'])
+
+    async def buscar_decisao(self, mensagem_id: int, pedido_id: str, user_id: int) -> dict | None:
+        """Decisão já gravada no Supabase para o comprovante (ou aprovação do mesmo pedido por outro comprovante)"""
+        dados = await self._requisicao('GET', 'pedidos', params={
+            'select': 'status,moderador_id',
+            'or': f'(mensagem_id.eq.{mensagem_id},and(pedido_id.eq."{pedido_id}",user_id.eq.{user_id},status.eq.aceito))',
+            'limit': '1'
+        })
+        return dados[0] if dados else None
+
+    async def atualizar_registro(self, registro: dict, dados: dict) -> dict | None:
+        """Atualiza um único registro (pela chave de idempotência ou pela chave primária `id`)"""
+        if registro.get('chave_idempotencia'):
+            filtro = {'chave_idempotencia': registro['chave_idempotencia']}
+        else:
+            filtro = {'id': registro['id']}
+
+        if self.outbox:
+            self.outbox.enfileirar_atualizacao(filtro, dados)
+            return self._atualizar_cache({**registro, **dados})
+
+        atualizados = await self.atualizar_remoto(filtro, dados)
+        return atualizados[0] if atualizados else None
+
+    async def atualizar_pedido(self, pedido_id: str, dados: dict) -> list[dict]:
+        """Atualiza todos os registros do `pedido_id` informado"""
+        filtro = {'pedido_id': pedido_id}
+        if self.outbox:
+            self.outbox.enfileirar_atualizacao(filtro, dados)
+            if self.espelho:
+                self.espelho.atualizar_local(filtro, dados)
+            self.cache.invalidar(pedido_id)
+            return []
+
+        return await self.atualizar_remoto(filtro, dados)
+
+    async def remover_registro(self, registro: dict):
+        """Desfaz a inserção de um registro (ex.: pedido aprovado cujo canal não pôde ser criado)"""
+        if registro.get('chave_idempotencia'):
+            filtro = {'chave_idempotencia': registro['chave_idempotencia']}
+        else:
+            filtro = {'id': registro['id']}
+
+        # Inserção ainda no outbox (id provisório): a remoção entra na fila logo atrás dela
+        if self.outbox and registro['id'] < 0:
+            self.outbox.enfileirar_remocao(filtro)
+        else:
+            await self.remover_remoto(filtro)
+        if self.espelho:
+            self.espelho.remover_local(filtro)
+        self.cache.invalidar(registro['pedido_id'])
+
+    async def remover_remoto(self, filtro: dict):
+        """DELETE direto no Supabase dos registros que batem com `filtro` (coluna → valor)"""
+        await self._requisicao('DELETE', 'pedidos', params={coluna: f'eq.{valor}' for coluna, valor in filtro.items()})
+
+    async def atualizar_remoto(self, filtro: dict, dados: dict) -> list[dict]:
+        """PATCH direto no Supabase para os registros que batem com `filtro` (coluna → valor)"""
+        atualizados = await self._requisicao(
+            'PATCH', 'pedidos',
+            params={coluna: f'eq.{valor}' for coluna, valor in filtro.items()},
+            json=dados,
+            prefer='return=representation'
+        )
+        # Vários registros podem ter mudado: a próxima leitura busca o mais recente
+        if self.espelho:
+            self.espelho.aplicar(atualizados)
+        for registro in atualizados:
+            self.cache.invalidar(registro['pedido_id'])
+        return atualizados
+
+    async def inserir_lote_remoto(self, registros: list[dict]) -> list[dict]:
+        """POST em lote idempotente: registros com `chave_idempotencia` já gravada são ignorados"""
+        colunas = sorted(set().union(*registros))
+        criados = await self._requisicao(
+            'POST', 'pedidos',
+            params={'on_conflict': 'chave_idempotencia', 'columns': ','.join(colunas)},
+            json=registros,
+            prefer='return=representation,resolution=ignore-duplicates'
+        )
+        for registro in criados:
+            self._atualizar_cache(registro)
+        return criados
+
+    async def desfazer_local(self, operacao: str, dados: dict, filtro: dict = None):
+        """O Supabase recusou de vez uma escrita do outbox: espelho e cache voltam ao que está lá"""
+        if operacao == 'inserir':
+            if self.espelho:
+                self.espelho.remover_local({'chave_idempotencia': dados['chave_idempotencia']})
+            self.cache.invalidar(dados['pedido_id'])
+            return
+
+        # Atualização/remoção já aplicada localmente: relê do Supabase os registros afetados
+        registros = await self._requisicao('GET', 'pedidos', params={
+            'select': '*', **{coluna: f'eq.{valor}' for coluna, valor in filtro.items()}
+        })
+        if self.espelho:
+            self.espelho.aplicar(registros)
+        for pedido_id in ({r['pedido_id'] for r in registros} | {filtro.get('pedido_id')}) - {None}:
+            self.cache.invalidar(pedido_id)
+
+    def _atualizar_cache(self, registro: dict | None, pedido_id: str = None) -> dict | None:
+        """Reflete uma escrita no cache e no espelho e devolve o registro gravado"""
+        if registro:
+            if self.espelho:
+                self.espelho.aplicar([registro])
+            self.cache.guardar(registro['pedido_id'], registro)
+        elif pedido_id:
+            self.cache.invalidar(pedido_id)
+        return registro
+
+    async def listar_remoto(self, *, apos_id: int = 0, alterados_desde: str = None,
+                            limite: int = SUPABASE_PAGINA) -> list[dict]:
+        """Página de pedidos em ordem de `id`, opcionalmente só os criados/fechados desde uma data"""
+        params = {'select': '*', 'id': f'gt.{apos_id}', 'order': 'id.asc', 'limit': str(limite)}
+        if alterados_desde:
+            params['or'] = f'(timestamp.gte."{alterados_desde}",fechado_em.gte."{alterados_desde}")'
+        return await self._requisicao('GET', 'pedidos', params=params)
+
+    # ==========================
+    # 🔢 Contador
+    # ==========================
+    async def obter_ultimo_numero(self, remoto: bool = False) -> int | None:
+        """Retorna o último número reservado no contador ou None se ele ainda não existe"""
+        if self.leitura_local and not remoto:
+            return self.espelho.ultimo_numero()
+
+        dados = await self._requisicao('GET', 'contador', params={'select': 'ultimo_numero', 'id': 'eq.1'})
+        return dados[0]['ultimo_numero'] if dados else None
+
+    async def reservar_numeros(self, quantidade: int = 1) -> int:
+        """Incrementa o contador atomicamente e retorna o maior número reservado (RPC `reservar_numeros`)"""
+        limite = await self._requisicao('POST', 'rpc/reservar_numeros', json={'p_quantidade': quantidade})
+        if self.espelho:
+            self.espelho.definir_contador(limite)
+        return limite
+
+    async def obter_maior_numero_usado(self) -> int | None:
+        """Retorna o maior `pedido_number` já gravado em `pedidos`"""
+        if self.leitura_local:
+            return self.espelho.maior_numero_usado()
+
+        dados = await self._requisicao('GET', 'pedidos', params={
+            'select': 'pedido_number',
+            'pedido_number': 'not.is.null',
+            'order': 'pedido_number.desc',
+            'limit': '1'
+        })
+        return dados[0]['pedido_number'] if dados else None
+
+    # ==========================
+    # 🪞 Espelho local
+    # ==========================
+    async def sincronizar_espelho(self) -> int:
+        """Traz para o espelho os pedidos criados/fechados desde a última marca (tudo na primeira vez)"""
+        desde = self.espelho.desde_para_sincronizar()
+        apos_id = 0
+        total = 0
+        while True:
+            pagina = await self.listar_remoto(apos_id=apos_id, alterados_desde=desde)
+            if not pagina:
+                break
+            await asyncio.to_thread(self.espelho.aplicar, pagina)
+            for registro in pagina:
+                self.cache.invalidar(registro['pedido_id'])
+            total += len(pagina)
+            apos_id = pagina[-1]['id']
+            if len(pagina) < SUPABASE_PAGINA:
+                break
+
+        ultimo_numero = await self.obter_ultimo_numero(remoto=True)
+        if ultimo_numero is not None:
+            self.espelho.definir_contador(ultimo_numero)
+
+        await asyncio.to_thread(self.espelho.concluir_sincronizacao)
+        return total
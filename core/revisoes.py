@@ -0,0 +1,65 @@
+"""Estado das revisões pendentes (botões Aceitar/Recusar), indexado pelo ID da mensagem dos moderadores"""
+import threading
+import time
+
+from core.banco_local import LOCAL_DB_PATH, abrir_banco
+
+
+class RevisoesPendentes:
+    """Uma linha por comprovante aguardando decisão; a View persistente busca aqui pelo `message.id`
+
+    Nada fica na memória: depois de um restart os botões continuam
+    funcionando porque o estado é lido do SQLite a cada clique.
+    """
+
+    def __init__(self, caminho: str = LOCAL_DB_PATH):
+        self.caminho = caminho
+        self._conn = None
+        self._trava = threading.Lock()
+
+    def abrir(self):
+        if self._conn is not None:
+            return
+
+        self._conn = abrir_banco(self.caminho)
+        with self._trava, self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS revisoes (
+                    mensagem_id INTEGER PRIMARY KEY,
+                    pedido_id TEXT NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    plano TEXT NOT NULL,
+                    comprovante_path TEXT,
+                    criado_em REAL NOT NULL
+                ) WITHOUT ROWID
+            ''')
+
+    def fechar(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def guardar(self, mensagem_id: int, pedido_id: str, user_id: int, plano: str, comprovante_path: str):
+        with self._trava, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO revisoes (mensagem_id, pedido_id, user_id, plano, comprovante_path, criado_em) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (mensagem_id, pedido_id, user_id, plano, comprovante_path, time.time())
+            )
+
+    def obter(self, mensagem_id: int) -> dict | None:
+        with self._trava:
+            linha = self._conn.execute(
+                'SELECT pedido_id, user_id, plano, comprovante_path FROM revisoes WHERE mensagem_id = ?',
+                (mensagem_id,)
+            ).fetchone()
+        return dict(linha) if linha else None
+
+    def remover(self, mensagem_id: int):
+        with self._trava, self._conn:
+            self._conn.execute('DELETE FROM revisoes WHERE mensagem_id = ?', (mensagem_id,))
+
+    @property
+    def pendentes(self) -> int:
+        with self._trava:
+            return self._conn.execute('SELECT COUNT(*) FROM revisoes').fetchone()[0]
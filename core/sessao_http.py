@@ -0,0 +1,22 @@
+"""Sessão HTTP única do bot (Supabase, downloads de anexos, S3, auto-ping)"""
+import os
+
+import aiohttp
+
+HTTP_MAX_CONEXOES = int(os.getenv('HTTP_MAX_CONEXOES', 32))
+HTTP_KEEPALIVE = float(os.getenv('HTTP_KEEPALIVE', 60))
+
+
+def criar_sessao(max_conexoes: int = HTTP_MAX_CONEXOES) -> aiohttp.ClientSession:
+    """Pool de conexões keep-alive com cache de DNS, compartilhado por todo o processo
+
+    Cada componente continua limitando a própria concorrência (semáforos) e
+    passando o próprio timeout em cada requisição; a sessão só garante que
+    DNS, TCP e TLS sejam pagos uma vez por host.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=max_conexoes,
+        keepalive_timeout=HTTP_KEEPALIVE,
+        ttl_dns_cache=300
+    )
+    return aiohttp.ClientSession(connector=connector)
@@ -0,0 +1,61 @@
+"""Exportação do histórico de pedidos pela linha de comando (sem subir o bot)
+
+Uso:
+    python exportar.py --status aceito --desde 2024-01-01 --ate 2024-01-31 --formato csv --saida exportacoes
+"""
+import argparse
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from core.exportacao import FORMATOS, ExportadorPedidos  # noqa: E402
+from core.repositorio import RepositorioSupabase  # noqa: E402
+
+
+def _data(valor: str) -> datetime:
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'data inválida: {valor} (use AAAA-MM-DD)')
+
+
+async def exportar(args) -> list[str]:
+    db = RepositorioSupabase(os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY'))
+    await db.iniciar()
+    try:
+        exportador = ExportadorPedidos(
+            db, args.saida, formato=args.formato, limite_bytes=int(args.limite_mb * 1024 * 1024)
+        )
+        prefixo = f"pedidos-{args.status or 'todos'}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}"
+        partes = await exportador.exportar(
+            prefixo,
+            status=args.status,
+            desde=args.desde.isoformat() if args.desde else None,
+            # Inclusivo: até o fim do dia informado
+            ate=(args.ate + timedelta(days=1)).isoformat() if args.ate else None,
+        )
+        print(f"✅ {exportador.registros} pedidos exportados em {len(partes)} arquivo(s):")
+        for caminho in partes:
+            print(f"   📄 {caminho} ({os.path.getsize(caminho) / 1024:.0f} KB)")
+        return partes
+    finally:
+        await db.fechar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exporta a tabela pedidos do Supabase em CSV/JSONL comprimido')
+    parser.add_argument('--status', choices=['aceito', 'reprovado', 'fechado'])
+    parser.add_argument('--desde', type=_data, help='AAAA-MM-DD (inclusivo)')
+    parser.add_argument('--ate', type=_data, help='AAAA-MM-DD (inclusivo)')
+    parser.add_argument('--formato', choices=FORMATOS, default='csv')
+    parser.add_argument('--saida', default='exportacoes', help='pasta de destino')
+    parser.add_argument('--limite-mb', type=float, default=0, help='tamanho máximo de cada parte (0 = arquivo único)')
+    asyncio.run(exportar(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
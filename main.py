@@ -1,52 +1,140 @@
+import time
+INICIO = time.perf_counter()
+
 import sys
 import types
 import os
 import asyncio
-import threading
+import math
+import signal
+from functools import partial
+
+from core.perfil_inicio import PerfilInicio
+
+perfil = PerfilInicio(INICIO)
 
 # ⚡ Evita erro de áudio no Render
 sys.modules['audioop'] = types.ModuleType('audioop')
 
-from flask import Flask, jsonify
-import discord
-from discord.ext import commands
-from dotenv import load_dotenv
-from supabase import create_client, Client
-import aiohttp
-
 # ==========================
 # 🔧 Configurações Iniciais
 # ==========================
+# Antes dos módulos do core: eles leem as variáveis de ambiente ao serem importados
+from dotenv import load_dotenv
 load_dotenv()
+perfil.marcar("env")
+
+import discord
+from discord.ext import commands
+perfil.marcar("import discord")
+
+import aiohttp
+from aiohttp import web
+perfil.marcar("import aiohttp")
+
+from core.admissao import AdmissaoNegada, ControleAdmissao
+from core.agendador import AgendadorDiscord
+from core.alocador import AlocadorNumeros
+from core.armazenamento import ARMAZENAMENTO_DIR, criar_armazenamento
+from core.blobs import RepositorioBlobs
+from core.decisoes import ControleDecisoes
+from core.espelho import EspelhoPedidos
+from core.estado import EstadoLocal
+from core.estatisticas import EstatisticasPedidos
+from core.exclusoes import AgendadorExclusoes
+from core.imagens import ProcessadorImagens
+from core.ingestao import IngestorAnexos
+from core.membros import INTENTS_PERFIL, CacheMembros, configuracao_gateway
+from core.metricas import MetricasBot
+from core.outbox import OutboxPedidos
+from core.repositorio import RepositorioSupabase
+from core.sessao_http import criar_sessao
+from core.revisoes import RevisoesPendentes
+perfil.marcar("import core")
 
 # Variáveis essenciais
 TOKEN = os.getenv("DISCORD_TOKEN")
 AUTOPING = os.getenv("AUTOPING")
+# O Render gratuito dorme após 15 min sem requisições; pingar só depois de tanto tempo ocioso
+AUTOPING_OCIOSO = int(os.getenv("AUTOPING_OCIOSO", 600))
+ESPELHO_INTERVALO = int(os.getenv("ESPELHO_INTERVALO", 60))
+OUTBOX_ATIVO = os.getenv("OUTBOX_ATIVO", "1") == "1"
+LOG_CHANNEL_ID = int(os.getenv("LOG_CHANNEL_ID", 0))
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+PORT = int(os.getenv("PORT", 8080))
 
-intents = discord.Intents.all()
 
 # ==========================
-# 🌐 Flask App
+# 🌐 Servidor Web (no mesmo event loop do bot)
 # ==========================
-app = Flask(__name__)
-
-@app.route("/")
-def home():
-    return "✅ Bot de Pagamentos Unibot está rodando com sucesso!"
+async def home(request):
+    return web.Response(text="✅ Bot de Pagamentos Unibot está rodando com sucesso!")
 
-@app.route("/status")
-def status():
-    return jsonify({
-        "status": "online",
+async def status(request):
+    bot = request.app["bot"]
+    dados = {
+        "status": "online" if bot.is_ready() else "iniciando",
         "bot": "Unibot Pagamentos",
         "version": "1.0"
-    })
+    }
+
+    # Campos ao vivo: lidos direto do bot, sem travas (mesma thread)
+    latencia = bot.latency
+    dados["gateway_latencia_ms"] = round(latencia * 1000, 1) if math.isfinite(latencia) else None
+    dados["servidores"] = len(bot.guilds)
+    dados["atraso_loop_ms"] = round(bot.metricas.atraso_loop * 1000, 2)
+    dados["no_ar_s"] = round(time.monotonic() - bot.iniciado_em)
+    dados["inicializacao"] = perfil.resumo()
+    dados["autoping"] = {"enviados": bot.pings_enviados, "evitados": bot.pings_evitados}
+    dados["filas"] = {
+        "agendador": bot.agendador.profundidade,
+        "exclusoes": bot.exclusoes.pendentes,
+        "outbox": bot.db.outbox.metricas()["pendentes"] if bot.db and bot.db.outbox else 0,
+    }
 
-def run_flask():
-    port = int(os.environ.get("PORT", 8080))
-    app.run(host="0.0.0.0", port=port)
+    if bot.db:
+        dados["cache_pedidos"] = bot.db.cache.metricas()
+        dados["espelho"] = bot.db.espelho.metricas()
+        if bot.db.outbox:
+            dados["outbox"] = bot.db.outbox.metricas()
+    dados["agendador"] = bot.agendador.metricas()
+    dados["exclusoes"] = bot.exclusoes.metricas()
+    dados["membros"] = {"perfil_intents": INTENTS_PERFIL, **bot.membros.metricas()}
+    dados["revisoes_pendentes"] = bot.revisoes.pendentes
+    dados["decisoes"] = bot.decisoes.metricas()
+    dados["admissao"] = bot.admissao.metricas()
+    dados["estatisticas"] = {
+        "hoje": bot.estatisticas.resumo(1),
+        "7d": bot.estatisticas.resumo(7),
+        "30d": bot.estatisticas.resumo(30),
+        "total": bot.estatisticas.resumo(),
+    }
+    dados["ingestao"] = bot.ingestor.metricas()
+    dados["blobs"] = bot.blobs.metricas()
+    dados["imagens"] = bot.imagens.metricas()
+    dados["armazenamento"] = bot.armazenamento.metricas()
+    if getattr(bot, "pool_canais", None):
+        dados["pool_canais"] = bot.pool_canais.metricas()
+    return web.json_response(dados)
+
+async def metrics(request):
+    return web.Response(body=request.app["bot"].metricas.expor().encode(),
+                        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+@web.middleware
+async def registrar_atividade(request, handler):
+    # Qualquer requisição (inclusive o próprio auto-ping) reinicia o timer de inatividade do Render
+    request.app["bot"].ultima_atividade = time.monotonic()
+    return await handler(request)
+
+def criar_app(bot) -> web.Application:
+    app = web.Application(middlewares=[registrar_atividade])
+    app["bot"] = bot
+    app.router.add_get("/", home)
+    app.router.add_get("/status", status)
+    app.router.add_get("/metrics", metrics)
+    return app
 
 # ==========================
 # 🤖 Bot Customizado
@@ -54,29 +142,210 @@ def run_flask():
 class CustomBot(commands.Bot):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        self.iniciado_em = time.monotonic()
+        self.ultima_atividade = self.iniciado_em
+        self.pings_enviados = 0
+        self.pings_evitados = 0
+        self.sessao: aiohttp.ClientSession | None = None
+        self.web: web.AppRunner | None = None
+        self.metricas = MetricasBot()
+        self.membros = CacheMembros()
+        self.admissao = ControleAdmissao(self)
+        self.agendador = AgendadorDiscord()
+        self.exclusoes = AgendadorExclusoes(self)
+        self.estado = EstadoLocal()
+        self.revisoes = RevisoesPendentes()
+        self.decisoes = ControleDecisoes()
+        self.estatisticas = EstatisticasPedidos()
+        self.ingestor = IngestorAnexos()
+        self.blobs = RepositorioBlobs()
+        self.imagens = ProcessadorImagens()
+        self.armazenamento = criar_armazenamento()
         try:
-            self.supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-            print("✅ Conectado ao Supabase com sucesso!")
+            self.db = RepositorioSupabase(
+                SUPABASE_URL, SUPABASE_KEY,
+                espelho=EspelhoPedidos(),
+                outbox=OutboxPedidos(ao_descartar=self.avisar_escrita_descartada) if OUTBOX_ATIVO else None,
+                metricas=self.metricas
+            )
+            self.alocador = AlocadorNumeros(self.db)
+            print("✅ Repositório Supabase configurado com sucesso!")
         except Exception as e:
-            print(f"❌ Erro ao conectar no Supabase: {e}")
-            self.supabase = None
+            print(f"❌ Erro ao configurar o Supabase: {e}")
+            self.db = None
+            self.alocador = None
 
     async def setup_hook(self):
-        os.makedirs("comprovantes", exist_ok=True)
-        print("📁 Diretório 'comprovantes' verificado/criado")
+        perfil.marcar("login")
+
+        # Um único pool HTTP para todo tráfego de saída que não é do discord.py
+        self.sessao = criar_sessao()
+        self.ingestor.abrir(self.sessao)
+        self.metricas.instrumentar(self)
+        self._registrar_coletores()
+        self.agendador.iniciar()
+        self.estado.abrir()
+        self.revisoes.abrir()
+        self.decisoes.abrir()
+        self.estatisticas.abrir()
+        self.exclusoes.abrir()
+        self.exclusoes.iniciar()
+        if self.db:
+            await self.db.iniciar(self.sessao)
+            print("🔌 Pool de conexões do Supabase aberto")
+        await self.armazenamento.abrir(self.sessao)
+        os.makedirs(os.path.join(ARMAZENAMENTO_DIR, "recebendo"), exist_ok=True)
+        print(f"📁 Armazenamento de comprovantes: {self.armazenamento.nome}")
+        self.blobs.abrir()
+        perfil.marcar("estado local")
+
+        # A porta abre assim que o estado local pode ser lido (o Render só considera
+        # o serviço no ar quando ela responde), antes das etapas que dependem da rede
+        await self.iniciar_web()
+        perfil.marcar("servidor web")
 
-        cogs_carregados = 0
-        for filename in os.listdir("./cogs"):
-            if filename.endswith(".py") and not filename.startswith("_"):
+        # Sincronização do espelho (rede) e carga dos cogs (CPU) ao mesmo tempo
+        await asyncio.gather(self.preparar_supabase(), self.carregar_cogs())
+        perfil.marcar("supabase + cogs")
+
+        asyncio.create_task(self.auto_ping())
+
+    async def preparar_supabase(self):
+        if not self.db:
+            return
+        inicio = time.perf_counter()
+        try:
+            total = await self.db.sincronizar_espelho()
+            print(f"🪞 [Espelho] Sincronizado ({total} registros novos/alterados, {time.perf_counter() - inicio:.2f}s)")
+        except Exception as e:
+            print(f"⚠️ [Espelho] Falha na sincronização inicial: {e}")
+        asyncio.create_task(self.sincronizar_espelho())
+        asyncio.create_task(self.estatisticas.executar(self.db))
+        if self.db.outbox:
+            asyncio.create_task(self.db.outbox.executar(self.db))
+            print(f"📤 [Outbox] Worker iniciado ({self.db.outbox.metricas()['pendentes']} escritas pendentes)")
+
+    async def carregar_cogs(self):
+        async def carregar(nome: str) -> bool:
+            try:
+                await self.load_extension(f"cogs.{nome}")
+                print(f"✅ [COG] {nome} carregado")
+                return True
+            except Exception as e:
+                print(f"❌ [ERRO] Falha ao carregar {nome}.py: {e}")
+                return False
+
+        nomes = sorted(f[:-3] for f in os.listdir("./cogs") if f.endswith(".py") and not f.startswith("_"))
+        carregados = await asyncio.gather(*(carregar(nome) for nome in nomes))
+        print(f"📊 Total de cogs carregados: {sum(carregados)}")
+
+    async def close(self):
+        if self.web:
+            await self.web.cleanup()
+            self.web = None
+        self.metricas.parar()
+        self.agendador.parar()
+        self.exclusoes.fechar()
+        self.estado.fechar()
+        self.revisoes.fechar()
+        self.decisoes.fechar()
+        self.estatisticas.fechar()
+        await self.ingestor.fechar()
+        self.blobs.fechar()
+        self.imagens.parar()
+        await self.armazenamento.fechar()
+        if self.db:
+            if self.db.outbox:
+                # Última tentativa de envio; o que sobrar continua salvo no disco
                 try:
-                    await self.load_extension(f"cogs.{filename[:-3]}")
-                    print(f"✅ [COG] {filename[:-3]} carregado")
-                    cogs_carregados += 1
+                    await self.db.outbox.drenar(self.db)
                 except Exception as e:
-                    print(f"❌ [ERRO] Falha ao carregar {filename}: {e}")
-        print(f"📊 Total de cogs carregados: {cogs_carregados}")
+                    print(f"⚠️ [Outbox] Pendências ficarão para o próximo início: {e}")
+            await self.db.fechar()
+        if self.sessao and not self.sessao.closed:
+            await self.sessao.close()
+        await super().close()
 
-        asyncio.create_task(self.auto_ping())
+    async def iniciar_web(self):
+        self.web = web.AppRunner(criar_app(self), access_log=None)
+        await self.web.setup()
+        await web.TCPSite(self.web, "0.0.0.0", PORT).start()
+        print(f"🌐 Servidor web ouvindo na porta {PORT}")
+
+        # SIGTERM (deploy/parada no Render) fecha bot e servidor juntos, como o Ctrl-C
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(self.close()))
+        except NotImplementedError:
+            pass
+
+    def _registrar_coletores(self):
+        """Medidores lidos dos componentes só quando `/metrics` é consultado"""
+        r = self.metricas.registro
+        cache_consultas = r.contador('cache_consultas_total', 'Consultas ao cache de pedidos', ('resultado',))
+        cache_taxa = r.medidor('cache_taxa_acerto', 'Fração de consultas respondidas pelo cache')
+        filas = r.medidor('fila_profundidade', 'Itens aguardando em cada fila interna', ('fila',))
+        admissao = r.contador('admissao_total', 'Decisões do controle de admissão de !pago/!statuspag', ('resultado',))
+        pool_tamanho = r.medidor('pool_canais', 'Canais de pedido pré-criados no pool', ('estado',))
+        pool_eventos = r.contador('pool_canais_total', 'Pedidos de canal ao pool e canais criados por ele', ('resultado',))
+
+        def coletar():
+            if self.db:
+                cache = self.db.cache.metricas()
+                cache_consultas.sincronizar(cache['acertos'], resultado='acerto')
+                cache_consultas.sincronizar(cache['falhas'], resultado='falha')
+                cache_taxa.definir(cache['taxa_acerto'])
+                if self.db.outbox:
+                    filas.definir(self.db.outbox.metricas()['pendentes'], fila='outbox')
+            filas.definir(self.agendador.profundidade, fila='agendador')
+            filas.definir(self.exclusoes.metricas()['pendentes'], fila='exclusoes')
+            admissao.sincronizar(self.admissao.admitidos, resultado='admitido')
+            for motivo, total in self.admissao.negados.items():
+                admissao.sincronizar(total, resultado=motivo)
+            # O pool só existe depois que o cog de comprovantes carrega (e se houver categoria configurada)
+            pool = getattr(self, 'pool_canais', None)
+            if pool:
+                m = pool.metricas()
+                pool_tamanho.definir(m['profundidade'], estado='prontos')
+                pool_tamanho.definir(m['alvo'], estado='alvo')
+                pool_eventos.sincronizar(m['reivindicados'], resultado='reivindicado')
+                pool_eventos.sincronizar(m['faltas'], resultado='falta')
+                pool_eventos.sincronizar(m['falhas_reivindicacao'], resultado='falha_reivindicacao')
+                pool_eventos.sincronizar(m['criados'], resultado='criado')
+
+        r.ao_expor(coletar)
+
+    def avisar_escrita_descartada(self, operacao: str, dados: dict, filtro: dict | None, erro: Exception):
+        """Uma escrita do outbox foi recusada de vez pelo Supabase: os moderadores precisam refazê-la"""
+        canal = self.get_channel(LOG_CHANNEL_ID) if LOG_CHANNEL_ID else None
+        if canal is None:
+            return
+        embed = discord.Embed(
+            title='⚠️ Escrita não gravada no Supabase',
+            description='O Supabase recusou esta escrita e ela foi descartada; confira o pedido e refaça a ação.',
+            color=discord.Color.orange(),
+            timestamp=discord.utils.utcnow()
+        )
+        embed.add_field(name='Operação', value=operacao, inline=True)
+        pedido_id = dados.get('pedido_id') or (filtro or {}).get('pedido_id')
+        if pedido_id:
+            embed.add_field(name='Pedido ID', value=pedido_id, inline=True)
+        if dados.get('status'):
+            embed.add_field(name='Status', value=dados['status'], inline=True)
+        embed.add_field(name='Erro', value=str(erro)[:1000], inline=False)
+        self.agendador.disparar(f'canal:{canal.id}:mensagens', partial(canal.send, embed=embed))
+
+    async def on_command_error(self, ctx, error):
+        if isinstance(error, AdmissaoNegada):
+            # A resposta some quando já dá para tentar de novo
+            novamente_em = int(time.time() + error.espera) + 1
+            if error.motivo == 'sobrecarga':
+                texto = f'⏳ {ctx.author.mention}, o bot está com muitas tarefas na fila agora.'
+            else:
+                texto = f'⏳ {ctx.author.mention}, muitas solicitações de `!{ctx.command.name}` em pouco tempo.'
+            resposta = await ctx.send(f'{texto} Tente de novo <t:{novamente_em}:R>.')
+            self.exclusoes.agendar(resposta, atraso=max(error.espera, 5))
+            return
+        await super().on_command_error(ctx, error)
 
     async def on_ready(self):
         print("=" * 50)
@@ -85,28 +354,55 @@ class CustomBot(commands.Bot):
         print(f"🆔 ID: {self.user.id}")
         print(f"🌐 Servidores: {len(self.guilds)}")
         print("=" * 50)
+        if perfil.pronto_em is None:
+            perfil.concluir()
+            perfil.imprimir()
+
+    async def sincronizar_espelho(self):
+        while True:
+            await asyncio.sleep(ESPELHO_INTERVALO)
+            try:
+                total = await self.db.sincronizar_espelho()
+                if total:
+                    print(f"🪞 [Espelho] {total} registros sincronizados")
+            except Exception as e:
+                print(f"❌ [Espelho] Erro na sincronização: {e} ({self.db.espelho.descrever_defasagem()})")
 
     async def auto_ping(self):
-        await asyncio.sleep(60)
+        """Mantém o Render acordado só quando nada mais fez isso
+
+        Acorda quando o último acesso completar `AUTOPING_OCIOSO` segundos;
+        se alguma requisição chegou nesse meio-tempo, volta a dormir sem pingar.
+        """
+        if not AUTOPING:
+            return
         while True:
-            if AUTOPING:
-                try:
-                    async with aiohttp.ClientSession() as session:
-                        await session.get(AUTOPING)
-                        print("🔄 [AutoPing] Ping enviado com sucesso.")
-                except Exception as e:
-                    print(f"❌ [AutoPing] Erro ao enviar ping: {e}")
-            await asyncio.sleep(300)
+            ocioso = time.monotonic() - self.ultima_atividade
+            if ocioso < AUTOPING_OCIOSO:
+                await asyncio.sleep(AUTOPING_OCIOSO - ocioso)
+                if time.monotonic() - self.ultima_atividade < AUTOPING_OCIOSO:
+                    self.pings_evitados += 1
+                continue
+
+            try:
+                async with self.sessao.get(AUTOPING, timeout=aiohttp.ClientTimeout(total=30)) as resp:
+                    await resp.read()
+                self.pings_enviados += 1
+                print(f"🔄 [AutoPing] Ping enviado (HTTP {resp.status}).")
+            except Exception as e:
+                print(f"❌ [AutoPing] Erro ao enviar ping: {e}")
+            # Mesmo sem passar pelo nosso servidor (URL externa, falha), não insistir antes do intervalo
+            self.ultima_atividade = max(self.ultima_atividade, time.monotonic())
 
 # ==========================
 # 🚀 Inicialização do Bot
 # ==========================
-bot = CustomBot(command_prefix="!", intents=intents)
+bot = CustomBot(command_prefix="!", **configuracao_gateway())
 bot.remove_command("help")
+perfil.marcar("clientes")
 
 # ==========================
-# ⚡ Rodar Flask + Bot juntos
+# ⚡ Rodar o Bot (o servidor web sobe junto, no setup_hook)
 # ==========================
 if __name__ == "__main__":
-    threading.Thread(target=run_flask).start()
     bot.run(TOKEN)